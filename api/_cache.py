@@ -0,0 +1,167 @@
+"""
+Caché de resultados de extracción direccionada por contenido.
+
+La clave es el SHA-256 de los bytes subidos más la extensión; las entradas se
+agrupan por versión de layout, de modo que al cambiar las coordenadas de
+extracción las entradas anteriores dejan de ser visibles. Hay un nivel en
+memoria (LRU acotado) y un nivel opcional en disco que sobrevive reinicios.
+
+El nivel en disco también es un LRU, acotado en bytes (max_disk_bytes): el orden de uso
+es la fecha de modificación de cada archivo, que se actualiza en cada acierto, así que
+sobrevive reinicios. Al abrirlo se borran los directorios de otras versiones de layout,
+que ya no se pueden leer. Si varios procesos comparten el directorio cada uno lleva su
+propia cuenta; un archivo que otro proceso borró es solo un fallo de caché.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def clave_contenido(file_bytes: bytes, filename: str) -> str:
+    return clave_hash(hashlib.sha256(file_bytes).hexdigest(), filename)
+
+
+def clave_hash(sha256: str, filename: str) -> str:
+    """Clave de caché a partir del SHA-256 ya calculado (p. ej. mientras se copia el archivo)."""
+    extension = os.path.splitext(filename.lower())[1].lstrip(".")
+    return f"{sha256}.{extension}"
+
+
+# Nombre de los directorios de versión (layout_version() en api/index.py).
+_DIRECTORIO_VERSION = re.compile(r"^[0-9a-f]{12}$")
+
+
+class ExtractionCache:
+    def __init__(self, version: str, max_entries: int = 512, disk_dir: str = None,
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = os.path.join(disk_dir, version) if disk_dir else None
+        self._memoria = OrderedDict()
+        self._disco = OrderedDict()  # clave -> bytes del archivo, del uso más antiguo al más reciente
+        self._lock = threading.Lock()
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if self.disk_dir:
+            self._cargar_disco(disk_dir)
+
+    def _ruta_disco(self, clave: str) -> str:
+        return os.path.join(self.disk_dir, f"{clave}.json")
+
+    def _cargar_disco(self, raiz: str):
+        """Indexa las entradas que ya están en disco por fecha de uso y borra las de otras versiones."""
+        entradas = []
+        try:
+            for nombre in os.listdir(raiz):
+                if nombre != self.version and _DIRECTORIO_VERSION.match(nombre):
+                    shutil.rmtree(os.path.join(raiz, nombre), ignore_errors=True)
+            with os.scandir(self.disk_dir) as archivos:
+                for archivo in archivos:
+                    if archivo.name.endswith(".json"):
+                        estado = archivo.stat()
+                        entradas.append((estado.st_mtime_ns, archivo.name[:-len(".json")], estado.st_size))
+        except OSError:
+            pass
+        with self._lock:
+            for _, clave, tamano in sorted(entradas):
+                self._disco[clave] = tamano
+                self.disk_bytes += tamano
+            self._recortar_disco()
+
+    def _recortar_disco(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar dentro de max_disk_bytes (con el lock tomado)."""
+        while self.disk_bytes > self.max_disk_bytes and self._disco:
+            clave, tamano = self._disco.popitem(last=False)
+            self.disk_bytes -= tamano
+            self.disk_evictions += 1
+            try:
+                os.remove(self._ruta_disco(clave))
+            except OSError:
+                pass
+
+    def _guardar_memoria(self, clave: str, datos: dict):
+        self._memoria[clave] = datos
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entries:
+            self._memoria.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, clave: str, filename: str):
+        """Devuelve una copia del resultado con ARCHIVO = filename, o None si no está."""
+        with self._lock:
+            datos = self._memoria.get(clave)
+            if datos is not None:
+                self._memoria.move_to_end(clave)
+                self.hits += 1
+                return {**datos, "ARCHIVO": filename}
+
+        if self.disk_dir:
+            ruta = self._ruta_disco(clave)
+            try:
+                with open(ruta, encoding="utf-8") as fh:
+                    datos = json.load(fh)
+                    tamano = os.fstat(fh.fileno()).st_size
+                os.utime(ruta)
+            except (OSError, ValueError):
+                datos = None
+            if datos is not None:
+                with self._lock:
+                    # Puede haberlo escrito otro proceso que comparte el directorio.
+                    self.disk_bytes += tamano - self._disco.pop(clave, 0)
+                    self._disco[clave] = tamano
+                    self._guardar_memoria(clave, datos)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return {**datos, "ARCHIVO": filename}
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, clave: str, datos: dict):
+        datos = dict(datos)
+        with self._lock:
+            self._guardar_memoria(clave, datos)
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                contenido = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                fd, temporal = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(contenido)
+                os.replace(temporal, self._ruta_disco(clave))
+            except OSError:
+                # El nivel en disco es opcional: si falla, queda solo la memoria.
+                return
+            with self._lock:
+                self.disk_bytes += len(contenido) - self._disco.pop(clave, 0)
+                self._disco[clave] = len(contenido)
+                self._recortar_disco()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._memoria),
+                "max_entries": self.max_entries,
+                "disk_enabled": self.disk_dir is not None,
+                "disk_entries": len(self._disco),
+                "disk_bytes": self.disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "disk_evictions": self.disk_evictions,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
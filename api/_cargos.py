@@ -0,0 +1,197 @@
+"""
+Separación de nombre y cargo de los profesionales.
+
+Los cargos y sus alias se cargan de config/cargos.json (o de la ruta en CARGOS_CONFIG)
+y se compilan en una sola expresión regular en forma de trie sobre el texto en minúsculas
+y sin tildes. El regex solo se evalúa donde aparece la primera palabra de algún alias y
+gana el cargo más largo encontrado, de modo que "Profesional Enfermería" no pierde
+frente a "Enfermería".
+
+separar() devuelve el cargo tal como está escrito en el texto (p. ej. "Bacterióloga" o
+"profesionales de enfermeria"), como la búsqueda anterior; buscar() da además el nombre
+canónico del diccionario.
+
+get_role_matcher() vuelve a cargar el archivo cuando cambia su fecha de modificación (se
+revisa como mucho cada INTERVALO_REVISION segundos), así que editar cargos.json no requiere
+reiniciar. Los workers del pool de procesos tienen cada uno su copia y también la recargan.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+RUTA_CONFIG_DEFECTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "cargos.json")
+
+SIN_CARGO = {"nombre": "N/A", "cargo": "N/A"}
+
+# Cada cuánto se revisa la fecha de modificación del archivo de cargos, en segundos.
+INTERVALO_REVISION = 2.0
+
+
+def _sin_tilde(caracter: str) -> str:
+    base = "".join(c for c in unicodedata.normalize("NFKD", caracter) if not unicodedata.combining(c))
+    return base if len(base) == 1 else caracter
+
+
+# Tabla de traducción 1 a 1 para las letras latinas con tilde (Latin-1 y Latin Extended-A).
+_TABLA_TILDES = {
+    codigo: _sin_tilde(chr(codigo)) for codigo in range(0xC0, 0x180) if _sin_tilde(chr(codigo)) != chr(codigo)
+}
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes, conservando la longitud para poder ubicar el cargo en el original."""
+    if texto.isascii():
+        return texto.lower()
+    normalizado = unicodedata.normalize("NFD", texto).encode("ascii", "ignore").decode().lower()
+    if len(normalizado) != len(texto):
+        # Caracteres sin equivalente ASCII (p. ej. "ø" o "İ"): se normaliza carácter a carácter.
+        normalizado = "".join(
+            minuscula if len(minuscula) == 1 else caracter
+            for caracter, minuscula in ((c, c.translate(_TABLA_TILDES).lower()) for c in texto)
+        )
+    return normalizado
+
+
+def _patron_trie(nodo: dict) -> str:
+    """
+    Convierte un trie de alias en una expresión regular con prefijos factorizados.
+
+    Las ramas opcionales son codiciosas, así en cada posición se prueba primero el alias más largo.
+    """
+    ramas = []
+    for caracter, hijo in sorted((c, h) for c, h in nodo.items() if c):
+        atomo = r"\s+" if caracter == " " else re.escape(caracter)
+        ramas.append(atomo + _patron_trie(hijo))
+
+    if not ramas:
+        return ""
+    cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+    if "" in nodo:
+        return f"(?:{cuerpo})?"
+    return cuerpo
+
+
+def _anclas(palabras: set, minimo: int = 5) -> list:
+    """Agrupa palabras que comparten un prefijo de al menos `minimo` letras y devuelve los prefijos."""
+    anclas = []
+    for palabra in sorted(palabras):
+        if anclas:
+            comun = os.path.commonprefix([anclas[-1], palabra])
+            if len(comun) >= minimo:
+                anclas[-1] = comun
+                continue
+        anclas.append(palabra)
+    return anclas
+
+
+class RoleMatcher:
+    def __init__(self, cargos: list):
+        self._cargo_por_alias = {}
+        for entrada in cargos:
+            for alias in [entrada["cargo"], *entrada.get("alias", [])]:
+                clave = " ".join(normalizar(alias).split())
+                self._cargo_por_alias.setdefault(clave, entrada["cargo"])
+
+        # Identifica el diccionario compilado y la forma del cargo devuelto; forma parte de la
+        # versión de la caché de extracción.
+        self.huella = hashlib.sha256(
+            json.dumps({"alias": self._cargo_por_alias, "cargo": "texto"}, sort_keys=True, ensure_ascii=False).encode()
+        ).hexdigest()[:12]
+
+        trie = {}
+        for alias in self._cargo_por_alias:
+            nodo = trie
+            for caracter in alias:
+                nodo = nodo.setdefault(caracter, {})
+            nodo[""] = True
+        self._regex = re.compile(rf"(?<!\w){_patron_trie(trie)}(?!\w)")
+        # Prefijos comunes de la primera palabra de cada alias ("enfermer", "bacteriolog"...):
+        # el regex solo se intenta donde aparece alguno.
+        self._anclas = _anclas({alias.split()[0] for alias in self._cargo_por_alias})
+
+    @classmethod
+    def from_file(cls, ruta: str) -> "RoleMatcher":
+        with open(ruta, encoding="utf-8") as fh:
+            return cls(json.load(fh)["cargos"])
+
+    def buscar(self, texto: str):
+        """Devuelve (inicio, fin, cargo) del cargo más largo en el texto, o None."""
+        normalizado = normalizar(texto)
+        mejor = None
+        for ancla in self._anclas:
+            posicion = normalizado.find(ancla)
+            while posicion != -1:
+                match = self._regex.match(normalizado, posicion)
+                if match and (mejor is None or match.end() - match.start() > mejor.end() - mejor.start()):
+                    mejor = match
+                posicion = normalizado.find(ancla, posicion + 1)
+        if mejor is None:
+            return None
+        return mejor.start(), mejor.end(), self._cargo_por_alias[" ".join(mejor.group().split())]
+
+    def separar(self, texto) -> dict:
+        """Separa el nombre (texto anterior al cargo) del cargo del profesional."""
+        if not texto or texto == "N/A":
+            return dict(SIN_CARGO)
+
+        texto_limpio = str(texto).strip()
+        encontrado = self.buscar(texto_limpio)
+        if encontrado is None:
+            return {"nombre": texto_limpio, "cargo": "N/A"}
+
+        inicio, fin, _ = encontrado
+        return {"nombre": texto_limpio[:inicio].strip(), "cargo": " ".join(texto_limpio[inicio:fin].split())}
+
+    def separar_columna(self, textos) -> list:
+        """Aplica separar() a una columna completa, resolviendo una sola vez cada valor repetido."""
+        resueltos = {}
+        resultado = []
+        for texto in textos:
+            if not isinstance(texto, str):
+                resultado.append(self.separar(texto))
+                continue
+            if texto not in resueltos:
+                resueltos[texto] = self.separar(texto)
+            resultado.append(dict(resueltos[texto]))
+        return resultado
+
+
+_matcher = None
+_matcher_firma = None  # (ruta, mtime_ns) del archivo con el que se compiló _matcher
+_matcher_revisado = 0.0
+_matcher_lock = threading.Lock()
+
+
+def _firma(ruta: str):
+    try:
+        return ruta, os.stat(ruta).st_mtime_ns
+    except OSError:
+        return ruta, None
+
+
+def get_role_matcher() -> RoleMatcher:
+    """
+    Diccionario compilado del proceso; se recompila si cambió el archivo o la ruta de CARGOS_CONFIG.
+
+    Si el archivo nuevo no se puede leer (p. ej. JSON a medio guardar) se sigue con el anterior
+    y se vuelve a intentar en la próxima revisión.
+    """
+    global _matcher, _matcher_firma, _matcher_revisado
+    if _matcher is not None and time.monotonic() - _matcher_revisado < INTERVALO_REVISION:
+        return _matcher
+    with _matcher_lock:
+        ruta = os.getenv("CARGOS_CONFIG") or RUTA_CONFIG_DEFECTO
+        firma = _firma(ruta)
+        if _matcher is None or firma != _matcher_firma:
+            try:
+                _matcher = RoleMatcher.from_file(ruta)
+                _matcher_firma = firma
+            except (OSError, ValueError, KeyError):
+                if _matcher is None:
+                    raise
+        _matcher_revisado = time.monotonic()
+    return _matcher
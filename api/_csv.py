@@ -0,0 +1,74 @@
+"""
+Lectura de informes .csv fila por fila, sin pandas.
+
+La codificación y el separador se deducen de los primeros bytes: BOM, UTF-8 válido o,
+si no, cp1252 (las exportaciones de Excel en español); separador ",", ";", tabulador o "|",
+el que parta más filas. Luego el archivo se decodifica a medida que el lector avanza, así
+que quien deja de iterar no paga por el resto del archivo. Las filas pueden tener distinta
+cantidad de columnas.
+"""
+import codecs
+import csv
+import io
+
+TAMANO_MUESTRA = 64 * 1024
+SEPARADORES = (",", ";", "\t", "|")
+# El separador se decide con las primeras filas: con uno equivocado, una comilla sin cerrar
+# puede hacer que el lector recorra toda la muestra como un único campo.
+FILAS_MUESTRA = 60
+CARACTERES_MUESTRA_SEPARADOR = 16 * 1024
+
+
+def detectar_codificacion(muestra: bytes) -> str:
+    if muestra.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if muestra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # final=False: un carácter cortado al final de la muestra no cuenta como error.
+        codecs.getincrementaldecoder("utf-8")().decode(muestra, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        pass
+    try:
+        muestra.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def detectar_separador(texto: str) -> str:
+    """El separador con más filas de más de una columna en la muestra; en empate gana la coma."""
+    texto = texto[:CARACTERES_MUESTRA_SEPARADOR]
+    mejor, mejor_filas = SEPARADORES[0], -1
+    for separador in SEPARADORES:
+        filas = 0
+        for numero, valores in enumerate(csv.reader(io.StringIO(texto, newline=""), delimiter=separador)):
+            if numero >= FILAS_MUESTRA:
+                break
+            filas += len(valores) > 1
+        if filas > mejor_filas:
+            mejor, mejor_filas = separador, filas
+    return mejor
+
+
+def filas_csv(origen):
+    """
+    Genera las filas no vacías de un .csv (bytes o ruta) como listas de textos.
+
+    Al cerrar el generador (o dejar de usarlo) se cierra el archivo sin leer el resto.
+    """
+    binario = io.BytesIO(origen) if isinstance(origen, (bytes, bytearray)) else open(origen, "rb")
+    with binario:
+        muestra = binario.read(TAMANO_MUESTRA)
+        codificacion = detectar_codificacion(muestra)
+        inicio_texto = muestra.decode(codificacion, errors="replace")
+        separador = detectar_separador(inicio_texto)
+        binario.seek(0)
+        texto = io.TextIOWrapper(binario, encoding=codificacion, errors="replace", newline="")
+        try:
+            for valores in csv.reader(texto, delimiter=separador):
+                if valores:
+                    yield valores
+        finally:
+            texto.detach()
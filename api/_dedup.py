@@ -0,0 +1,169 @@
+"""
+Índice de deduplicación de /api/upload-results en memoria del proceso.
+
+Cada reporte guarda contenido_hash: el sha256 de sus columnas de texto sin el nombre del
+archivo (ver hash_contenido; la migración 20261018060000_reportes_contenido_hash.sql lo
+calcula igual para las filas existentes). El índice tiene, por archivo, su hash y el
+conjunto de hashes guardados, así que cada resultado se clasifica sin consultar la base:
+
+- new: ni el nombre ni el contenido están guardados; se inserta.
+- identical_duplicate: ya hay un reporte con el mismo contenido (con ese nombre u otro).
+- same_name_different_content: el nombre ya existe con otro contenido (p. ej. una
+  exportación corregida); no se reemplaza.
+
+Los reportes sin contenido (todas las columnas en "N/A" o vacías, p. ej. una plantilla en
+blanco) tienen todos el mismo hash: solo se comparan por nombre.
+
+Se carga la primera vez que se usa y luego se actualiza por marca de agua de id (solo las
+filas nuevas) cuando pasa max_atraso. Como en el espejo, cada actualización vuelve a leer
+`retroceso` ids por debajo de la marca para recoger filas confirmadas fuera de orden. La
+restricción única sobre archivo sigue siendo la que decide en la base; el índice evita el
+viaje para los duplicados que ya conoce. Supone una tabla a la que solo se agregan filas.
+"""
+import hashlib
+import threading
+import time
+
+COLUMNAS_CONTENIDO = (
+    "sede", "fecha", "nombre_profesionales_que_reciben", "cargo_profesionales_que_reciben",
+    "nombre_responsable_visita", "cargo_responsable_visita", "calificacion_obtenida", "clasificacion_riesgo",
+)
+
+NUEVO = "new"
+DUPLICADO = "identical_duplicate"
+MISMO_NOMBRE = "same_name_different_content"
+
+# Bytes del hash que se guardan en memoria por reporte.
+_BYTES_DIGEST = 16
+
+
+def hash_contenido(fila: dict) -> str:
+    """
+    sha256 (hex) de las columnas de COLUMNAS_CONTENIDO separadas por \\x1f, sin espacios en los extremos.
+
+    Equivale en Postgres a encode(sha256(convert_to(concat_ws(chr(31), coalesce(btrim(col), ''), ...), 'UTF8')), 'hex').
+    """
+    partes = ("" if fila.get(columna) is None else str(fila.get(columna)).strip(" ") for columna in COLUMNAS_CONTENIDO)
+    return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+
+def con_hash(fila: dict) -> dict:
+    """La fila con contenido_hash calculado si todavía no lo tiene."""
+    if fila.get("contenido_hash") is not None:
+        return fila
+    return {**fila, "contenido_hash": hash_contenido(fila)}
+
+
+# Hashes de un reporte sin contenido: no identifican nada, no se deduplica por ellos.
+HASHES_SIN_CONTENIDO = frozenset(
+    hash_contenido(dict.fromkeys(COLUMNAS_CONTENIDO, valor)) for valor in ("N/A", "")
+)
+
+
+def _digest(contenido_hash):
+    if not contenido_hash or contenido_hash in HASHES_SIN_CONTENIDO:
+        return None
+    return bytes.fromhex(contenido_hash)[:_BYTES_DIGEST]
+
+
+class IndiceDedup:
+    def __init__(self, max_atraso: float = 60, tamano_pagina: int = 5000, retroceso: int = 1000):
+        self.max_atraso = max_atraso
+        self.tamano_pagina = tamano_pagina
+        self.retroceso = retroceso
+        self.marca_agua = 0  # id hasta el cual el índice tiene todas las filas de la base
+        self.actualizado = None  # time.monotonic() de la última actualización completa
+        self.ultimo_error = None
+        self._por_archivo = {}
+        self._hashes = set()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def agregar(self, filas: list):
+        """Suma filas guardadas (con archivo y contenido_hash) sin mover la marca de agua."""
+        with self._lock:
+            for fila in filas:
+                digest = _digest(fila.get("contenido_hash"))
+                if fila.get("archivo") is not None:
+                    self._por_archivo[fila["archivo"]] = digest
+                if digest is not None:
+                    self._hashes.add(digest)
+
+    def actualizar(self, leer_desde) -> int:
+        """
+        Trae las filas desde `retroceso` ids antes de la marca de agua y devuelve cuántas leyó.
+
+        leer_desde(id, limite) devuelve hasta `limite` filas (id, archivo, contenido_hash) con id mayor, ordenadas por id.
+        """
+        with self._sync_lock:
+            leidas = 0
+            desde = max(self.marca_agua - self.retroceso, 0)
+            try:
+                while True:
+                    filas = leer_desde(desde, self.tamano_pagina)
+                    if filas:
+                        self.agregar(filas)
+                        leidas += len(filas)
+                        desde = max(fila["id"] for fila in filas)
+                        self.marca_agua = max(self.marca_agua, desde)
+                    if len(filas) < self.tamano_pagina:
+                        break
+            except Exception as e:
+                self.ultimo_error = str(e)
+                raise
+            self.actualizado = time.monotonic()
+            self.ultimo_error = None
+            return leidas
+
+    def al_dia(self) -> bool:
+        return self.actualizado is not None and time.monotonic() - self.actualizado <= self.max_atraso
+
+    def al_dia_o_actualizar(self, leer_desde) -> bool:
+        """Actualiza si pasó max_atraso; devuelve False si la base no respondió (el índice puede estar atrasado)."""
+        if self.al_dia():
+            return True
+        try:
+            self.actualizar(leer_desde)
+        except Exception:
+            return False
+        return True
+
+    def clasificar(self, filas: list) -> list:
+        """
+        Estado de cada fila (NUEVO, DUPLICADO o MISMO_NOMBRE) según el índice y las filas anteriores del lote.
+
+        Una fila guardada sin contenido_hash (anterior a la columna) o sin contenido solo se compara por nombre.
+        """
+        estados = []
+        archivos_lote, hashes_lote = {}, set()
+        with self._lock:
+            for fila in filas:
+                archivo, digest = fila.get("archivo"), _digest(fila.get("contenido_hash"))
+                for archivos, hashes in ((self._por_archivo, self._hashes), (archivos_lote, hashes_lote)):
+                    if archivo is not None and archivo in archivos:
+                        guardado = archivos[archivo]
+                        estado = DUPLICADO if guardado is None or guardado == digest else MISMO_NOMBRE
+                        break
+                    if digest is not None and digest in hashes:
+                        estado = DUPLICADO
+                        break
+                else:
+                    estado = NUEVO
+                    if archivo is not None:
+                        archivos_lote[archivo] = digest
+                    if digest is not None:
+                        hashes_lote.add(digest)
+                estados.append(estado)
+        return estados
+
+    def estado(self) -> dict:
+        with self._lock:
+            archivos, hashes = len(self._por_archivo), len(self._hashes)
+        return {
+            "files": archivos,
+            "hashes": hashes,
+            "watermark": self.marca_agua,
+            "age_seconds": round(time.monotonic() - self.actualizado, 1) if self.actualizado is not None else None,
+            "fresh": self.al_dia(),
+            "last_error": self.ultimo_error,
+        }
@@ -0,0 +1,274 @@
+"""
+Escritura incremental del consolidado de informes en CSV, XLSX o Parquet.
+
+Las filas se agregan a medida que se extraen; la memoria usada depende del tamaño de
+bloque y no de la cantidad de filas: CSV escribe cada fila al momento, XLSX usa el modo
+write-only de openpyxl (las filas van a un temporal en disco) y Parquet escribe un row
+group por bloque con columnas tipadas (fecha, número, entero y categoría). pyarrow solo se
+necesita para Parquet.
+
+Con una SalidaPorPartes como destino todo sale a medida que se escribe, también el XLSX:
+en ese caso no se usa openpyxl sino un libro mínimo (una hoja con cadenas en línea) que
+se escribe con zipfile en modo streaming, así la respuesta empieza sin esperar al final.
+
+En CSV los textos que empiezan con =, +, -, @, tabulador o retorno de carro llevan un
+apóstrofo delante: Excel y LibreOffice los tomarían como fórmula al abrir el archivo, y
+esos textos vienen de los informes subidos. En XLSX las celdas son cadenas y no se evalúan.
+"""
+import csv
+import io
+import os
+import re
+import zipfile
+from datetime import date
+from xml.sax.saxutils import escape
+
+from api._tipos import fecha_iso
+
+TEXTO = "texto"
+FECHA = "fecha"
+NUMERO = "numero"
+ENTERO = "entero"
+CATEGORIA = "categoria"
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+VALORES_VACIOS = {None, "", "N/A"}
+
+# Primer carácter con el que una hoja de cálculo interpreta la celda de un CSV como fórmula.
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def a_fecha(valor):
+    """Fecha de la celda a date, con las mismas reglas que fecha_iso (ISO, día/mes/año, "9 de enero de 2026"...)."""
+    iso = fecha_iso(valor)
+    return date.fromisoformat(iso) if iso else None
+
+
+def a_numero(valor):
+    if valor in VALORES_VACIOS:
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return float(str(valor).strip().replace(",", "."))
+    except ValueError:
+        return None
+
+
+def a_entero(valor):
+    numero = a_numero(valor)
+    return int(numero) if numero is not None else None
+
+
+def a_texto(valor):
+    return None if valor in VALORES_VACIOS else str(valor)
+
+
+def _celda_csv(valor):
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+class SalidaPorPartes(io.RawIOBase):
+    """Destino no posicionable que junta lo escrito hasta que se retira con tomar()."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._escritos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._escritos += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._escritos
+
+    def tomar(self) -> bytes:
+        parte = b"".join(self._partes)
+        self._partes = []
+        return parte
+
+
+# Caracteres que XML no admite (las celdas se escriben sin ellos).
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_XLSX_ESTATICOS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Reportes" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celda_xlsx(valor) -> str:
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f"<c><v>{valor}</v></c>"
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_NO_XML.sub("", str(valor)))}</t></is></c>'
+
+
+class _XlsxEnPartes:
+    """Libro .xlsx de una hoja escrito fila por fila en un destino no posicionable."""
+
+    def __init__(self, destino, nombres: list):
+        self._zip = zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED)
+        for nombre, contenido in _XLSX_ESTATICOS.items():
+            self._zip.writestr(nombre, contenido)
+        # force_zip64: en modo streaming el tamaño de la hoja no se conoce de antemano.
+        self._hoja = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._hoja.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self.append(nombres)
+
+    def append(self, valores: list):
+        self._hoja.write(("<row>" + "".join(map(_celda_xlsx, valores)) + "</row>").encode("utf-8"))
+
+    def cerrar(self):
+        self._hoja.write(b"</sheetData></worksheet>")
+        self._hoja.close()
+        self._zip.close()
+
+
+class EscritorConsolidado:
+    """
+    Agrega filas (dict) a un archivo consolidado.
+
+    destino es una ruta, un archivo binario abierto o una SalidaPorPartes (no se cierra al
+    terminar). columnas es una lista de (nombre, tipo); los tipos solo se aplican en Parquet,
+    CSV y XLSX guardan el texto.
+    """
+
+    def __init__(self, destino, formato: str, columnas: list, tamano_bloque: int = 1000):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}. Use uno de: {', '.join(FORMATOS)}.")
+        self.formato = formato
+        self.columnas = columnas
+        self.nombres = [nombre for nombre, _ in columnas]
+        self.tamano_bloque = max(int(tamano_bloque), 1)
+        self.filas = 0
+        self._destino = destino
+        self._bloque = []
+
+        if formato == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as exc:
+                raise RuntimeError("El formato parquet requiere pyarrow (pip install pyarrow).") from exc
+            self._pa = pa
+            tipos = {
+                TEXTO: pa.string(),
+                FECHA: pa.date32(),
+                NUMERO: pa.float64(),
+                ENTERO: pa.int64(),
+                CATEGORIA: pa.dictionary(pa.int32(), pa.string()),
+            }
+            self._esquema = pa.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas])
+            self._escritor = pq.ParquetWriter(destino, self._esquema)
+        elif formato == "xlsx" and isinstance(destino, SalidaPorPartes):
+            self._hoja = _XlsxEnPartes(destino, self.nombres)
+        elif formato == "xlsx":
+            from openpyxl import Workbook
+
+            self._libro = Workbook(write_only=True)
+            self._hoja = self._libro.create_sheet("Reportes")
+            self._hoja.append(self.nombres)
+        else:
+            self._archivo = open(destino, "wb") if isinstance(destino, (str, os.PathLike)) else None
+            self._texto = io.TextIOWrapper(self._archivo or destino, encoding="utf-8", newline="")
+            self._csv = csv.writer(self._texto)
+            self._csv.writerow(self.nombres)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def escribir(self, fila: dict):
+        self.filas += 1
+        if self.formato == "parquet":
+            self._bloque.append(fila)
+            if len(self._bloque) >= self.tamano_bloque:
+                self._escribir_bloque()
+        elif self.formato == "xlsx":
+            self._hoja.append([fila.get(nombre) for nombre in self.nombres])
+        else:
+            self._csv.writerow([_celda_csv(fila.get(nombre)) for nombre in self.nombres])
+
+    def vaciar(self):
+        """Pasa al destino lo que el CSV tenga en buffer (para enviarlo por partes)."""
+        if self.formato == "csv":
+            self._texto.flush()
+
+    def _escribir_bloque(self):
+        if not self._bloque:
+            return
+        conversiones = {TEXTO: a_texto, FECHA: a_fecha, NUMERO: a_numero, ENTERO: a_entero, CATEGORIA: a_texto}
+        datos = {
+            nombre: [conversiones[tipo](fila.get(nombre)) for fila in self._bloque]
+            for nombre, tipo in self.columnas
+        }
+        self._escritor.write_table(self._pa.Table.from_pydict(datos, schema=self._esquema))
+        self._bloque = []
+
+    def cerrar(self):
+        if self.formato == "parquet":
+            self._escribir_bloque()
+            self._escritor.close()
+        elif self.formato == "xlsx" and isinstance(self._hoja, _XlsxEnPartes):
+            self._hoja.cerrar()
+        elif self.formato == "xlsx":
+            self._libro.save(self._destino)
+        else:
+            self._texto.flush()
+            if self._archivo is not None:
+                self._texto.close()
+            else:
+                self._texto.detach()
+
@@ -0,0 +1,154 @@
+"""
+Estado persistente de los trabajos de /api/jobs.
+
+Cada trabajo guarda sus archivos (o los miembros de su .zip) en una fila por archivo con
+su resultado o su error, así que el avance sobrevive a un reinicio: al reanudar solo se
+procesan los archivos que siguen pendientes. El latido indica que algún proceso lo está
+ejecutando; si se vence, otro proceso puede retomarlo.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+PENDIENTE = "pending"
+OK = "ok"
+ERROR = "error"
+
+EN_COLA = "queued"
+EN_CURSO = "running"
+TERMINADO = "done"
+CANCELADO = "cancelled"
+FALLIDO = "failed"
+ACTIVOS = (EN_COLA, EN_CURSO)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    latido REAL,
+    total INTEGER NOT NULL,
+    procesados INTEGER NOT NULL DEFAULT 0,
+    errores INTEGER NOT NULL DEFAULT 0,
+    detalle TEXT,
+    carga TEXT
+);
+CREATE TABLE IF NOT EXISTS job_archivos (
+    job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    indice INTEGER NOT NULL,
+    archivo TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    miembro TEXT,
+    estado TEXT NOT NULL,
+    datos TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, indice)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_estado ON jobs (estado);
+"""
+
+
+class JobStore:
+    def __init__(self, ruta: str):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(ESQUEMA)
+
+    def crear(self, job_id: str, archivos: list):
+        """archivos: [(nombre, ruta en disco, miembro del .zip o None)]."""
+        ahora = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, estado, creado, actualizado, total) VALUES (?, ?, ?, ?, ?)",
+                (job_id, EN_COLA, ahora, ahora, len(archivos)),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_archivos (job_id, indice, archivo, ruta, miembro, estado) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, indice, nombre, ruta, miembro, PENDIENTE)
+                 for indice, (nombre, ruta, miembro) in enumerate(archivos)],
+            )
+
+    def obtener(self, job_id: str):
+        with self._lock:
+            fila = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(fila) if fila is not None else None
+
+    def activos(self) -> list:
+        with self._lock:
+            filas = self._conn.execute(
+                f"SELECT * FROM jobs WHERE estado IN ({', '.join('?' * len(ACTIVOS))})", ACTIVOS
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def pendientes(self, job_id: str) -> list:
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT indice, archivo, ruta, miembro FROM job_archivos WHERE job_id = ? AND estado = ? ORDER BY indice",
+                (job_id, PENDIENTE),
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def marcar(self, job_id: str, estado: str, detalle: str = None, solo_si_activo: bool = True) -> bool:
+        """Cambia el estado; por defecto no toca trabajos ya terminados o cancelados."""
+        ahora = time.time()
+        condicion = f" AND estado IN ({', '.join('?' * len(ACTIVOS))})" if solo_si_activo else ""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET estado = ?, detalle = coalesce(?, detalle), actualizado = ?, latido = ? "
+                f"WHERE id = ?{condicion}",
+                (estado, detalle, ahora, ahora, job_id, *(ACTIVOS if solo_si_activo else ())),
+            )
+        return cursor.rowcount == 1
+
+    def guardar_resultado(self, job_id: str, indice: int, datos, error) -> str:
+        """Guarda el resultado de un archivo (una sola vez) y devuelve el estado actual del trabajo."""
+        ahora = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE job_archivos SET estado = ?, datos = ?, error = ? "
+                "WHERE job_id = ? AND indice = ? AND estado = ?",
+                (
+                    OK if error is None else ERROR,
+                    json.dumps(datos, ensure_ascii=False) if error is None else None,
+                    error, job_id, indice, PENDIENTE,
+                ),
+            )
+            if cursor.rowcount == 1:
+                columna = "procesados" if error is None else "errores"
+                self._conn.execute(
+                    f"UPDATE jobs SET {columna} = {columna} + 1, actualizado = ?, latido = ? WHERE id = ?",
+                    (ahora, ahora, job_id),
+                )
+            fila = self._conn.execute("SELECT estado FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return fila["estado"] if fila is not None else CANCELADO
+
+    def resultados(self, job_id: str, cursor: int = None, limite: int = None) -> list:
+        """Archivos ya procesados con índice mayor que el cursor, en orden."""
+        sql = "SELECT indice, archivo, estado, datos, error FROM job_archivos WHERE job_id = ? AND estado != ?"
+        parametros = [job_id, PENDIENTE]
+        if cursor is not None:
+            sql += " AND indice > ?"
+            parametros.append(cursor)
+        sql += " ORDER BY indice"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        with self._lock:
+            filas = self._conn.execute(sql, parametros).fetchall()
+        return [
+            {**dict(fila), "datos": json.loads(fila["datos"]) if fila["datos"] is not None else None}
+            for fila in filas
+        ]
+
+    def guardar_carga(self, job_id: str, resumen: dict):
+        """Resultado de enviar el trabajo a /api/upload-results."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET carga = ?, actualizado = ? WHERE id = ?",
+                (json.dumps(resumen, ensure_ascii=False), time.time(), job_id),
+            )
@@ -0,0 +1,229 @@
+"""
+Ubicación de los campos del informe a partir de sus etiquetas.
+
+En lugar de coordenadas fijas, se recorren las primeras columnas de la hoja una vez y se
+arma un índice etiqueta -> celda ("FECHA :", "SEDE / CLIENTE:", "CALIFICACIÓN OBTENIDA"...);
+el valor de cada campo está en la celda a la derecha de su etiqueta. El layout resuelto se
+guarda por huella de plantilla (rango declarado de la hoja), y los archivos siguientes con
+la misma huella leen directamente esas coordenadas, verificando de paso que las etiquetas
+sigan en su sitio.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from api._cargos import normalizar
+from api._csv import filas_csv
+from api._xlsx import VALORES_NA
+
+# Etiquetas aceptadas para cada campo, en minúsculas, sin tildes, con espacios simples y sin
+# los ":" finales. La celda debe ser exactamente una de ellas: por prefijo, "fecha" también
+# reconocería textos como "Fecha de seguimiento". Una variante nueva de la plantilla se agrega aquí.
+ETIQUETAS_CAMPOS = {
+    "fecha": ("fecha", "fecha de la visita", "fecha de visita"),
+    "sede": ("sede / cliente", "sede/cliente", "sede"),
+    "profesionales": (
+        "nombre y cargo de los profesionales que reciben la visita",
+        "nombre y cargo de los profesionales que reciben",
+    ),
+    "responsable": (
+        "nombre y cargo responsable de realizar la visita",
+        "nombre y cargo del responsable de realizar la visita",
+        "nombre y cargo responsable de la visita",
+    ),
+    "calificacion": ("calificacion obtenida",),
+    "riesgo": ("clasificacion por riesgo", "clasificacion de riesgo"),
+}
+
+# Campo de cada etiqueta aceptada.
+CAMPO_POR_ETIQUETA = {etiqueta: campo for campo, etiquetas in ETIQUETAS_CAMPOS.items() for etiqueta in etiquetas}
+
+# Rectángulo donde se buscan las etiquetas (desde A1) y desplazamiento del valor respecto a ella.
+FILAS_ESCANEO = 60
+COLUMNAS_ETIQUETA = 3
+DESPLAZAMIENTO_VALOR = (0, 1)
+
+
+def normalizar_etiqueta(valor) -> str:
+    return " ".join(normalizar(str(valor)).split()).rstrip(" :")
+
+
+def campo_de_etiqueta(valor):
+    """Campo cuya etiqueta es el texto de la celda, o None."""
+    return CAMPO_POR_ETIQUETA.get(normalizar_etiqueta(valor))
+
+
+class Layout:
+    """Coordenadas (fila, columna) base 0 de la etiqueta y del valor de cada campo encontrado."""
+
+    def __init__(self, etiquetas: dict):
+        self.etiquetas = etiquetas
+        self.valores = {
+            campo: (fila + DESPLAZAMIENTO_VALOR[0], col + DESPLAZAMIENTO_VALOR[1])
+            for campo, (fila, col) in etiquetas.items()
+        }
+        self.faltantes = sorted(set(ETIQUETAS_CAMPOS) - set(etiquetas))
+        self.id = hashlib.sha256(json.dumps(sorted(etiquetas.items())).encode()).hexdigest()[:8]
+
+    @classmethod
+    def desde_celdas(cls, celdas: dict) -> "Layout":
+        """Resuelve los campos en una pasada sobre {(fila, columna): valor}; gana la primera etiqueta."""
+        pendientes = set(ETIQUETAS_CAMPOS)
+        etiquetas = {}
+        for coordenada in sorted(celdas):
+            if coordenada[1] >= COLUMNAS_ETIQUETA or not isinstance(celdas[coordenada], str):
+                continue
+            campo = campo_de_etiqueta(celdas[coordenada])
+            if campo in pendientes:
+                etiquetas[campo] = coordenada
+                pendientes.discard(campo)
+                if not pendientes:
+                    break
+        return cls(etiquetas)
+
+    def coordenadas_lectura(self) -> dict:
+        """Celdas a leer con el layout en caché: los valores y las etiquetas para verificarlo."""
+        return {
+            **{("valor", campo): coordenada for campo, coordenada in self.valores.items()},
+            **{("etiqueta", campo): coordenada for campo, coordenada in self.etiquetas.items()},
+        }
+
+    def verificar(self, leidas: dict) -> bool:
+        """Comprueba, con lo leído por coordenadas_lectura(), que cada etiqueta sigue en su celda."""
+        return all(campo_de_etiqueta(leidas[("etiqueta", campo)] or "") == campo for campo in self.etiquetas)
+
+    def valores_de(self, celdas: dict) -> dict:
+        """Valor de cada campo (None si falta la etiqueta) a partir de {(fila, columna): valor}."""
+        return {campo: celdas.get(self.valores[campo]) if campo in self.valores else None
+                for campo in ETIQUETAS_CAMPOS}
+
+    def describir(self) -> dict:
+        return {
+            "id": self.id,
+            "etiquetas": {campo: list(coordenada) for campo, coordenada in self.etiquetas.items()},
+            "valores": {campo: list(coordenada) for campo, coordenada in self.valores.items()},
+            "faltantes": self.faltantes,
+        }
+
+
+class LayoutCache:
+    """Layouts resueltos por huella de plantilla (LRU acotado, propio de cada proceso)."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+
+    def get(self, huella: str):
+        with self._lock:
+            layout = self._layouts.get(huella)
+            if layout is None:
+                self.misses += 1
+                return None
+            self._layouts.move_to_end(huella)
+            self.hits += 1
+            return layout
+
+    def put(self, huella: str, layout: Layout):
+        with self._lock:
+            self._layouts[huella] = layout
+            self._layouts.move_to_end(huella)
+            while len(self._layouts) > self.max_entries:
+                self._layouts.popitem(last=False)
+
+    def descartar(self, huella: str):
+        """La plantilla cambió aunque la huella coincida: se vuelve a escanear."""
+        with self._lock:
+            self._layouts.pop(huella, None)
+            self.mismatches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._layouts),
+                "hits": self.hits,
+                "misses": self.misses,
+                "mismatches": self.mismatches,
+                "layouts": {huella: layout.describir() for huella, layout in self._layouts.items()},
+            }
+
+
+def resolver_xlsx(libro, cache: LayoutCache):
+    """
+    Devuelve (layout, {campo: valor}) de un LibroXlsx.
+
+    Con la huella en caché solo se leen las celdas de los campos y sus etiquetas; si no está,
+    o las etiquetas ya no coinciden, se escanea el rectángulo de etiquetas una vez.
+    Un layout con campos faltantes no se guarda: el siguiente archivo con la misma huella
+    podría tener esas etiquetas, y con el layout en caché nunca se buscarían.
+    """
+    huella = f"xlsx:{libro.dimension()}"
+    layout = cache.get(huella)
+    if layout is not None:
+        leidas = libro.leer_celdas(layout.coordenadas_lectura())
+        if layout.verificar(leidas):
+            return layout, {campo: leidas.get(("valor", campo)) for campo in ETIQUETAS_CAMPOS}
+        cache.descartar(huella)
+
+    celdas = libro.leer_region(FILAS_ESCANEO, COLUMNAS_ETIQUETA + DESPLAZAMIENTO_VALOR[1])
+    layout = Layout.desde_celdas(celdas)
+    if not layout.faltantes:
+        cache.put(huella, layout)
+    return layout, layout.valores_de(celdas)
+
+
+def resolver_csv(origen):
+    """
+    Devuelve (layout, {campo: valor}) de un .csv (bytes o ruta) sin pasar por pandas.
+
+    Las celdas quedan como las dejaría pd.read_csv(header=None): los textos de VALORES_NA
+    son vacíos y las líneas en blanco no cuentan como fila. La lectura termina en la fila
+    donde aparece la última etiqueta (el valor está en la misma fila), o a las FILAS_ESCANEO
+    filas, así que el costo no depende de cuántas filas vengan después del encabezado.
+    La codificación y el separador se detectan en api/_csv.py.
+    """
+    columnas = COLUMNAS_ETIQUETA + DESPLAZAMIENTO_VALOR[1]
+    pendientes = set(ETIQUETAS_CAMPOS)  # misma regla que Layout.desde_celdas: gana la primera etiqueta
+    celdas = {}
+    filas = filas_csv(origen)
+    try:
+        for fila, valores in enumerate(filas):
+            if fila >= FILAS_ESCANEO:
+                break
+            for col, valor in enumerate(valores[:columnas]):
+                if valor not in VALORES_NA:
+                    celdas[(fila, col)] = valor
+                    if col < COLUMNAS_ETIQUETA and pendientes:
+                        pendientes.discard(campo_de_etiqueta(valor))
+            if not pendientes and DESPLAZAMIENTO_VALOR[0] == 0:
+                break
+    finally:
+        filas.close()
+    layout = Layout.desde_celdas(celdas)
+    return layout, layout.valores_de(celdas)
+
+
+def resolver_dataframe(df):
+    """Devuelve (layout, {campo: valor}) de un DataFrame leído con header=None."""
+    filas = min(df.shape[0], FILAS_ESCANEO)
+    columnas = min(df.shape[1], COLUMNAS_ETIQUETA + DESPLAZAMIENTO_VALOR[1])
+    celdas = {}
+    for fila in range(filas):
+        for col in range(columnas):
+            valor = df.iat[fila, col]
+            if isinstance(valor, str) or not es_nulo(valor):
+                celdas[(fila, col)] = valor
+    layout = Layout.desde_celdas(celdas)
+    return layout, layout.valores_de(celdas)
+
+
+def es_nulo(valor) -> bool:
+    """None, NaN o NaT, sin depender de pandas."""
+    try:
+        return valor is None or valor != valor
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,224 @@
+"""
+Métricas por etapa en formato Prometheus y cabecera Server-Timing.
+
+Cada petición a /api/* lleva un registro de etapas (lectura, extraccion, limpieza, db...)
+en un ContextVar; las etapas se miden con `etapa("nombre")` y van a histogramas con la
+ruta como etiqueta. Las extracciones del pool de procesos corren dentro de recolectar_etapas
+(con extraer_en_lote de api/index.py), que devuelve sus etapas junto con el resultado, y
+sumar_etapas las agrega en el proceso principal.
+
+Los contadores son de cada proceso: en Vercel cada instancia expone los suyos.
+Con METRICS_ENABLED=0 no se instala el middleware y etapa() no mide nada.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+ACTIVO = os.getenv("METRICS_ENABLED", "1") != "0"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_BYTES = tuple(1024 * 4 ** i for i in range(11))  # 1 KiB .. 1 GiB
+BUCKETS_ARCHIVOS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_peticion = ContextVar("peticion_metricas", default=None)
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple, buckets: tuple):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._series = {}  # valores de etiquetas -> [conteos por bucket..., +Inf], suma
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][bisect_left(self.buckets, valor)] += 1
+            serie[1] += valor
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items())
+        for clave, conteos, suma in series:
+            base = ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(self.etiquetas, clave))
+            separador = "," if base else ""
+            acumulado = 0
+            for limite, conteo in zip((*self.buckets, "+Inf"), conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{base}{separador}le="{limite}"}} {acumulado}')
+            lineas.append(f"{self.nombre}_sum{{{base}}} {suma}")
+            lineas.append(f"{self.nombre}_count{{{base}}} {acumulado}")
+        return lineas
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+PETICIONES = Histograma(
+    "reportes_request_seconds", "Duración de las peticiones por ruta.", ("ruta", "metodo", "estado"), BUCKETS_SEGUNDOS
+)
+ETAPAS = Histograma(
+    "reportes_stage_seconds", "Duración de cada etapa (lectura, extraccion, limpieza, db) por ruta.",
+    ("ruta", "etapa"), BUCKETS_SEGUNDOS,
+)
+BYTES_LEIDOS = Histograma("reportes_read_bytes", "Bytes leídos por archivo recibido.", ("ruta",), BUCKETS_BYTES)
+ARCHIVOS_LOTE = Histograma("reportes_batch_files", "Archivos por lote.", ("ruta",), BUCKETS_ARCHIVOS)
+DB = Histograma("reportes_db_seconds", "Latencia de las llamadas a la base por operación.", ("operacion",), BUCKETS_SEGUNDOS)
+
+HISTOGRAMAS = (PETICIONES, ETAPAS, BYTES_LEIDOS, ARCHIVOS_LOTE, DB)
+
+
+def exponer() -> str:
+    """Todas las métricas en el formato de texto de Prometheus."""
+    return "\n".join(linea for histograma in HISTOGRAMAS for linea in histograma.exponer()) + "\n"
+
+
+class _Peticion:
+    __slots__ = ("scope", "etapas")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.etapas = {}
+
+    @property
+    def ruta(self) -> str:
+        # El router de Starlette agrega "route" al scope al resolver la ruta.
+        route = self.scope.get("route")
+        return getattr(route, "path", "otra")
+
+
+def ruta_actual() -> str:
+    peticion = _peticion.get()
+    return peticion.ruta if peticion is not None else "-"
+
+
+def sumar_etapa(nombre: str, segundos: float):
+    """Registra una etapa ya medida (p. ej. en otro proceso) en la petición en curso."""
+    peticion = _peticion.get()
+    if peticion is None:
+        ETAPAS.observar(segundos, "-", nombre)
+        return
+    peticion.etapas[nombre] = peticion.etapas.get(nombre, 0.0) + segundos
+    ETAPAS.observar(segundos, peticion.ruta, nombre)
+
+
+def sumar_etapas(etapas: dict):
+    for nombre, segundos in etapas.items():
+        sumar_etapa(nombre, segundos)
+
+
+class _Etapa:
+    __slots__ = ("nombre", "destino", "inicio")
+
+    def __init__(self, nombre: str, destino):
+        self.nombre = nombre
+        self.destino = destino
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        if self.destino is None:
+            sumar_etapa(self.nombre, segundos)
+        else:
+            self.destino[self.nombre] = self.destino.get(self.nombre, 0.0) + segundos
+
+
+class _SinMedir:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_SIN_MEDIR = _SinMedir()
+_destino_etapas = ContextVar("destino_etapas", default=None)
+
+
+def etapa(nombre: str):
+    """Context manager que mide una etapa; sin métricas activas no hace nada."""
+    if not ACTIVO:
+        return _SIN_MEDIR
+    return _Etapa(nombre, _destino_etapas.get())
+
+
+def recolectar_etapas(funcion, *args):
+    """
+    Ejecuta funcion(*args) juntando sus etapas en un dict en lugar de observarlas.
+
+    Sirve para el código que corre en otro hilo o proceso (sin el ContextVar de la
+    petición): devuelve (resultado, etapas) y quien lo recibe llama a sumar_etapas().
+    """
+    etapas = {}
+    token = _destino_etapas.set(etapas)
+    try:
+        return funcion(*args), etapas
+    finally:
+        _destino_etapas.reset(token)
+
+
+def observar_bytes(cantidad: int):
+    if ACTIVO:
+        BYTES_LEIDOS.observar(cantidad, ruta_actual())
+
+
+def observar_lote(archivos: int):
+    if ACTIVO:
+        ARCHIVOS_LOTE.observar(archivos, ruta_actual())
+
+
+def observar_db(operacion: str, segundos: float):
+    if ACTIVO:
+        DB.observar(segundos, operacion)
+        sumar_etapa("db", segundos)
+
+
+def server_timing(etapas: dict, total: float) -> bytes:
+    partes = [f"{nombre};dur={segundos * 1000:.1f}" for nombre, segundos in etapas.items()]
+    partes.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(partes).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: abre el registro de etapas de cada petición a /api/* y mide su duración."""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        peticion = _Peticion(scope)
+        token = _peticion.set(peticion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                if self.server_timing:
+                    cabecera = server_timing(peticion.etapas, time.perf_counter() - inicio)
+                    mensaje["headers"] = [*mensaje.get("headers", []), (b"server-timing", cabecera)]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            PETICIONES.observar(time.perf_counter() - inicio, peticion.ruta, scope["method"], str(estado))
+            _peticion.reset(token)
@@ -0,0 +1,125 @@
+"""
+Espejo local (SQLite) de reportes_procesados para las consultas analíticas.
+
+Es una SQLiteReports con las mismas consultas de /api/stats, alimentada desde Supabase por
+marca de agua de id: cada sincronización trae solo las filas con id mayor que la última
+copiada, por páginas. upload_results además escribe en el espejo las filas que acaba de
+insertar, así se ven antes de la siguiente sincronización (que las vuelve a traer y las ignora).
+
+La marca de agua solo avanza al sincronizar, de modo que las filas que otro proceso inserte
+entre medio no quedan saltadas. Los ids se asignan al insertar pero las transacciones pueden
+confirmarse en otro orden: una fila con id menor que la marca puede aparecer después de
+sincronizar. Por eso cada sincronización vuelve a leer desde `retroceso` ids por debajo de la
+marca (REPORTS_MIRROR_LOOKBACK); las que ya estaban se ignoran al copiar.
+Las filas borradas o modificadas en Supabase no se reflejan: el espejo supone una tabla a la
+que solo se agregan filas.
+Se activa con REPORTS_MIRROR_PATH.
+"""
+import threading
+import time
+
+from api._dedup import con_hash
+from api._sqlite import COLUMNAS_REPORTE, TABLA, SQLiteReports
+from api._tipos import con_tipos
+
+ESQUEMA_ESPEJO = """
+CREATE TABLE IF NOT EXISTS espejo_meta (
+    clave TEXT PRIMARY KEY,
+    valor
+);
+"""
+
+
+class EspejoReportes(SQLiteReports):
+    def __init__(self, ruta: str, max_atraso: float = 60, tamano_pagina: int = 1000, retroceso: int = 1000):
+        super().__init__(ruta)
+        self.max_atraso = max_atraso
+        self.tamano_pagina = tamano_pagina
+        self.retroceso = retroceso
+        self.sincronizado = None  # time.monotonic() de la última sincronización completa
+        self.ultimo_error = None
+        self._sync_lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(ESQUEMA_ESPEJO)
+
+    def marca_agua(self) -> int:
+        """Id hasta el cual el espejo tiene todas las filas de la base."""
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM espejo_meta WHERE clave = 'marca_agua'").fetchone()
+        return fila["valor"] if fila is not None else 0
+
+    def copiar(self, filas: list) -> int:
+        """Guarda filas de la base con su id; las que ya están se ignoran. Devuelve cuántas eran nuevas."""
+        columnas = ", ".join(COLUMNAS_REPORTE)
+        marcadores = ", ".join(f":{columna}" for columna in COLUMNAS_REPORTE)
+        sql = f"INSERT OR IGNORE INTO {TABLA} ({columnas}) VALUES ({marcadores})"
+        with self._lock, self._conn:
+            # rowcount y no total_changes: este último también cuenta lo que escriben los triggers de tendencias.
+            cursor = self._conn.executemany(
+                sql, [{c: fila.get(c) for c in COLUMNAS_REPORTE} for fila in map(con_hash, map(con_tipos, filas))]
+            )
+            return cursor.rowcount
+
+    def sincronizar(self, leer_desde) -> int:
+        """
+        Copia las filas nuevas de la base y devuelve cuántas agregó.
+
+        leer_desde(id, limite) devuelve hasta `limite` filas con id mayor, ordenadas por id.
+        La lectura empieza `retroceso` ids antes de la marca de agua para recoger las filas
+        confirmadas fuera de orden.
+        """
+        with self._sync_lock:
+            nuevas = 0
+            marca = self.marca_agua()
+            desde = max(marca - self.retroceso, 0)
+            try:
+                while True:
+                    filas = leer_desde(desde, self.tamano_pagina)
+                    if filas:
+                        nuevas += self.copiar(filas)
+                        desde = max(fila["id"] for fila in filas)
+                        marca = max(marca, desde)
+                        with self._lock, self._conn:
+                            self._conn.execute(
+                                "INSERT INTO espejo_meta (clave, valor) VALUES ('marca_agua', ?) "
+                                "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor",
+                                (marca,),
+                            )
+                    if len(filas) < self.tamano_pagina:
+                        break
+            except Exception as e:
+                self.ultimo_error = str(e)
+                raise
+            self.sincronizado = time.monotonic()
+            self.ultimo_error = None
+            return nuevas
+
+    def atraso(self):
+        """Segundos desde la última sincronización completa (None si nunca se sincronizó)."""
+        return None if self.sincronizado is None else time.monotonic() - self.sincronizado
+
+    def al_dia(self) -> bool:
+        atraso = self.atraso()
+        return atraso is not None and atraso <= self.max_atraso
+
+    def al_dia_o_sincronizar(self, leer_desde) -> bool:
+        """Sincroniza si pasó max_atraso; devuelve False si el espejo sigue atrasado (la base no respondió)."""
+        if self.al_dia():
+            return True
+        try:
+            self.sincronizar(leer_desde)
+        except Exception:
+            return False
+        return True
+
+    def estado(self) -> dict:
+        atraso = self.atraso()
+        with self._lock:
+            filas = self._conn.execute(f"SELECT count(*) FROM {TABLA}").fetchone()[0]
+        return {
+            "rows": filas,
+            "watermark": self.marca_agua(),
+            "age_seconds": round(atraso, 1) if atraso is not None else None,
+            "fresh": self.al_dia(),
+            "last_error": self.ultimo_error,
+        }
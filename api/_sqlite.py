@@ -0,0 +1,345 @@
+"""
+Base SQLite local que reemplaza a Supabase para desarrollo y pruebas.
+
+Tiene el mismo esquema que la tabla reportes_procesados y calcula los agregados de
+/api/stats con SQL equivalente a las funciones reportes_stats y reportes_stats_detalle
+de supabase/migrations.
+Se activa con REPORTS_SQLITE_PATH.
+Los filtros por fecha y riesgo usan las columnas tipadas (ver api/_tipos.py).
+contenido_hash identifica el contenido de cada reporte para la deduplicación (ver api/_dedup.py).
+"""
+import sqlite3
+import threading
+
+from api._dedup import COLUMNAS_CONTENIDO, con_hash, hash_contenido
+from api._tipos import COLUMNAS_TIPADAS, columnas_tipadas, con_tipos
+
+TABLA = "reportes_procesados"
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS {TABLA} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    archivo TEXT,
+    sede TEXT,
+    fecha TEXT,
+    nombre_profesionales_que_reciben TEXT,
+    cargo_profesionales_que_reciben TEXT,
+    nombre_responsable_visita TEXT,
+    cargo_responsable_visita TEXT,
+    calificacion_obtenida TEXT,
+    clasificacion_riesgo TEXT,
+    fecha_dia TEXT,
+    calificacion REAL,
+    riesgo TEXT CHECK (riesgo IN ('alto', 'moderado', 'bajo')),
+    contenido_hash TEXT
+);
+"""
+
+# Columnas agregadas después de creada la tabla: se suman a las bases existentes al abrirlas.
+COLUMNAS_NUEVAS = {
+    "fecha_dia": "TEXT",
+    "calificacion": "REAL",
+    "riesgo": "TEXT CHECK (riesgo IN ('alto', 'moderado', 'bajo'))",
+    "contenido_hash": "TEXT",
+}
+
+INDICES = f"""
+CREATE INDEX IF NOT EXISTS idx_{TABLA}_fecha ON {TABLA} (fecha);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_{TABLA}_archivo ON {TABLA} (archivo);
+CREATE INDEX IF NOT EXISTS idx_{TABLA}_sede_id ON {TABLA} (sede, id);
+CREATE INDEX IF NOT EXISTS idx_{TABLA}_fecha_dia ON {TABLA} (fecha_dia);
+CREATE INDEX IF NOT EXISTS idx_{TABLA}_riesgo_fecha_dia ON {TABLA} (riesgo, fecha_dia);
+CREATE INDEX IF NOT EXISTS idx_{TABLA}_contenido_hash ON {TABLA} (contenido_hash);
+"""
+
+COLUMNAS = (
+    "archivo", "sede", "fecha", "nombre_profesionales_que_reciben", "cargo_profesionales_que_reciben",
+    "nombre_responsable_visita", "cargo_responsable_visita", "calificacion_obtenida", "clasificacion_riesgo",
+    *COLUMNAS_TIPADAS, "contenido_hash",
+)
+
+COLUMNAS_REPORTE = ("id", "created_at", *COLUMNAS)
+
+_FILTRO_FECHAS = (
+    "(:start_date IS NULL OR fecha_dia >= :start_date) AND (:end_date IS NULL OR fecha_dia <= :end_date)"
+)
+
+# Un riesgo NULL (fila sin clasificar) cuenta como moderado, igual que en los rollups de tendencias.
+SQL_TOTALES = f"""
+SELECT
+    count(*) AS total_visits,
+    count(DISTINCT sede) AS sedes_count,
+    coalesce(sum(coalesce(riesgo, 'moderado') = 'alto'), 0) AS alto,
+    coalesce(sum(coalesce(riesgo, 'moderado') = 'moderado'), 0) AS moderado,
+    coalesce(sum(coalesce(riesgo, 'moderado') = 'bajo'), 0) AS bajo,
+    coalesce(sum(:month_prefix IS NOT NULL AND substr(fecha_dia, 1, length(:month_prefix)) = :month_prefix), 0)
+        AS visits_this_month
+FROM {TABLA} WHERE {_FILTRO_FECHAS}
+"""
+
+SQL_PERSONAL = f"""
+SELECT nombre_responsable_visita AS nombre, count(*) AS cantidad
+FROM {TABLA}
+WHERE {_FILTRO_FECHAS} AND nombre_responsable_visita IS NOT NULL
+GROUP BY nombre_responsable_visita
+ORDER BY cantidad DESC, max(fecha_dia) DESC NULLS LAST, nombre
+LIMIT 10
+"""
+
+SQL_SEDES = f"""
+SELECT sede, count(*) AS cantidad FROM {TABLA}
+WHERE {_FILTRO_FECHAS} AND sede IS NOT NULL
+GROUP BY sede
+"""
+
+SQL_PERSONAL_DETALLE = f"""
+SELECT nombre_responsable_visita AS nombre, count(*) AS cantidad, max(fecha_dia) AS ultima
+FROM {TABLA}
+WHERE {_FILTRO_FECHAS} AND nombre_responsable_visita IS NOT NULL
+GROUP BY nombre_responsable_visita
+"""
+
+SQL_RECIENTES = f"SELECT * FROM {TABLA} WHERE {_FILTRO_FECHAS} ORDER BY fecha DESC NULLS LAST LIMIT :limite"
+
+# Rollups de /api/trends por (mes, sede, riesgo, responsable), igual que la tabla
+# reportes_tendencias de supabase/migrations. Los triggers los mantienen al insertar,
+# modificar o borrar reportes; las filas sin fecha_dia no tienen mes y no entran.
+TENDENCIAS = "reportes_tendencias"
+
+
+def _sumar_tendencia(fila: str, signo: int) -> str:
+    return f"""
+    INSERT INTO {TENDENCIAS} (mes, sede, riesgo, responsable, visitas, suma_calificacion, con_calificacion)
+    SELECT substr({fila}.fecha_dia, 1, 7), coalesce({fila}.sede, ''), coalesce({fila}.riesgo, 'moderado'),
+           coalesce({fila}.nombre_responsable_visita, ''), {signo}, {signo} * coalesce({fila}.calificacion, 0),
+           {signo} * ({fila}.calificacion IS NOT NULL)
+    WHERE {fila}.fecha_dia IS NOT NULL
+    ON CONFLICT (mes, sede, riesgo, responsable) DO UPDATE SET
+        visitas = visitas + excluded.visitas,
+        suma_calificacion = suma_calificacion + excluded.suma_calificacion,
+        con_calificacion = con_calificacion + excluded.con_calificacion;
+"""
+
+
+ESQUEMA_TENDENCIAS = f"""
+CREATE TABLE IF NOT EXISTS {TENDENCIAS} (
+    mes TEXT NOT NULL,
+    sede TEXT NOT NULL,
+    riesgo TEXT NOT NULL,
+    responsable TEXT NOT NULL,
+    visitas INTEGER NOT NULL DEFAULT 0,
+    suma_calificacion REAL NOT NULL DEFAULT 0,
+    con_calificacion INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes, sede, riesgo, responsable)
+);
+CREATE TRIGGER IF NOT EXISTS trg_{TENDENCIAS}_insert AFTER INSERT ON {TABLA}
+BEGIN {_sumar_tendencia("NEW", 1)} END;
+CREATE TRIGGER IF NOT EXISTS trg_{TENDENCIAS}_delete AFTER DELETE ON {TABLA}
+BEGIN {_sumar_tendencia("OLD", -1)} END;
+CREATE TRIGGER IF NOT EXISTS trg_{TENDENCIAS}_update
+AFTER UPDATE OF fecha_dia, sede, riesgo, nombre_responsable_visita, calificacion ON {TABLA}
+BEGIN {_sumar_tendencia("OLD", -1)} {_sumar_tendencia("NEW", 1)} END;
+"""
+
+SQL_TENDENCIAS_CALCULO = f"""
+SELECT substr(fecha_dia, 1, 7) AS mes, coalesce(sede, '') AS sede, coalesce(riesgo, 'moderado') AS riesgo,
+       coalesce(nombre_responsable_visita, '') AS responsable, count(*) AS visitas,
+       coalesce(sum(calificacion), 0) AS suma_calificacion, count(calificacion) AS con_calificacion
+FROM {TABLA}
+WHERE fecha_dia IS NOT NULL
+GROUP BY 1, 2, 3, 4
+"""
+
+# agrupar: 'sede', 'riesgo', 'responsable' o NULL (una serie con el total de cada mes).
+SQL_TENDENCIAS = f"""
+SELECT
+    mes,
+    CASE :agrupar WHEN 'sede' THEN sede WHEN 'riesgo' THEN riesgo WHEN 'responsable' THEN responsable END AS clave,
+    sum(visitas) AS visitas,
+    sum(suma_calificacion) AS suma_calificacion,
+    sum(con_calificacion) AS con_calificacion,
+    sum(CASE riesgo WHEN 'alto' THEN visitas ELSE 0 END) AS alto,
+    sum(CASE riesgo WHEN 'moderado' THEN visitas ELSE 0 END) AS moderado,
+    sum(CASE riesgo WHEN 'bajo' THEN visitas ELSE 0 END) AS bajo
+FROM {TENDENCIAS}
+WHERE (:desde IS NULL OR mes >= :desde) AND (:hasta IS NULL OR mes <= :hasta) AND (:sede IS NULL OR sede = :sede)
+GROUP BY 1, 2
+HAVING sum(visitas) > 0
+ORDER BY 1, 2
+"""
+
+
+class SQLiteReports:
+    def __init__(self, ruta: str):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(ESQUEMA)
+            existentes = {fila["name"] for fila in self._conn.execute(f"PRAGMA table_info({TABLA})")}
+            for columna, tipo in COLUMNAS_NUEVAS.items():
+                if columna not in existentes:
+                    self._conn.execute(f"ALTER TABLE {TABLA} ADD COLUMN {columna} {tipo}")
+            self._conn.executescript(INDICES)
+            self._conn.executescript(ESQUEMA_TENDENCIAS)
+            sin_tendencias = (
+                self._conn.execute(f"SELECT 1 FROM {TENDENCIAS} LIMIT 1").fetchone() is None
+                and self._conn.execute(f"SELECT 1 FROM {TABLA} LIMIT 1").fetchone() is not None
+            )
+        self.completar_tipos()
+        self.completar_hashes()
+        if sin_tendencias:
+            # Base creada antes de los rollups: se calculan una vez; desde ahí los mantienen los triggers.
+            self.reconstruir_tendencias()
+
+    def insertar(self, filas: list) -> list:
+        """
+        Inserta filas con las columnas de map_result_to_db_row y devuelve solo las guardadas.
+
+        Las filas cuyo archivo ya existe se ignoran (ON CONFLICT DO NOTHING), igual que el upsert de Supabase.
+        """
+        marcadores = ", ".join(f":{columna}" for columna in COLUMNAS)
+        sql = (
+            f"INSERT INTO {TABLA} ({', '.join(COLUMNAS)}) VALUES ({marcadores}) "
+            "ON CONFLICT (archivo) DO NOTHING RETURNING *"
+        )
+        insertadas = []
+        with self._lock, self._conn:
+            for fila in filas:
+                fila = con_hash(con_tipos(fila))
+                guardada = self._conn.execute(sql, {c: fila.get(c) for c in COLUMNAS}).fetchone()
+                if guardada is not None:
+                    insertadas.append(dict(guardada))
+        return insertadas
+
+    def stats(self, start_date=None, end_date=None, month_prefix=None) -> dict:
+        """Mismo resultado que la función reportes_stats de Postgres."""
+        parametros = {"start_date": start_date, "end_date": end_date, "month_prefix": month_prefix}
+        with self._lock:
+            totales = dict(self._conn.execute(SQL_TOTALES, parametros).fetchone())
+            personal = [dict(fila) for fila in self._conn.execute(SQL_PERSONAL, parametros)]
+        return {**totales, "visits_by_personnel": personal}
+
+    def stats_detalle(self, start_date=None, end_date=None, month_prefix=None) -> dict:
+        """Mismo resultado que la función reportes_stats_detalle de Postgres."""
+        parametros = {"start_date": start_date, "end_date": end_date, "month_prefix": month_prefix}
+        with self._lock:
+            totales = dict(self._conn.execute(SQL_TOTALES, parametros).fetchone())
+            sedes = {fila["sede"]: fila["cantidad"] for fila in self._conn.execute(SQL_SEDES, parametros)}
+            personal = [dict(fila) for fila in self._conn.execute(SQL_PERSONAL_DETALLE, parametros)]
+        return {**totales, "sedes": sedes, "personal": personal}
+
+    def pagina(self, campos: list, limite: int, cursor=None, sede=None, start_date=None, end_date=None,
+               riesgo=None) -> list:
+        """Página de reportes por id descendente (keyset: solo ids menores que el cursor)."""
+        if any(campo not in COLUMNAS_REPORTE for campo in campos):
+            raise ValueError(f"Campos no válidos: {campos}")
+        sql = f"""
+            SELECT {", ".join(campos)} FROM {TABLA}
+            WHERE {_FILTRO_FECHAS}
+              AND (:cursor IS NULL OR id < :cursor)
+              AND (:sede IS NULL OR sede = :sede)
+              AND (:riesgo IS NULL OR riesgo = :riesgo)
+            ORDER BY id DESC LIMIT :limite
+        """
+        parametros = {"start_date": start_date, "end_date": end_date, "cursor": cursor, "sede": sede,
+                      "riesgo": riesgo, "limite": limite}
+        with self._lock:
+            return [dict(fila) for fila in self._conn.execute(sql, parametros)]
+
+    def recientes(self, start_date=None, end_date=None, limite: int = 10) -> list:
+        parametros = {"start_date": start_date, "end_date": end_date, "limite": limite}
+        with self._lock:
+            return [dict(fila) for fila in self._conn.execute(SQL_RECIENTES, parametros)]
+
+    def completar_tipos(self, lote: int = 1000, todas: bool = False, desde_id: int = 0) -> int:
+        """
+        Calcula las columnas tipadas de las filas que no las tienen (backfill); devuelve cuántas actualizó.
+
+        Con todas=True las recalcula en todas las filas.
+        """
+        actualizadas = 0
+        ultimo = desde_id
+        condicion = "" if todas else "riesgo IS NULL AND "
+        while True:
+            with self._lock:
+                filas = self._conn.execute(
+                    f"SELECT * FROM {TABLA} WHERE {condicion}id > ? ORDER BY id LIMIT ?", (ultimo, lote)
+                ).fetchall()
+            if not filas:
+                return actualizadas
+            cambios = [{**dict(fila), **columnas_tipadas(dict(fila))} for fila in filas]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"UPDATE {TABLA} SET fecha_dia = :fecha_dia, calificacion = :calificacion, riesgo = :riesgo "
+                    "WHERE id = :id",
+                    cambios,
+                )
+            actualizadas += len(cambios)
+            ultimo = filas[-1]["id"]
+
+    def completar_hashes(self, lote: int = 1000) -> int:
+        """Calcula contenido_hash de las filas que no lo tienen; devuelve cuántas actualizó."""
+        actualizadas = 0
+        ultimo = 0
+        while True:
+            with self._lock:
+                filas = self._conn.execute(
+                    f"SELECT id, {', '.join(COLUMNAS_CONTENIDO)} FROM {TABLA} "
+                    "WHERE contenido_hash IS NULL AND id > ? ORDER BY id LIMIT ?",
+                    (ultimo, lote),
+                ).fetchall()
+            if not filas:
+                return actualizadas
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"UPDATE {TABLA} SET contenido_hash = ? WHERE id = ?",
+                    [(hash_contenido(dict(fila)), fila["id"]) for fila in filas],
+                )
+            actualizadas += len(filas)
+            ultimo = filas[-1]["id"]
+
+    def claves_desde(self, desde_id: int, limite: int) -> list:
+        """Filas (id, archivo, contenido_hash) con id mayor que desde_id, por id; alimentan api/_dedup.py."""
+        with self._lock:
+            return [
+                dict(fila) for fila in self._conn.execute(
+                    f"SELECT id, archivo, contenido_hash FROM {TABLA} WHERE id > ? ORDER BY id LIMIT ?",
+                    (desde_id, limite),
+                )
+            ]
+
+    def tendencias(self, agrupar=None, desde=None, hasta=None, sede=None) -> list:
+        """Series por mes desde los rollups (mismo resultado que la función reportes_tendencias de Postgres)."""
+        parametros = {"agrupar": agrupar, "desde": desde, "hasta": hasta, "sede": sede}
+        with self._lock:
+            return [dict(fila) for fila in self._conn.execute(SQL_TENDENCIAS, parametros)]
+
+    def reconstruir_tendencias(self) -> dict:
+        """Recalcula los rollups desde los reportes y cuenta los grupos que no coincidían con los incrementales."""
+        with self._lock, self._conn:
+            calculados = {
+                (f["mes"], f["sede"], f["riesgo"], f["responsable"]): (f["visitas"], f["suma_calificacion"], f["con_calificacion"])
+                for f in self._conn.execute(SQL_TENDENCIAS_CALCULO)
+            }
+            actuales = {
+                (f["mes"], f["sede"], f["riesgo"], f["responsable"]): (f["visitas"], f["suma_calificacion"], f["con_calificacion"])
+                for f in self._conn.execute(f"SELECT * FROM {TENDENCIAS} WHERE visitas != 0")
+            }
+            self._conn.execute(f"DELETE FROM {TENDENCIAS}")
+            self._conn.executemany(
+                f"INSERT INTO {TENDENCIAS} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*clave, *valores) for clave, valores in calculados.items()],
+            )
+        diferencias = sum(
+            1 for clave in calculados.keys() | actuales.keys()
+            if not _mismos_valores(calculados.get(clave), actuales.get(clave))
+        )
+        return {"groups": len(calculados), "mismatched_groups": diferencias}
+
+
+def _mismos_valores(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return a[0] == b[0] and a[2] == b[2] and abs(a[1] - b[1]) < 1e-6
@@ -0,0 +1,217 @@
+"""
+Caché de /api/stats por rango de fechas.
+
+Los datos solo cambian cuando /api/upload-results inserta filas, así que cada respuesta se
+guarda por (start_date, end_date, mes actual) y upload_results avisa las filas insertadas.
+Las ventanas con estado detallado (todo el histórico y el mes en curso) guardan los
+contadores por sede y por responsable y se actualizan sumando las filas nuevas; el resto
+de rangos solo se invalida si alguna fila nueva cae dentro de ellos.
+
+La caché vive en cada proceso: solo ve las inserciones hechas por ese mismo proceso. Con
+varios workers o instancias, lo que suba otro proceso no aparece hasta que la entrada
+expira (STATS_CACHE_TTL, 300 s por defecto).
+"""
+import calendar
+import threading
+import time
+from collections import OrderedDict
+
+RIESGOS = ("alto", "moderado", "bajo")
+MAX_RECIENTES = 10
+MAX_PERSONAL = 10
+
+
+def clasificar_riesgo(valor) -> str:
+    """Misma regla que la función reportes_stats: alto, bajo o, en cualquier otro caso, moderado."""
+    texto = str(valor or "").lower()
+    if "alto" in texto:
+        return "alto"
+    if "bajo" in texto:
+        return "bajo"
+    return "moderado"
+
+
+def en_rango(fecha, start_date, end_date) -> bool:
+    """Replica el filtro de fechas de la consulta sobre fecha_dia (sin fecha solo entra sin filtros)."""
+    if fecha is None:
+        return start_date is None and end_date is None
+    return (start_date is None or fecha >= start_date) and (end_date is None or fecha <= end_date)
+
+
+def es_ventana_incremental(start_date, end_date, month_prefix: str) -> bool:
+    """Todo el histórico o el mes en curso (desde el día 1, hasta fin de mes o sin fin)."""
+    if start_date is None and end_date is None:
+        return True
+    anio, mes = (int(parte) for parte in month_prefix.split("-"))
+    fin_de_mes = f"{month_prefix}-{calendar.monthrange(anio, mes)[1]:02d}"
+    return start_date == f"{month_prefix}-01" and end_date in (None, fin_de_mes)
+
+
+class EstadoStats:
+    """Contadores completos de una ventana, suficientes para sumarle filas nuevas sin volver a la base."""
+
+    def __init__(self, month_prefix: str):
+        self.month_prefix = month_prefix
+        self.total = 0
+        self.riesgos = dict.fromkeys(RIESGOS, 0)
+        self.visitas_mes = 0
+        self.sedes = {}
+        self.personal = {}  # nombre -> [cantidad, última fecha]
+        self.recientes = []
+
+    @classmethod
+    def desde_detalle(cls, month_prefix: str, detalle: dict, recientes: list) -> "EstadoStats":
+        """Parte del resultado de reportes_stats_detalle y de los reportes más recientes."""
+        estado = cls(month_prefix)
+        estado.total = int(detalle["total_visits"])
+        estado.riesgos = {riesgo: int(detalle[riesgo]) for riesgo in RIESGOS}
+        estado.visitas_mes = int(detalle["visits_this_month"])
+        estado.sedes = {sede: int(cantidad) for sede, cantidad in (detalle.get("sedes") or {}).items()}
+        estado.personal = {
+            p["nombre"]: [int(p["cantidad"]), p.get("ultima")] for p in detalle.get("personal") or []
+        }
+        estado.recientes = list(recientes[:MAX_RECIENTES])
+        return estado
+
+    @classmethod
+    def desde_filas(cls, month_prefix: str, filas: list) -> "EstadoStats":
+        estado = cls(month_prefix)
+        estado.agregar(filas)
+        return estado
+
+    def agregar(self, filas: list):
+        for fila in filas:
+            self.total += 1
+            self.riesgos[fila.get("riesgo") or clasificar_riesgo(fila.get("clasificacion_riesgo"))] += 1
+            # Filas de una tabla sin columnas tipadas (antes de la migración): se usa el texto.
+            fecha = fila["fecha_dia"] if "fecha_dia" in fila else fila.get("fecha")
+            if fecha is not None and fecha.startswith(self.month_prefix):
+                self.visitas_mes += 1
+            sede = fila.get("sede")
+            if sede is not None:
+                self.sedes[sede] = self.sedes.get(sede, 0) + 1
+            nombre = fila.get("nombre_responsable_visita")
+            if nombre is not None:
+                cantidad, ultima = self.personal.get(nombre, (0, None))
+                if fecha is not None and (ultima is None or fecha > ultima):
+                    ultima = fecha
+                self.personal[nombre] = [cantidad + 1, ultima]
+
+        # Las filas nuevas van primero entre las de igual fecha; sin fecha, al final (las consultas
+        # de recientes piden NULLS LAST para que Postgres, que por defecto los pone primero, coincida).
+        recientes = list(filas) + self.recientes
+        recientes.sort(key=lambda fila: fila.get("fecha") or "", reverse=True)
+        self.recientes = recientes[:MAX_RECIENTES]
+
+    def agregados(self) -> dict:
+        """Mismo formato que la función reportes_stats."""
+        personal = sorted(self.personal.items(), key=lambda item: item[0])
+        personal.sort(key=lambda item: item[1][1] or "", reverse=True)
+        personal.sort(key=lambda item: item[1][0], reverse=True)
+        return {
+            "total_visits": self.total,
+            "sedes_count": len(self.sedes),
+            **self.riesgos,
+            "visits_this_month": self.visitas_mes,
+            "visits_by_personnel": [
+                {"nombre": nombre, "cantidad": cantidad} for nombre, (cantidad, _) in personal[:MAX_PERSONAL]
+            ],
+        }
+
+
+class _Entrada:
+    __slots__ = ("respuesta", "estado", "consultado", "actualizaciones")
+
+    def __init__(self, respuesta: dict, estado):
+        self.respuesta = respuesta
+        self.estado = estado
+        self.consultado = time.monotonic()
+        self.actualizaciones = 0
+
+
+class StatsCache:
+    def __init__(self, construir_respuesta, ttl: float = 300, max_entries: int = 64):
+        self._construir = construir_respuesta
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        # Aumenta con cada inserción; un cálculo que empezó antes no se guarda.
+        self.generacion = 0
+        self.hits = 0
+        self.misses = 0
+        self.incrementales = 0
+        self.invalidaciones = 0
+
+    def get(self, clave: tuple):
+        """Devuelve la respuesta guardada con los datos de la caché, o None si no hay o expiró."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            edad = time.monotonic() - entrada.consultado if entrada is not None else None
+            if entrada is None or (self.ttl and edad > self.ttl):
+                self._entradas.pop(clave, None)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return {**entrada.respuesta, "cache": self._info(entrada, edad, hit=True)}
+
+    def put(self, clave: tuple, respuesta: dict, estado=None, generacion: int = None) -> dict:
+        """Guarda la respuesta recién calculada y la devuelve con los datos de la caché."""
+        entrada = _Entrada(respuesta, estado)
+        with self._lock:
+            if generacion is None or generacion == self.generacion:
+                self._entradas[clave] = entrada
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entries:
+                    self._entradas.popitem(last=False)
+        return {**respuesta, "cache": self._info(entrada, 0.0, hit=False)}
+
+    def registrar_insercion(self, filas: list):
+        """Suma las filas insertadas a las ventanas con estado e invalida los demás rangos afectados."""
+        if not filas:
+            return
+        with self._lock:
+            self.generacion += 1
+            for clave, entrada in list(self._entradas.items()):
+                start_date, end_date, _ = clave
+                nuevas = [
+                    fila for fila in filas
+                    if en_rango(fila["fecha_dia"] if "fecha_dia" in fila else fila.get("fecha"), start_date, end_date)
+                ]
+                if not nuevas:
+                    continue
+                if entrada.estado is None:
+                    del self._entradas[clave]
+                    self.invalidaciones += 1
+                    continue
+                entrada.estado.agregar(nuevas)
+                entrada.respuesta = self._construir(entrada.estado.agregados(), entrada.estado.recientes)
+                entrada.actualizaciones += 1
+                self.incrementales += 1
+
+    def clear(self):
+        with self._lock:
+            self.generacion += 1
+            self._entradas.clear()
+
+    @staticmethod
+    def _info(entrada: _Entrada, edad: float, hit: bool) -> dict:
+        return {
+            "hit": hit,
+            "age_seconds": round(edad, 3),
+            "incremental": entrada.estado is not None,
+            "incremental_updates": entrada.actualizaciones,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entradas),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "incremental_updates": self.incrementales,
+                "invalidations": self.invalidaciones,
+            }
@@ -0,0 +1,86 @@
+"""
+Columnas tipadas de cada reporte, calculadas una sola vez al guardarlo.
+
+Junto al texto original (fecha, calificacion_obtenida, clasificacion_riesgo) se guardan
+fecha_dia (fecha ISO), calificacion (número) y riesgo (alto, moderado o bajo), de modo que
+los filtros por rango y los conteos usan índices en lugar de comparar texto fila por fila.
+Los valores que no se pueden interpretar quedan en NULL; el riesgo siempre tiene valor
+(con la regla de siempre: sin "alto" ni "bajo" es moderado).
+"""
+import re
+from datetime import date, datetime, timedelta
+
+from api._stats import clasificar_riesgo
+
+COLUMNAS_TIPADAS = ("fecha_dia", "calificacion", "riesgo")
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+_ISO = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[ T].*)?$")
+_DIA_PRIMERO = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})(?:\s.*)?$")
+_TEXTO = re.compile(r"^(\d{1,2})\s+de\s+([a-záéíóú]+)\s+(?:de\s+|del\s+)?(\d{4})$")
+_NUMERO = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+# Números de serie de Excel (días desde 1899-12-30) que pueden ser una fecha de informe.
+_SERIE_EXCEL = (20000, 80000)
+
+
+def _fecha(anio: int, mes: int, dia: int):
+    try:
+        return date(anio, mes, dia).isoformat()
+    except ValueError:
+        return None
+
+
+def fecha_iso(valor):
+    """Fecha ISO (YYYY-MM-DD) del texto de la celda, o None si no es una fecha."""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    texto = str(valor or "").strip().lower()
+    if not texto or texto == "n/a":
+        return None
+
+    encontrado = _ISO.match(texto)
+    if encontrado:
+        anio, mes, dia = (int(parte) for parte in encontrado.groups())
+        return _fecha(anio, mes, dia)
+    encontrado = _DIA_PRIMERO.match(texto)
+    if encontrado:
+        # Los informes usan día/mes/año.
+        dia, mes, anio = (int(parte) for parte in encontrado.groups())
+        return _fecha(anio, mes, dia)
+    encontrado = _TEXTO.match(texto)
+    if encontrado and encontrado.group(2) in MESES:
+        return _fecha(int(encontrado.group(3)), MESES[encontrado.group(2)], int(encontrado.group(1)))
+    if texto.replace(".", "", 1).isdigit() and _SERIE_EXCEL[0] <= float(texto) < _SERIE_EXCEL[1]:
+        return (date(1899, 12, 30) + timedelta(days=int(float(texto)))).isoformat()
+    return None
+
+
+def calificacion_numero(valor):
+    """Primer número del texto (admite coma decimal), o None."""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    encontrado = _NUMERO.search(str(valor or ""))
+    return float(encontrado.group().replace(",", ".")) if encontrado else None
+
+
+def columnas_tipadas(fila: dict) -> dict:
+    """fecha_dia, calificacion y riesgo de una fila con las columnas de texto de la tabla."""
+    return {
+        "fecha_dia": fecha_iso(fila.get("fecha")),
+        "calificacion": calificacion_numero(fila.get("calificacion_obtenida")),
+        "riesgo": clasificar_riesgo(fila.get("clasificacion_riesgo")),
+    }
+
+
+def con_tipos(fila: dict) -> dict:
+    """La fila con las columnas tipadas calculadas si todavía no las tiene (filas anteriores a ellas)."""
+    if fila.get("riesgo") is not None:
+        return fila
+    return {**fila, **columnas_tipadas(fila)}
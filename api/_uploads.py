@@ -0,0 +1,294 @@
+"""
+Archivos recibidos con memoria acotada.
+
+Cada archivo se copia por bloques a un Contenido: si no pasa de un umbral queda en
+memoria, si no va a un temporal en disco y la extracción lee desde esa ruta. El hash para
+la caché se calcula durante la copia. Las peticiones reservan sus bytes en un presupuesto
+global de bytes en vuelo y los devuelven archivo por archivo a medida que terminan.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from api._cache import clave_hash
+
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class UploadLimitError(ValueError):
+    """Un archivo o la petición supera alguno de los límites de tamaño (413), o no hay presupuesto libre (503)."""
+
+    def __init__(self, mensaje: str, status_code: int = 413):
+        super().__init__(mensaje)
+        self.status_code = status_code
+
+
+class Contenido:
+    """
+    Bytes de un archivo: en memoria (datos) o en disco (ruta).
+
+    Los temporales se borran al descartarlo; los archivos que no son temporales (los de un
+    trabajo de /api/jobs) quedan en su lugar.
+    """
+
+    __slots__ = ("nombre", "clave", "tamano", "datos", "ruta", "temporal")
+
+    def __init__(self, nombre: str, clave: str, tamano: int, datos: bytes = None, ruta: str = None,
+                 temporal: bool = True):
+        self.nombre = nombre
+        self.clave = clave
+        self.tamano = tamano
+        self.datos = datos
+        self.ruta = ruta
+        self.temporal = temporal
+
+    @property
+    def origen(self):
+        """Lo que recibe extract_data: los bytes o la ruta del temporal."""
+        return self.datos if self.datos is not None else self.ruta
+
+    def descartar(self):
+        self.datos = None
+        if self.ruta is not None and self.temporal:
+            try:
+                os.unlink(self.ruta)
+            except FileNotFoundError:
+                pass
+            self.ruta = None
+
+
+class Acumulador:
+    """Junta los bloques de un archivo; al pasar limite_memoria los vuelca a un temporal."""
+
+    def __init__(self, nombre: str, limite_memoria: int, max_bytes: int = None):
+        self.nombre = nombre
+        self.limite_memoria = limite_memoria
+        self.max_bytes = max_bytes
+        self.tamano = 0
+        self._hash = hashlib.sha256()
+        self._partes = []
+        self._archivo = None
+
+    def agregar(self, bloque: bytes):
+        self.tamano += len(bloque)
+        if self.max_bytes is not None and self.tamano > self.max_bytes:
+            self.cancelar()
+            raise UploadLimitError(f"{self.nombre} supera el máximo de {self.max_bytes} bytes por archivo.")
+        self._hash.update(bloque)
+        if self._archivo is None and self.tamano > self.limite_memoria:
+            extension = os.path.splitext(self.nombre.lower())[1]
+            self._archivo = tempfile.NamedTemporaryFile(prefix="subida-", suffix=extension, delete=False)
+            self._archivo.writelines(self._partes)
+            self._partes = []
+        if self._archivo is not None:
+            self._archivo.write(bloque)
+        else:
+            self._partes.append(bloque)
+
+    def terminar(self) -> Contenido:
+        clave = clave_hash(self._hash.hexdigest(), self.nombre)
+        if self._archivo is None:
+            return Contenido(self.nombre, clave, self.tamano, datos=b"".join(self._partes))
+        self._archivo.close()
+        return Contenido(self.nombre, clave, self.tamano, ruta=self._archivo.name)
+
+    def cancelar(self):
+        self._partes = []
+        if self._archivo is not None:
+            self._archivo.close()
+            os.unlink(self._archivo.name)
+            self._archivo = None
+
+
+def copiar_archivo(fh, nombre: str, limite_memoria: int, max_bytes: int = None) -> Contenido:
+    """Copia un archivo binario abierto a un Contenido (bloqueante: correr en un hilo)."""
+    acumulador = Acumulador(nombre, limite_memoria, max_bytes)
+    try:
+        while True:
+            bloque = fh.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            acumulador.agregar(bloque)
+    except BaseException:
+        acumulador.cancelar()
+        raise
+    return acumulador.terminar()
+
+
+def contenido_en_disco(ruta: str, nombre: str) -> Contenido:
+    """Contenido de un archivo que ya está en disco: solo calcula su hash (bloqueante)."""
+    sha = hashlib.sha256()
+    tamano = 0
+    with open(ruta, "rb") as fh:
+        while True:
+            bloque = fh.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            sha.update(bloque)
+            tamano += len(bloque)
+    return Contenido(nombre, clave_hash(sha.hexdigest(), nombre), tamano, ruta=ruta, temporal=False)
+
+
+def guardar_archivo(fh, destino: str, nombre: str, max_bytes: int = None) -> int:
+    """Copia un archivo binario abierto a destino por bloques y devuelve los bytes escritos (bloqueante)."""
+    tamano = 0
+    try:
+        with open(destino, "wb") as salida:
+            while True:
+                bloque = fh.read(TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                tamano += len(bloque)
+                if max_bytes is not None and tamano > max_bytes:
+                    raise UploadLimitError(f"{nombre} supera el máximo de {max_bytes} bytes.")
+                salida.write(bloque)
+    except BaseException:
+        os.unlink(destino)
+        raise
+    return tamano
+
+
+def validar_tamanos(archivos: list, max_archivo: int, max_peticion: int) -> int:
+    """Revisa los tamaños declarados [(nombre, bytes)] antes de leer nada y devuelve el total."""
+    for nombre, tamano in archivos:
+        if tamano > max_archivo:
+            raise UploadLimitError(
+                f"{nombre} pesa {tamano} bytes; el máximo por archivo es {max_archivo} bytes (UPLOAD_MAX_FILE_BYTES)."
+            )
+    total = sum(tamano for _, tamano in archivos)
+    if total > max_peticion:
+        raise UploadLimitError(
+            f"La petición suma {total} bytes; el máximo por petición es {max_peticion} bytes "
+            "(UPLOAD_MAX_REQUEST_BYTES)."
+        )
+    return total
+
+
+class PresupuestoEnVuelo:
+    """Bytes de archivos recibidos que este proceso tiene en uso entre todas las peticiones."""
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        self.en_uso = 0
+        self.rechazadas = 0
+        self._lock = threading.Lock()
+
+    def reservar(self, cantidad: int) -> "Reserva":
+        with self._lock:
+            self._admitir(cantidad)
+            self.en_uso += cantidad
+        return Reserva(self, cantidad)
+
+    def revisar(self, cantidad: int):
+        """Como reservar pero sin apartar nada: rechaza (503) una petición antes de leer su cuerpo."""
+        with self._lock:
+            self._admitir(cantidad)
+
+    def _admitir(self, cantidad: int):
+        if self.en_uso + cantidad > self.limite:
+            self.rechazadas += 1
+            raise UploadLimitError(
+                f"El servidor ya tiene {self.en_uso} bytes de archivos en proceso y esta petición suma "
+                f"{cantidad}; el máximo es {self.limite} bytes (UPLOAD_MAX_INFLIGHT_BYTES). "
+                "Intente de nuevo en unos segundos.",
+                status_code=503,
+            )
+
+    def _devolver(self, cantidad: int):
+        with self._lock:
+            self.en_uso -= cantidad
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limit_bytes": self.limite, "in_flight_bytes": self.en_uso, "rejected": self.rechazadas}
+
+
+class Reserva:
+    """Lo reservado por una petición; se devuelve por archivo con liberar() y el resto con cerrar()."""
+
+    def __init__(self, presupuesto: PresupuestoEnVuelo, cantidad: int):
+        self._presupuesto = presupuesto
+        self._lock = threading.Lock()
+        self.restante = cantidad
+
+    def liberar(self, cantidad: int):
+        with self._lock:
+            cantidad = min(cantidad, self.restante)
+            self.restante -= cantidad
+        if cantidad:
+            self._presupuesto._devolver(cantidad)
+
+    def cerrar(self):
+        self.liberar(self.restante)
+
+    def __del__(self):
+        # Respaldo si la respuesta se abandona antes de empezar (p. ej. el cliente se desconecta).
+        self.cerrar()
+
+
+class LimiteCuerpo:
+    """
+    Middleware ASGI: rechaza las subidas demasiado grandes antes de que se lea el formulario.
+
+    Sin esto Starlette copia todo el multipart a temporales y solo después _reservar_subidas
+    revisa los tamaños. Con Content-Length se responde 413 (pasa el límite de la ruta) o 503
+    (no cabe en el presupuesto libre) sin leer el cuerpo; sin él (chunked) se cuentan los bytes
+    a medida que llegan y se corta con 413 al pasar el límite. El margen cubre las cabeceras y
+    separadores del multipart, que no cuentan en los límites de los archivos.
+    """
+
+    def __init__(self, app, limites: dict, presupuesto: PresupuestoEnVuelo, margen: int = 64 * 1024):
+        self.app = app
+        self.limites = limites  # ruta -> (bytes máximos, variable de entorno)
+        self.presupuesto = presupuesto
+        self.margen = margen
+
+    async def __call__(self, scope, receive, send):
+        limite = self.limites.get(scope["path"]) if scope["type"] == "http" else None
+        if limite is None:
+            await self.app(scope, receive, send)
+            return
+        maximo, variable = limite
+
+        longitud = dict(scope["headers"]).get(b"content-length", b"")
+        if longitud.isdigit():
+            archivos = max(int(longitud) - self.margen, 0)
+            try:
+                if archivos > maximo:
+                    raise UploadLimitError(
+                        f"La petición declara {int(longitud)} bytes; el máximo es {maximo} bytes ({variable})."
+                    )
+                self.presupuesto.revisar(archivos)
+            except UploadLimitError as e:
+                await _responder_limite(send, e)
+                return
+
+        recibidos = 0
+
+        async def recibir():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > maximo + self.margen:
+                    from fastapi import HTTPException
+
+                    # Se levanta dentro de la lectura del formulario: FastAPI la deja pasar como 413.
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"La petición supera el máximo de {maximo} bytes ({variable}).",
+                    )
+            return mensaje
+
+        await self.app(scope, recibir, send)
+
+
+async def _responder_limite(send, error: UploadLimitError):
+    cuerpo = json.dumps({"detail": str(error)}).encode("utf-8")
+    cabeceras = [(b"content-type", b"application/json"), (b"content-length", str(len(cuerpo)).encode())]
+    if error.status_code == 503:
+        cabeceras.append((b"retry-after", b"5"))
+    await send({"type": "http.response.start", "status": error.status_code, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": cuerpo})
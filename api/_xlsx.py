@@ -0,0 +1,259 @@
+"""
+Lector de celdas puntuales para archivos .xlsx.
+
+Recorre el XML de la primera hoja en streaming y se detiene al pasar la última
+fila necesaria. Solo resuelve las cadenas compartidas y los estilos que usan las
+celdas pedidas, y entrega cada valor tal como lo haría pd.read_excel(header=None).
+
+Única diferencia conocida: pandas infiere el tipo de la columna completa, así que si
+todas las celdas de una columna fueran numéricas convertiría los enteros a float
+("450.0"). En la plantilla de informe la columna C siempre tiene textos, por lo que
+el resultado coincide.
+
+openpyxl (sus utilidades de fechas y formatos) se importa al leer el primer libro, no al
+cargar el módulo.
+"""
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+TAG_ROW = f"{NS_MAIN}row"
+TAG_CELDA = f"{NS_MAIN}c"
+TAG_VALOR = f"{NS_MAIN}v"
+TAG_DIMENSION = f"{NS_MAIN}dimension"
+TAG_SHEET_DATA = f"{NS_MAIN}sheetData"
+
+# Valores que pandas convierte a NaN al leer con los parámetros por defecto.
+VALORES_NA = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+def _texto(nodo) -> str:
+    """Contenido plano de un <si> o <is>, igual que openpyxl (sin textos fonéticos)."""
+    partes = []
+    plano = nodo.find(f"{NS_MAIN}t")
+    if plano is not None and plano.text:
+        partes.append(plano.text)
+    for bloque in nodo.iterfind(f"{NS_MAIN}r/{NS_MAIN}t"):
+        if bloque.text:
+            partes.append(bloque.text)
+    return "".join(partes)
+
+
+def _partes_libro(zf: zipfile.ZipFile):
+    """Devuelve (hoja, sharedStrings, styles, epoch) de la primera hoja del libro."""
+    primera_hoja = None
+    fecha1904 = False
+    with zf.open("xl/workbook.xml") as fh:
+        for _, nodo in iterparse(fh):
+            if nodo.tag == f"{NS_MAIN}workbookPr":
+                fecha1904 = nodo.get("date1904", "").lower() in ("1", "true")
+            elif nodo.tag == f"{NS_MAIN}sheet":
+                primera_hoja = nodo.get(f"{NS_REL}id")
+                break
+
+    destinos = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as fh:
+        for _, nodo in iterparse(fh):
+            if nodo.tag == f"{NS_PKG_REL}Relationship":
+                tipo = nodo.get("Type", "").rsplit("/", 1)[-1]
+                destinos[nodo.get("Id")] = (tipo, nodo.get("Target"))
+
+    def resolver(target):
+        if target.startswith("/"):
+            return target.lstrip("/")
+        return posixpath.normpath(posixpath.join("xl", target))
+
+    hoja = resolver(destinos[primera_hoja][1])
+    cadenas = next((resolver(t) for tipo, t in destinos.values() if tipo == "sharedStrings"), None)
+    estilos = next((resolver(t) for tipo, t in destinos.values() if tipo == "styles"), None)
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+    epoch = CALENDAR_MAC_1904 if fecha1904 else CALENDAR_WINDOWS_1900
+    return hoja, cadenas, estilos, epoch
+
+
+def _leer_cadenas(zf: zipfile.ZipFile, ruta, indices: set) -> dict:
+    """Lee la tabla de cadenas compartidas solo hasta el mayor índice pedido."""
+    resultado = {}
+    if not indices or ruta is None:
+        return resultado
+    ultimo = max(indices)
+    actual = 0
+    with zf.open(ruta) as fh:
+        for _, nodo in iterparse(fh):
+            if nodo.tag != f"{NS_MAIN}si":
+                continue
+            if actual in indices:
+                resultado[actual] = _texto(nodo).replace("x005F_", "")
+            nodo.clear()
+            if actual >= ultimo:
+                break
+            actual += 1
+    return resultado
+
+
+def _formatos_fecha(zf: zipfile.ZipFile, ruta, estilos_usados: set):
+    """Indica cuáles de los estilos (índices de cellXfs) pedidos son fechas o duraciones."""
+    fechas, duraciones = set(), set()
+    if not estilos_usados or ruta is None:
+        return fechas, duraciones
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    ultimo = max(estilos_usados)
+    personalizados = {}
+    en_cell_xfs = False
+    indice = 0
+    with zf.open(ruta) as fh:
+        for evento, nodo in iterparse(fh, events=("start", "end")):
+            if nodo.tag == f"{NS_MAIN}cellXfs":
+                if evento == "end":
+                    break
+                en_cell_xfs = True
+            elif evento != "end":
+                continue
+            elif nodo.tag == f"{NS_MAIN}numFmt":
+                personalizados[int(nodo.get("numFmtId"))] = nodo.get("formatCode")
+            elif en_cell_xfs and nodo.tag == f"{NS_MAIN}xf":
+                if indice in estilos_usados:
+                    num_fmt = int(nodo.get("numFmtId", 0))
+                    fmt = personalizados.get(num_fmt, BUILTIN_FORMATS.get(num_fmt))
+                    if is_date_format(fmt):
+                        fechas.add(indice)
+                    if is_timedelta_format(fmt):
+                        duraciones.add(indice)
+                if indice >= ultimo:
+                    break
+                indice += 1
+    return fechas, duraciones
+
+
+def _convertir(tipo, valor, estilo, cadenas, fechas, duraciones, epoch):
+    """Convierte el valor crudo de una celda como openpyxl y luego como pandas."""
+    if valor is None or tipo == "e":
+        return None
+    if tipo == "n":
+        numero = float(valor) if ("." in valor or "E" in valor or "e" in valor) else int(valor)
+        if estilo in fechas:
+            from openpyxl.utils.datetime import from_excel
+
+            try:
+                return from_excel(numero, epoch, timedelta=estilo in duraciones)
+            except (OverflowError, ValueError):
+                return None
+        entero = int(numero)
+        return entero if entero == numero else float(numero)
+    if tipo == "s":
+        valor = cadenas[int(valor)]
+    elif tipo == "b":
+        return bool(int(valor))
+    elif tipo == "d":
+        from openpyxl.utils.datetime import from_ISO8601
+
+        return from_ISO8601(valor)
+    return None if valor in VALORES_NA else valor
+
+
+class LibroXlsx:
+    """Primera hoja de un .xlsx, abierta para leer celdas puntuales o un rectángulo desde A1."""
+
+    def __init__(self, origen):
+        self._zf = zipfile.ZipFile(origen)
+        try:
+            self._hoja, self._ruta_cadenas, self._ruta_estilos, self._epoch = _partes_libro(self._zf)
+        except Exception:
+            self._zf.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zf.close()
+
+    def dimension(self):
+        """Rango declarado de la hoja (p. ej. "A1:E29"), o None si el archivo no lo incluye."""
+        with self._zf.open(self._hoja) as fh:
+            for _, nodo in iterparse(fh, events=("start",)):
+                if nodo.tag == TAG_DIMENSION:
+                    return nodo.get("ref")
+                if nodo.tag == TAG_SHEET_DATA:
+                    return None
+        return None
+
+    def leer_celdas(self, coordenadas: dict) -> dict:
+        """
+        Lee las celdas {clave: (fila, columna)} (base 0).
+
+        Las celdas inexistentes o vacías se devuelven como None.
+        """
+        valores = self._leer(set(coordenadas.values()), None)
+        return {clave: valores.get(coordenada) for clave, coordenada in coordenadas.items()}
+
+    def leer_region(self, filas: int, columnas: int) -> dict:
+        """Todas las celdas con valor de las primeras filas y columnas, como {(fila, columna): valor}."""
+        return {coordenada: valor for coordenada, valor in self._leer(set(), (filas, columnas)).items()
+                if valor is not None}
+
+    def _leer(self, objetivos: set, region) -> dict:
+        from openpyxl.utils.cell import coordinate_to_tuple
+
+        max_fila = max([fila for fila, _ in objetivos] + ([region[0] - 1] if region else [-1]))
+        filas_region, columnas_region = region or (0, 0)
+
+        crudos = {}
+        fila_actual = col_actual = 0
+        with self._zf.open(self._hoja) as fh:
+            for evento, nodo in iterparse(fh, events=("start", "end")):
+                if evento == "start":
+                    if nodo.tag == TAG_ROW:
+                        ref = nodo.get("r")
+                        fila_actual = int(ref) if ref else fila_actual + 1
+                        if fila_actual > max_fila + 1:
+                            break
+                        col_actual = 0
+                    continue
+                if nodo.tag == TAG_CELDA:
+                    ref = nodo.get("r")
+                    col_actual = coordinate_to_tuple(ref)[1] if ref else col_actual + 1
+                    coordenada = (fila_actual - 1, col_actual - 1)
+                    if coordenada in objetivos or (fila_actual <= filas_region and col_actual <= columnas_region):
+                        tipo = nodo.get("t", "n")
+                        if tipo == "inlineStr":
+                            contenido = nodo.find(f"{NS_MAIN}is")
+                            valor = _texto(contenido) if contenido is not None else None
+                        else:
+                            valor = nodo.findtext(TAG_VALOR) or None
+                        crudos[coordenada] = (tipo, valor, int(nodo.get("s") or 0))
+                    nodo.clear()
+                elif nodo.tag == TAG_ROW:
+                    nodo.clear()
+
+        indices = {int(v) for t, v, _ in crudos.values() if t == "s" and v is not None}
+        estilos = {s for t, v, s in crudos.values() if t == "n" and v is not None}
+        cadenas = _leer_cadenas(self._zf, self._ruta_cadenas, indices)
+        fechas, duraciones = _formatos_fecha(self._zf, self._ruta_estilos, estilos)
+
+        return {
+            coordenada: _convertir(tipo, valor, estilo, cadenas, fechas, duraciones, self._epoch)
+            for coordenada, (tipo, valor, estilo) in crudos.items()
+        }
+
+
+def leer_celdas_xlsx(origen, coordenadas: dict) -> dict:
+    """
+    Lee las celdas {campo: (fila, columna)} (base 0) de la primera hoja.
+
+    Las celdas inexistentes o vacías se devuelven como None.
+    """
+    with LibroXlsx(origen) as libro:
+        return libro.leer_celdas(coordenadas)
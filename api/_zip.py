@@ -0,0 +1,68 @@
+"""
+Lectura segura de archivos .zip con informes de visita.
+
+Los miembros se descomprimen de a uno, bajo demanda, y se validan contra límites de
+cantidad, tamaño descomprimido y tasa de compresión antes de leerlos. Los miembros grandes
+se descomprimen a un temporal en lugar de a memoria (ver api/_uploads.py).
+"""
+import posixpath
+import zipfile
+
+from api._uploads import Acumulador, Contenido
+
+EXTENSIONES_VALIDAS = (".xlsx", ".csv")
+TAMANO_BLOQUE = 64 * 1024
+
+
+class ZipLimitError(ValueError):
+    """El archivo .zip completo supera alguno de los límites configurados."""
+
+
+def es_miembro_ignorado(nombre: str) -> bool:
+    """Directorios, metadatos de macOS, temporales de Office y reportes ya consolidados."""
+    base = posixpath.basename(nombre)
+    return (
+        not base
+        or nombre.startswith("__MACOSX/")
+        or base.startswith((".", "~$"))
+        or base.startswith("Reporte_")
+        or not base.lower().endswith(EXTENSIONES_VALIDAS)
+    )
+
+
+def miembros_procesables(zf: zipfile.ZipFile, max_miembros: int, max_total_bytes: int) -> list:
+    """Devuelve los miembros a extraer o lanza ZipLimitError si el archivo excede los límites."""
+    miembros = [info for info in zf.infolist() if not info.is_dir() and not es_miembro_ignorado(info.filename)]
+    if len(miembros) > max_miembros:
+        raise ZipLimitError(f"El archivo contiene {len(miembros)} informes; el máximo es {max_miembros}.")
+
+    total = sum(info.file_size for info in miembros)
+    if total > max_total_bytes:
+        raise ZipLimitError(
+            f"El contenido descomprimido ({total} bytes) supera el máximo de {max_total_bytes} bytes."
+        )
+    return miembros
+
+
+def leer_miembro(zf: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int, max_ratio: float,
+                 limite_memoria: int) -> Contenido:
+    """Descomprime un miembro por bloques sin pasar del tamaño declarado ni de max_bytes."""
+    if info.file_size > max_bytes:
+        raise ValueError(f"El archivo descomprimido supera el máximo de {max_bytes} bytes.")
+    if info.compress_size and info.file_size / info.compress_size > max_ratio:
+        raise ValueError(f"Tasa de compresión sospechosa (más de {max_ratio:g}:1).")
+
+    acumulador = Acumulador(posixpath.basename(info.filename), limite_memoria)
+    try:
+        with zf.open(info) as fh:
+            while True:
+                bloque = fh.read(TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                acumulador.agregar(bloque)
+                if acumulador.tamano > info.file_size:
+                    raise ValueError("El contenido descomprimido no coincide con el tamaño declarado.")
+    except BaseException:
+        acumulador.cancelar()
+        raise
+    return acumulador.terminar()
@@ -1,19 +1,85 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from functools import partial
 from io import BytesIO
+import asyncio
+import hashlib
+import json
+import multiprocessing
 import os
-import re
-from dotenv import load_dotenv
+import posixpath
+import tempfile
+import shutil
+import threading
+import time
+import uuid
+import zipfile
 from pydantic import BaseModel
-from supabase import create_client, Client
+
+from api._cargos import get_role_matcher
+from api._cache import ExtractionCache
+from api._sqlite import COLUMNAS_REPORTE, SQLiteReports
+from api._mirror import EspejoReportes
+from api._dedup import DUPLICADO, MISMO_NOMBRE, NUEVO, IndiceDedup, hash_contenido
+from api._tipos import columnas_tipadas, fecha_iso
+from api._stats import RIESGOS, EstadoStats, StatsCache, es_ventana_incremental
+from api._export import (
+    CATEGORIA, ENTERO, FECHA, FORMATOS, NUMERO, TEXTO, EscritorConsolidado, SalidaPorPartes,
+)
+from api._metrics import (
+    ACTIVO as METRICS_ENABLED, MetricsMiddleware, etapa, exponer, observar_bytes, observar_db, observar_lote,
+    recolectar_etapas, sumar_etapas,
+)
+from api._layout import (
+    COLUMNAS_ETIQUETA, DESPLAZAMIENTO_VALOR, ETIQUETAS_CAMPOS, FILAS_ESCANEO, LayoutCache, es_nulo, resolver_csv,
+    resolver_dataframe, resolver_xlsx,
+)
+from api._xlsx import LibroXlsx
+from api._jobs import ACTIVOS as JOBS_ACTIVOS, CANCELADO, EN_CURSO, FALLIDO, OK, TERMINADO, JobStore
+from api._uploads import (
+    LimiteCuerpo, PresupuestoEnVuelo, Reserva, UploadLimitError, contenido_en_disco, copiar_archivo,
+    guardar_archivo, validar_tamanos,
+)
+from api._zip import TAMANO_BLOQUE, ZipLimitError, leer_miembro, miembros_procesables
+
+# pandas, supabase, httpx y openpyxl se importan en el primer uso: en un arranque en frío de
+# Vercel, /api/health, /api/reports o /api/upload-results no pagan por cargarlos.
+if TYPE_CHECKING:
+    import httpx
+    from supabase import Client
 
 app = FastAPI(title="Excel Processor Microservice")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-load_dotenv(os.path.join(BASE_DIR, ".env.local"))
+if os.path.exists(os.path.join(BASE_DIR, ".env.local")):
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(BASE_DIR, ".env.local"))
+
+# Archivos recibidos: hasta UPLOAD_MEMORY_BYTES quedan en memoria, los más grandes en un temporal.
+# Los límites se revisan con los tamaños declarados antes de leer nada (413), y el total de
+# bytes en proceso entre todas las peticiones no pasa de UPLOAD_MAX_INFLIGHT_BYTES (503).
+UPLOAD_MEMORY_BYTES = int(os.getenv("UPLOAD_MEMORY_BYTES", str(1024 * 1024)))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(512 * 1024 * 1024)))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(1024 * 1024 * 1024)))
+
+presupuesto_subidas = PresupuestoEnVuelo(UPLOAD_MAX_INFLIGHT_BYTES)
+
+# Content-Length (o los bytes recibidos) contra esos límites antes de que Starlette lea el formulario.
+app.add_middleware(
+    LimiteCuerpo,
+    limites={
+        "/api/process-excel": (UPLOAD_MAX_FILE_BYTES, "UPLOAD_MAX_FILE_BYTES"),
+        "/api/process-batch": (UPLOAD_MAX_REQUEST_BYTES, "UPLOAD_MAX_REQUEST_BYTES"),
+    },
+    presupuesto=presupuesto_subidas,
+)
 
 # Enable CORS
 app.add_middleware(
@@ -22,14 +88,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El cursor de /api/reports va en cabeceras: el navegador solo las deja leer si se exponen.
+    expose_headers=["X-Next-Cursor", "Link"],
 )
 
+# Duración por etapa en /api/metrics (METRICS_ENABLED=0 lo desactiva, SERVER_TIMING=1 agrega la cabecera).
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 def limpiar_dato(valor):
     """Limpia y normaliza datos, maneja fechas correctamente."""
-    if pd.isna(valor):
+    if es_nulo(valor):
         return "N/A"
 
-    if isinstance(valor, pd.Timestamp):
+    if isinstance(valor, datetime):  # incluye pd.Timestamp
         return valor.strftime('%Y-%m-%d')
 
     resultado = str(valor).strip().replace('\n', ' ').replace('  ', ' ')
@@ -44,68 +116,155 @@ def limpiar_dato(valor):
 
 def separar_profesional_cargo(texto):
     """Separa el nombre del cargo del profesional."""
-    if not texto or texto == "N/A":
-        return {"nombre": "N/A", "cargo": "N/A"}
-
-    texto_limpio = str(texto).strip()
-    cargos = [
-        "Auxiliar de laboratorio", "Auxiliar de Laboratorio", "Bacteriologa",
-        "Enfermería", "Enfermeria", "Profesional Enfermería", 
-        "Profesional Enfermeria", "Profesional"
-    ]
+    return get_role_matcher().separar(texto)
+
+# Versión de la lógica de extracción: subirla cuando cambie cómo se interpretan las celdas.
+# Las etiquetas buscadas ya forman parte de la huella del layout, ver layout_version().
+EXTRACTION_VERSION = "3"
 
-    for cargo in cargos:
-        if cargo.lower() in texto_limpio.lower():
-            partes = re.split(re.escape(cargo), texto_limpio, flags=re.IGNORECASE)
-            nombre = partes[0].strip()
-            return {"nombre": nombre, "cargo": cargo}
+# Modo de lectura para .xlsx: "celdas" (solo las celdas necesarias) o "pandas" (hoja completa).
+EXTRACT_READER = os.getenv("EXTRACT_READER", "celdas").lower()
 
-    return {"nombre": texto_limpio, "cargo": "N/A"}
+layout_cache = LayoutCache(max_entries=int(os.getenv("LAYOUT_CACHE_SIZE", "64")))
 
-def extract_data(file_bytes: bytes, filename: str):
-    """Extract data based on coordinates."""
+
+def extract_data(file_bytes, filename: str):
+    """
+    Extrae los campos del informe ubicándolos por sus etiquetas (ver api/_layout.py).
+
+    file_bytes son los bytes del archivo o la ruta del temporal donde quedó (archivos grandes).
+    """
     try:
-        file_stream = BytesIO(file_bytes)
-        if filename.endswith('.xlsx'):
-            df = pd.read_excel(file_stream, header=None)
-        else:
-            df = pd.read_csv(file_stream, header=None)
-        
-        prof_reciben_raw = limpiar_dato(df.iloc[7, 2]) if df.shape[0] > 7 and df.shape[1] > 2 else "N/A"
-        profesionales_lista = [p.strip() for p in prof_reciben_raw.split('\n') if p.strip() and p.strip() != "N/A"]
-        
-        profesionales_procesados = [separar_profesional_cargo(p) for p in profesionales_lista]
-        nombres_profesionales = " | ".join([p['nombre'] for p in profesionales_procesados]) if profesionales_procesados else "N/A"
-        cargos_profesionales = " | ".join([p['cargo'] for p in profesionales_procesados]) if profesionales_procesados else "N/A"
-
-        responsable_raw = limpiar_dato(df.iloc[8, 2]) if df.shape[0] > 8 and df.shape[1] > 2 else "N/A"
-        responsable = separar_profesional_cargo(responsable_raw)
-
-        extracted = {
-            "ARCHIVO": filename,
-            "Sede": limpiar_dato(df.iloc[6, 2]) if df.shape[0] > 6 and df.shape[1] > 2 else "N/A",
-            "Fecha": limpiar_dato(df.iloc[5, 2]) if df.shape[0] > 5 and df.shape[1] > 2 else "N/A",
-            "NOMBRE PROFESIONALES QUE RECIBEN": nombres_profesionales,
-            "CARGO PROFESIONALES QUE RECIBEN": cargos_profesionales,
-            "NOMBRE RESPONSABLE DE VISITA": responsable['nombre'],
-            "CARGO RESPONSABLE DE VISITA": responsable['cargo'],
-            "CALIFICACIÓN OBTENIDA": limpiar_dato(df.iloc[20, 2]) if df.shape[0] > 20 and df.shape[1] > 2 else "N/A",
-            "CLASIFICACIÓN POR RIESGO": limpiar_dato(df.iloc[21, 2]) if df.shape[0] > 21 and df.shape[1] > 2 else "N/A"
-        }
+        file_stream = BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
+        with etapa("extraccion"):
+            if filename.endswith('.xlsx'):
+                if EXTRACT_READER == "pandas":
+                    import pandas as pd
+
+                    layout, celdas = resolver_dataframe(pd.read_excel(file_stream, header=None))
+                else:
+                    with LibroXlsx(file_stream) as libro:
+                        layout, celdas = resolver_xlsx(libro, layout_cache)
+            else:
+                layout, celdas = resolver_csv(file_bytes)
+
+        with etapa("limpieza"):
+            prof_reciben_raw = limpiar_dato(celdas["profesionales"])
+            profesionales_lista = [p.strip() for p in prof_reciben_raw.split('\n') if p.strip() and p.strip() != "N/A"]
         
+            profesionales_procesados = [separar_profesional_cargo(p) for p in profesionales_lista]
+            nombres_profesionales = " | ".join([p['nombre'] for p in profesionales_procesados]) if profesionales_procesados else "N/A"
+            cargos_profesionales = " | ".join([p['cargo'] for p in profesionales_procesados]) if profesionales_procesados else "N/A"
+
+            responsable_raw = limpiar_dato(celdas["responsable"])
+            responsable = separar_profesional_cargo(responsable_raw)
+
+            extracted = {
+                "ARCHIVO": filename,
+                "Sede": limpiar_dato(celdas["sede"]),
+                "Fecha": limpiar_dato(celdas["fecha"]),
+                "NOMBRE PROFESIONALES QUE RECIBEN": nombres_profesionales,
+                "CARGO PROFESIONALES QUE RECIBEN": cargos_profesionales,
+                "NOMBRE RESPONSABLE DE VISITA": responsable['nombre'],
+                "CARGO RESPONSABLE DE VISITA": responsable['cargo'],
+                "CALIFICACIÓN OBTENIDA": limpiar_dato(celdas["calificacion"]),
+                "CLASIFICACIÓN POR RIESGO": limpiar_dato(celdas["riesgo"]),
+                "LAYOUT": layout.id,
+            }
+
         return extracted
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error extracting data: {str(e)}")
 
 
+def layout_version() -> str:
+    huella = json.dumps({
+        "version": EXTRACTION_VERSION,
+        "etiquetas": ETIQUETAS_CAMPOS,
+        "escaneo": [FILAS_ESCANEO, COLUMNAS_ETIQUETA, DESPLAZAMIENTO_VALOR],
+        "cargos": get_role_matcher().huella,
+    }, sort_keys=True)
+    return hashlib.sha256(huella.encode()).hexdigest()[:12]
+
+
+extraction_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Caché de la versión de extracción actual; si cambia (p. ej. se editó cargos.json) empieza otra."""
+    global extraction_cache
+    version = layout_version()
+    if extraction_cache is None or extraction_cache.version != version:
+        extraction_cache = ExtractionCache(
+            version,
+            max_entries=int(os.getenv("EXTRACT_CACHE_SIZE", "512")),
+            disk_dir=os.getenv("EXTRACT_CACHE_DIR") or None,
+            max_disk_bytes=int(os.getenv("EXTRACT_CACHE_DISK_BYTES", str(64 * 1024 * 1024))),
+        )
+    return extraction_cache
+
+
+# Procesos para extraer archivos en /api/process-batch (1 = un solo hilo, sin pool de procesos).
+# Sin BATCH_WORKERS se usan como mucho BATCH_WORKERS_DEFAULT: os.cpu_count() devuelve los núcleos
+# de la máquina, no los del contenedor, y cada proceso carga pandas.
+BATCH_WORKERS_DEFAULT = 4
+BATCH_WORKERS = max(int(os.getenv("BATCH_WORKERS", min(os.cpu_count() or 1, BATCH_WORKERS_DEFAULT))), 1)
+
+batch_executor = None
+
+
+def get_batch_executor():
+    global batch_executor
+    if batch_executor is not None:
+        return batch_executor
+
+    if BATCH_WORKERS > 1:
+        try:
+            # Los procesos no se crean con fork: heredarían los hilos del servidor (pool de la base,
+            # event loop) y los locks que tuvieran tomados en ese momento.
+            metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            batch_executor = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context(metodo)
+            )
+            return batch_executor
+        except (OSError, NotImplementedError):
+            # Sin /dev/shm (p. ej. funciones serverless) no hay multiprocessing: se usa un hilo.
+            pass
+
+    batch_executor = ThreadPoolExecutor(max_workers=1)
+    return batch_executor
+
+
+def extraer_en_lote(file_bytes, filename: str):
+    """
+    extract_data para el pool de /api/process-batch.
+
+    La HTTPException de un archivo inválido no se puede reconstruir en el proceso principal
+    (TypeError al deserializarla) y deja el pool roto para todo el lote; se envía como ValueError
+    con el mismo detalle, así cada archivo informa su propio error.
+    """
+    try:
+        return extract_data(file_bytes, filename)
+    except HTTPException as e:
+        raise ValueError(e.detail) from None
+
+
+def reset_batch_executor():
+    global batch_executor
+    if batch_executor is not None:
+        batch_executor.shutdown(wait=False, cancel_futures=True)
+    batch_executor = None
+
+
 class UploadResultsPayload(BaseModel):
     results: List[dict]
 
 
-supabase_client: Optional[Client] = None
+supabase_client: Optional["Client"] = None
+clientes_db_lock = threading.Lock()
 
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     global supabase_client
     if supabase_client is not None:
         return supabase_client
@@ -119,12 +278,58 @@ def get_supabase_client() -> Client:
             detail="Faltan SUPABASE_URL o SUPABASE_SERVICE_ROLE_KEY en variables de entorno."
         )
 
-    supabase_client = create_client(supabase_url, supabase_service_key)
+    with clientes_db_lock:
+        if supabase_client is None:
+            from supabase import ClientOptions, create_client
+
+            supabase_client = create_client(
+                supabase_url, supabase_service_key, options=ClientOptions(httpx_client=_crear_http_client())
+            )
     return supabase_client
 
 
+# El cliente de Supabase es síncrono: sus llamadas corren en un pool de hilos acotado para no
+# bloquear el event loop, y todas comparten un httpx.Client con keep-alive.
+DB_WORKERS = max(int(os.getenv("DB_WORKERS", "8")), 1)
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+# Reintentos solo de conexión fallida (la petición no llegó a enviarse); postgrest-py ya
+# reintenta los GET que responden 503/520.
+DB_RETRIES = int(os.getenv("DB_RETRIES", "2"))
+
+
+def _crear_http_client() -> "httpx.Client":
+    import httpx
+
+    limites = httpx.Limits(max_connections=DB_WORKERS, max_keepalive_connections=DB_WORKERS)
+    return httpx.Client(
+        timeout=httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT),
+        transport=httpx.HTTPTransport(retries=DB_RETRIES, limits=limites),
+        follow_redirects=True,
+    )
+
+
+db_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global db_executor
+    if db_executor is None:
+        db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+    return db_executor
+
+
+async def en_db(funcion, *args):
+    """Ejecuta una función que consulta la base (Supabase o SQLite) en el pool de hilos de DB."""
+    inicio = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_db_executor(), partial(funcion, *args))
+    finally:
+        observar_db(funcion.__name__.lstrip("_"), time.perf_counter() - inicio)
+
+
 def map_result_to_db_row(item: dict) -> dict:
-    return {
+    fila = {
         "archivo": item.get("ARCHIVO", "N/A"),
         "sede": item.get("Sede", "N/A"),
         "fecha": item.get("Fecha", "N/A"),
@@ -135,192 +340,1197 @@ def map_result_to_db_row(item: dict) -> dict:
         "calificacion_obtenida": item.get("CALIFICACIÓN OBTENIDA", "N/A"),
         "clasificacion_riesgo": item.get("CLASIFICACIÓN POR RIESGO", "N/A"),
     }
+    # Fecha, calificación y riesgo tipados junto al texto original (ver api/_tipos.py).
+    return {**fila, **columnas_tipadas(fila), "contenido_hash": hash_contenido(fila)}
 
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        **get_extraction_cache().stats(),
+        "stats_cache": get_stats_cache().stats(),
+        "uploads": presupuesto_subidas.stats(),
+        "mirror": await en_db(_estado_espejo),
+        "dedup_index": indice_dedup.estado() if indice_dedup is not None else None,
+    }
+
+
+def _estado_espejo():
+    espejo = get_espejo_reportes()
+    return espejo.estado() if espejo is not None else None
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Histogramas por ruta y etapa en formato de texto de Prometheus (propios de este proceso)."""
+    return PlainTextResponse(exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/layouts")
+async def layouts():
+    """Layouts de plantilla resueltos por este proceso (los workers del lote tienen los suyos)."""
+    return layout_cache.stats()
+
+
+def _error_limite(e: UploadLimitError) -> HTTPException:
+    headers = {"Retry-After": "5"} if e.status_code == 503 else None
+    return HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+
+def _tamano_subida(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, os.SEEK_END)
+    tamano = file.file.tell()
+    file.file.seek(0)
+    return tamano
+
+
+def _reservar_subidas(files: list) -> Reserva:
+    try:
+        total = validar_tamanos(
+            [(file.filename, _tamano_subida(file)) for file in files], UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_REQUEST_BYTES
+        )
+        return presupuesto_subidas.reservar(total)
+    except UploadLimitError as e:
+        raise _error_limite(e)
+
+
+async def _leer_subida(file: UploadFile):
+    """Copia la subida a un Contenido (memoria o temporal) y libera el archivo de Starlette."""
+    try:
+        file.file.seek(0)
+        return await asyncio.to_thread(
+            copiar_archivo, file.file, file.filename, UPLOAD_MEMORY_BYTES, UPLOAD_MAX_FILE_BYTES
+        )
+    finally:
+        await file.close()
+
+
 @app.post("/api/process-excel")
 async def process_excel(file: UploadFile = File(...)):
     filename = file.filename.lower()
     if not (filename.endswith('.xlsx') or filename.endswith('.csv')):
         raise HTTPException(status_code=400, detail="Invalid file type.")
 
+    reserva = _reservar_subidas([file])
+    contenido = None
     try:
-        content = await file.read()
-        data = extract_data(content, file.filename)
+        with etapa("lectura"):
+            contenido = await _leer_subida(file)
+        observar_bytes(contenido.tamano)
+        cache = get_extraction_cache()
+        data = cache.get(contenido.clave, file.filename)
+        if data is None:
+            data = extract_data(contenido.origen, file.filename)
+            cache.put(contenido.clave, data)
         return JSONResponse(content=data)
+    except UploadLimitError as e:
+        raise _error_limite(e)
     except Exception as e:
         if isinstance(e, HTTPException): raise e
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if contenido is not None:
+            contenido.descartar()
+        reserva.cerrar()
 
-@app.post("/api/process-batch")
-async def process_batch(files: List[UploadFile] = File(...)):
-    results = []
-    errors = []
-    
-    for file in files:
-        filename = file.filename.lower()
-        if not (filename.endswith('.xlsx') or filename.endswith('.csv')):
-            errors.append({"file": file.filename, "error": "Invalid file type."})
-            continue
-            
+def _soltar(contenido, reserva: Optional[Reserva]):
+    """El archivo ya se extrajo: se borra su temporal y se devuelve su parte del presupuesto."""
+    contenido.descartar()
+    if reserva is not None:
+        reserva.liberar(contenido.tamano)
+
+
+async def _recoger_terminados(en_vuelo: dict, cache: ExtractionCache, reserva: Optional[Reserva] = None,
+                              esperar: bool = True) -> list:
+    """Devuelve las extracciones terminadas; con esperar=True aguarda al menos una."""
+    if esperar:
+        done, _ = await asyncio.wait(en_vuelo, return_when=asyncio.FIRST_COMPLETED)
+    else:
+        done = [future for future in en_vuelo if future.done()]
+    terminados = []
+    for future in done:
+        index, name, contenido = en_vuelo.pop(future)
+        _soltar(contenido, reserva)
         try:
-            content = await file.read()
-            data = extract_data(content, file.filename)
-            results.append(data)
+            data, etapas = future.result()
+            sumar_etapas(etapas)
+        except BrokenProcessPool as e:
+            reset_batch_executor()
+            terminados.append((index, name, None, str(e)))
+            continue
         except Exception as e:
-            errors.append({"file": file.filename, "error": str(e)})
-            
+            terminados.append((index, name, None, str(e)))
+            continue
+        cache.put(contenido.clave, data)
+        terminados.append((index, name, data, None))
+    return sorted(terminados, key=lambda item: item[0])
+
+
+async def iterar_lote(entradas: list, reserva: Optional[Reserva] = None):
+    """
+    Extrae las entradas (nombre, leer) del lote y produce (índice, archivo, datos, error) a medida que terminan.
+
+    `leer` es una corrutina sin argumentos que devuelve el Contenido del archivo (api/_uploads.py).
+
+    Cada archivo se envía al pool en cuanto se lee y se mantienen como máximo
+    2 * BATCH_WORKERS extracciones en vuelo, así la memoria no crece con el tamaño del lote.
+    Al terminar cada archivo se liberan sus bytes y su parte de `reserva`; lo que quede de
+    la reserva se devuelve al final, también si el cliente corta la respuesta.
+    Los aciertos de caché no pasan por el pool.
+    """
+    loop = asyncio.get_running_loop()
+    cache = get_extraction_cache()
+    en_vuelo = {}
+
+    try:
+        for index, (name, leer) in enumerate(entradas):
+            filename = name.lower()
+            if not (filename.endswith('.xlsx') or filename.endswith('.csv')):
+                yield index, name, None, "Invalid file type."
+                continue
+
+            try:
+                with etapa("lectura"):
+                    contenido = await leer()
+                observar_bytes(contenido.tamano)
+                cached = cache.get(contenido.clave, name)
+                if cached is None:
+                    # Las etapas de la extracción vuelven del worker junto con el resultado.
+                    future = loop.run_in_executor(
+                        get_batch_executor(), recolectar_etapas, extraer_en_lote, contenido.origen, name
+                    )
+                    en_vuelo[future] = (index, name, contenido)
+                else:
+                    _soltar(contenido, reserva)
+                del contenido
+            except Exception as e:
+                yield index, name, None, str(e)
+                continue
+
+            if cached is not None:
+                yield index, name, cached, None
+
+            for item in await _recoger_terminados(en_vuelo, cache, reserva, esperar=False):
+                yield item
+            while len(en_vuelo) >= 2 * BATCH_WORKERS:
+                for item in await _recoger_terminados(en_vuelo, cache, reserva):
+                    yield item
+
+        while en_vuelo:
+            for item in await _recoger_terminados(en_vuelo, cache, reserva):
+                yield item
+    finally:
+        for future, (_, _, contenido) in en_vuelo.items():
+            future.cancel()
+            contenido.descartar()
+        if reserva is not None:
+            reserva.cerrar()
+
+
+async def _stream_lote(entradas: list, formato: str, reserva: Optional[Reserva] = None):
+    """Emite un registro por archivo según termina y un resumen final (NDJSON o SSE)."""
+    processed_count = 0
+    error_count = 0
+
+    def registro(tipo: str, contenido: dict) -> str:
+        linea = json.dumps(contenido, ensure_ascii=False)
+        if formato == "sse":
+            return f"event: {tipo}\ndata: {linea}\n\n"
+        return linea + "\n"
+
+    async for index, name, data, error in iterar_lote(entradas, reserva):
+        if error is None:
+            processed_count += 1
+            yield registro("result", {"type": "result", "index": index, "file": name, "data": data})
+        else:
+            error_count += 1
+            yield registro("error", {"type": "error", "index": index, "file": name, "error": error})
+
+    yield registro("summary", {
+        "type": "summary",
+        "processed_count": processed_count,
+        "total_count": len(entradas),
+        "error_count": error_count,
+    })
+
+
+# Columnas del consolidado descargable (?format=) y su tipo en Parquet; ERROR queda vacío si el archivo se extrajo.
+COLUMNAS_CONSOLIDADO = [
+    ("ARCHIVO", TEXTO),
+    ("Sede", TEXTO),
+    ("Fecha", FECHA),
+    ("NOMBRE PROFESIONALES QUE RECIBEN", TEXTO),
+    ("CARGO PROFESIONALES QUE RECIBEN", TEXTO),
+    ("NOMBRE RESPONSABLE DE VISITA", TEXTO),
+    ("CARGO RESPONSABLE DE VISITA", TEXTO),
+    ("CALIFICACIÓN OBTENIDA", NUMERO),
+    ("CLASIFICACIÓN POR RIESGO", CATEGORIA),
+    ("LAYOUT", TEXTO),
+    ("ERROR", TEXTO),
+]
+
+# XLSX y Parquet solo se pueden enviar completos: hasta este tamaño quedan en memoria, luego en disco.
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+
+async def _exportar_lote(entradas: list, escritor: EscritorConsolidado, destino, reserva: Optional[Reserva] = None):
+    """Agrega cada resultado al consolidado según termina; el CSV se envía por partes, el resto al final."""
+    async for _, name, data, error in iterar_lote(entradas, reserva):
+        escritor.escribir(data if error is None else {"ARCHIVO": name, "ERROR": error})
+        if escritor.formato == "csv":
+            escritor.vaciar()
+            parte = destino.getvalue()
+            destino.seek(0)
+            destino.truncate()
+            if parte:
+                yield parte
+
+    escritor.cerrar()
+    if escritor.formato == "csv":
+        yield destino.getvalue()
+        return
+
+    destino.seek(0)
+    try:
+        while True:
+            bloque = destino.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        destino.close()
+
+
+def _respuesta_consolidado(entradas: list, formato: str, reserva: Optional[Reserva] = None):
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(FORMATOS)}.")
+    destino = BytesIO() if formato == "csv" else tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    try:
+        escritor = EscritorConsolidado(destino, formato, COLUMNAS_CONSOLIDADO, EXPORT_CHUNK_ROWS)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        _exportar_lote(entradas, escritor, destino, reserva),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="Reporte_Consolidado{extension}"'},
+    )
+
+
+async def _respuesta_lote(entradas: list, stream: Optional[str], formato: Optional[str] = None,
+                          reserva: Optional[Reserva] = None):
+    observar_lote(len(entradas))
+    if formato is not None:
+        return _respuesta_consolidado(entradas, formato, reserva)
+
+    if stream is not None:
+        if stream not in ("ndjson", "sse"):
+            raise HTTPException(status_code=400, detail="stream debe ser 'ndjson' o 'sse'.")
+        media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+        return StreamingResponse(
+            _stream_lote(entradas, stream, reserva),
+            media_type=media_type,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    terminados = [item async for item in iterar_lote(entradas, reserva)]
+    terminados.sort(key=lambda item: item[0])
+    results = [data for _, _, data, error in terminados if error is None]
+    errors = [{"file": name, "error": error} for _, name, _, error in terminados if error is not None]
+
     return JSONResponse(content={
         "processed_count": len(results),
-        "total_count": len(files),
+        "total_count": len(entradas),
         "results": results,
         "errors": errors
     })
 
 
+@app.post("/api/process-batch")
+async def process_batch(
+    files: List[UploadFile] = File(...),
+    stream: Optional[str] = None,
+    formato: Optional[str] = Query(None, alias="format"),
+):
+    reserva = _reservar_subidas(files)
+    try:
+        return await _respuesta_lote(
+            [(file.filename, partial(_leer_subida, file)) for file in files], stream, formato, reserva
+        )
+    except BaseException:
+        reserva.cerrar()
+        raise
+
+
+# Límites para /api/process-zip
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "1000"))
+ZIP_MAX_MEMBER_BYTES = int(os.getenv("ZIP_MAX_MEMBER_BYTES", str(50 * 1024 * 1024)))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+ZIP_MAX_RATIO = float(os.getenv("ZIP_MAX_RATIO", "100"))
+
+
+@app.post("/api/process-zip")
+async def process_zip(
+    file: UploadFile = File(...),
+    stream: Optional[str] = None,
+    formato: Optional[str] = Query(None, alias="format"),
+):
+    if not file.filename.lower().endswith('.zip'):
+        raise HTTPException(status_code=400, detail="Invalid file type.")
+
+    try:
+        zf = zipfile.ZipFile(file.file)
+        miembros = miembros_procesables(zf, ZIP_MAX_MEMBERS, ZIP_MAX_TOTAL_BYTES)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Archivo .zip inválido: {str(e)}")
+    except ZipLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Lo descomprimido cuenta en el presupuesto de subidas en vuelo igual que los archivos de
+    # /api/process-batch: se reserva el total declarado y cada miembro devuelve su parte al terminar.
+    try:
+        reserva = presupuesto_subidas.reservar(min(sum(info.file_size for info in miembros), ZIP_MAX_TOTAL_BYTES))
+    except UploadLimitError as e:
+        raise _error_limite(e)
+
+    # Cada miembro se descomprime recién cuando el lote lo necesita, en un hilo aparte.
+    entradas = [
+        (
+            posixpath.basename(info.filename),
+            partial(
+                asyncio.to_thread, leer_miembro, zf, info, ZIP_MAX_MEMBER_BYTES, ZIP_MAX_RATIO, UPLOAD_MEMORY_BYTES
+            ),
+        )
+        for info in miembros
+    ]
+    try:
+        return await _respuesta_lote(entradas, stream, formato, reserva)
+    except BaseException:
+        reserva.cerrar()
+        raise
+
+
+def _registrar_en_stats(filas_insertadas: list):
+    """Actualiza la caché de /api/stats con las filas devueltas por el insert."""
+    if filas_insertadas:
+        get_stats_cache().registrar_insercion(filas_insertadas)
+
+
+# Filas por upsert en /api/upload-results: acota el tamaño de cada request a PostgREST.
+UPLOAD_CHUNK_SIZE = max(int(os.getenv("UPLOAD_CHUNK_SIZE", "500")), 1)
+
+
+def _insertar_bloque(table_name: str, filas: list) -> list:
+    """
+    Inserta un bloque y devuelve solo las filas nuevas.
+
+    La base decide con la restricción única sobre archivo (on conflict do nothing): el
+    índice de deduplicación evita enviar los duplicados que ya conoce, pero no reemplaza a la restricción.
+    """
+    local = get_sqlite_reports()
+    if local is not None:
+        return local.insertar(filas)
+    response = get_supabase_client().table(table_name).upsert(
+        filas, on_conflict="archivo", ignore_duplicates=True
+    ).execute()
+    insertadas = response.data or []
+    espejo = get_espejo_reportes()
+    if espejo is not None and insertadas:
+        espejo.copiar(insertadas)
+    return insertadas
+
+
 @app.post("/api/upload-results")
 async def upload_results(payload: UploadResultsPayload):
     if not payload.results:
         raise HTTPException(status_code=400, detail="No hay resultados para guardar.")
+    return await _guardar_resultados(payload.results)
 
-    try:
-        table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
-        client = get_supabase_client()
-        
-        # 1. Obtener nombres de archivos en el payload
-        filenames_in_payload = [item.get("ARCHIVO") for item in payload.results if item.get("ARCHIVO")]
-        
-        if not filenames_in_payload:
-            # Si no hay nombres de archivos, procedemos normal (aunque no debería pasar)
-            rows = [map_result_to_db_row(item) for item in payload.results]
-            response = client.table(table_name).insert(rows).execute()
-            return JSONResponse(content={"ok": True, "inserted": len(response.data)})
-
-        # 2. Consultar cuáles de estos archivos YA existen en la DB
-        existing_response = client.table(table_name).select("archivo").in_("archivo", filenames_in_payload).execute()
-        existing_filenames = {row["archivo"] for row in existing_response.data} if existing_response.data else set()
-
-        # 3. Filtrar los que NO están en la DB
-        rows_to_insert = [
-            map_result_to_db_row(item) 
-            for item in payload.results 
-            if item.get("ARCHIVO") not in existing_filenames
-        ]
-
-        if not rows_to_insert:
-            # Todos son duplicados
-            return JSONResponse(
-                status_code=409,
-                content={
-                    "ok": False,
-                    "message": "Todos los archivos ya han sido cargados anteriormente.",
-                    "skipped": len(payload.results)
-                }
-            )
 
-        # 4. Insertar solo los nuevos
-        response = client.table(table_name).insert(rows_to_insert).execute()
-        inserted_count = len(response.data) if response.data else 0
-        skipped_count = len(payload.results) - inserted_count
+async def _guardar_resultados(results: list) -> JSONResponse:
+    """
+    Inserta los resultados extraídos por bloques (lo usan /api/upload-results y /api/jobs/{id}/upload).
+
+    Cada resultado se clasifica primero con el índice de deduplicación (api/_dedup.py): solo
+    los nuevos van a la base, y la respuesta trae el estado de cada archivo en "files".
+    """
+    table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
+    if get_sqlite_reports() is None:
+        get_supabase_client()  # Falla con 500 antes de empezar si faltan las credenciales.
+
+    rows = []
+    for item in results:
+        row = map_result_to_db_row(item)
+        if not item.get("ARCHIVO"):
+            # Sin nombre de archivo solo se deduplica por contenido: NULL no choca con la restricción única.
+            row["archivo"] = None
+        rows.append(row)
 
-        return JSONResponse(content={
-            "ok": True,
-            "inserted": inserted_count,
-            "skipped": skipped_count,
-            "message": f"Se cargaron {inserted_count} nuevos registros." + (f" Se omitieron {skipped_count} por ser duplicados." if skipped_count > 0 else "")
+    indice = get_indice_dedup()
+    if not indice.al_dia():
+        # Si la base no responde se sigue con el índice como esté: la restricción única decide igual.
+        await en_db(indice.al_dia_o_actualizar, _leer_claves_desde)
+    estados = indice.clasificar(rows)
+
+    chunks = []
+    inserted_count = 0
+    for inicio in range(0, len(rows), UPLOAD_CHUNK_SIZE):
+        bloque = [(i, rows[i]) for i in range(inicio, min(inicio + UPLOAD_CHUNK_SIZE, len(rows))) if estados[i] == NUEVO]
+        tamano = min(UPLOAD_CHUNK_SIZE, len(rows) - inicio)
+        insertadas = []
+        if bloque:
+            try:
+                insertadas = await en_db(_insertar_bloque, table_name, [row for _, row in bloque])
+            except Exception as e:
+                # Los bloques anteriores ya quedaron guardados; reintentar es seguro porque se ignoran duplicados.
+                return JSONResponse(
+                    status_code=500,
+                    content={
+                        "ok": False,
+                        "detail": f"Error guardando en Supabase: {str(e)}",
+                        "inserted": inserted_count,
+                        "chunks": chunks + [{"start": inicio, "size": tamano, "error": str(e)}],
+                    }
+                )
+            indice.agregar(insertadas)
+            _registrar_en_stats(insertadas)
+            guardados = {fila["archivo"] for fila in insertadas}
+            # Un nombre que la base ignoró lo guardó otro proceso después de la última actualización del índice.
+            for i, row in bloque:
+                if row["archivo"] is not None and row["archivo"] not in guardados:
+                    estados[i] = None
+        inserted_count += len(insertadas)
+        chunks.append({
+            "start": inicio,
+            "size": tamano,
+            "inserted": len(insertadas),
+            "skipped": tamano - len(insertadas),
         })
-    except HTTPException as exc:
-        raise exc
+
+    ignoradas = [i for i, estado in enumerate(estados) if estado is None]
+    if ignoradas:
+        try:
+            await en_db(indice.actualizar, _leer_claves_desde)
+        except Exception:
+            pass
+        for i, estado in zip(ignoradas, indice.clasificar([rows[i] for i in ignoradas])):
+            estados[i] = MISMO_NOMBRE if estado == MISMO_NOMBRE else DUPLICADO
+
+    files = [
+        {"index": i, "file": row["archivo"], "status": estado}
+        for i, (row, estado) in enumerate(zip(rows, estados))
+    ]
+    duplicates = estados.count(DUPLICADO)
+    conflicts = estados.count(MISMO_NOMBRE)
+    skipped_count = len(results) - inserted_count
+    conflictos = (
+        f" {conflicts} tienen el nombre de un archivo ya cargado con otro contenido y no se reemplazaron."
+        if conflicts else ""
+    )
+    if inserted_count == 0:
+        # Todos son duplicados
+        return JSONResponse(
+            status_code=409,
+            content={
+                "ok": False,
+                "message": "Todos los archivos ya han sido cargados anteriormente." + conflictos,
+                "skipped": skipped_count,
+                "duplicates": duplicates,
+                "conflicts": conflicts,
+                "chunks": chunks,
+                "files": files,
+            }
+        )
+
+    return JSONResponse(content={
+        "ok": True,
+        "inserted": inserted_count,
+        "skipped": skipped_count,
+        "duplicates": duplicates,
+        "conflicts": conflicts,
+        "chunks": chunks,
+        "files": files,
+        "message": f"Se cargaron {inserted_count} nuevos registros."
+        + (f" Se omitieron {duplicates} por ser duplicados." if duplicates else "") + conflictos,
+    })
+
+
+# Índice de deduplicación de /api/upload-results (api/_dedup.py): se carga en el primer uso y
+# se actualiza con las filas nuevas de la base cuando pasan DEDUP_INDEX_MAX_AGE segundos.
+DEDUP_INDEX_MAX_AGE = float(os.getenv("DEDUP_INDEX_MAX_AGE", "60"))
+DEDUP_INDEX_PAGE = max(int(os.getenv("DEDUP_INDEX_PAGE", "5000")), 1)
+DEDUP_INDEX_LOOKBACK = max(int(os.getenv("DEDUP_INDEX_LOOKBACK", "1000")), 0)
+
+indice_dedup: Optional[IndiceDedup] = None
+
+
+def get_indice_dedup() -> IndiceDedup:
+    global indice_dedup
+    if indice_dedup is None:
+        with clientes_db_lock:
+            if indice_dedup is None:
+                indice_dedup = IndiceDedup(DEDUP_INDEX_MAX_AGE, DEDUP_INDEX_PAGE, DEDUP_INDEX_LOOKBACK)
+    return indice_dedup
+
+
+def _leer_claves_desde(desde_id: int, limite: int) -> list:
+    """(id, archivo, contenido_hash) de las filas con id mayor que desde_id, de la base en uso."""
+    local = get_sqlite_reports()
+    if local is not None:
+        return local.claves_desde(desde_id, limite)
+    table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
+    return (
+        get_supabase_client().table(table_name).select("id,archivo,contenido_hash")
+        .gt("id", desde_id).order("id").limit(limite).execute().data
+    )
+
+
+# Trabajos asíncronos (/api/jobs): los archivos recibidos quedan en JOBS_DIR/<id> y el estado
+# con el resultado de cada archivo en JOBS_DIR/jobs.db, así el avance sobrevive a un reinicio.
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "reportcontrols-jobs"))
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "30"))
+JOBS_MAX_BYTES = int(os.getenv("JOBS_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+JOBS_RESULTS_MAX_LIMIT = int(os.getenv("JOBS_RESULTS_MAX_LIMIT", "500"))
+
+job_store: Optional[JobStore] = None
+trabajos_en_curso = {}  # id del trabajo -> asyncio.Task que lo ejecuta en este proceso
+
+
+def get_job_store() -> JobStore:
+    global job_store
+    if job_store is None:
+        with clientes_db_lock:
+            if job_store is None:
+                os.makedirs(JOBS_DIR, exist_ok=True)
+                job_store = JobStore(os.path.join(JOBS_DIR, "jobs.db"))
+    return job_store
+
+
+def _fecha_iso(marca: Optional[float]) -> Optional[str]:
+    if marca is None:
+        return None
+    return datetime.fromtimestamp(marca, timezone.utc).isoformat(timespec="seconds")
+
+
+def _job_json(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["estado"],
+        "total_count": job["total"],
+        "processed_count": job["procesados"],
+        "error_count": job["errores"],
+        "pending_count": job["total"] - job["procesados"] - job["errores"],
+        "created_at": _fecha_iso(job["creado"]),
+        "updated_at": _fecha_iso(job["actualizado"]),
+        "detail": job["detalle"],
+        "upload": json.loads(job["carga"]) if job["carga"] else None,
+    }
+
+
+async def _obtener_job(job_id: str) -> dict:
+    job = await en_db(get_job_store().obtener, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado.")
+    return job
+
+
+async def _leer_archivo_job(fila: dict, zips: dict):
+    """Contenido de un archivo del trabajo: el archivo guardado o un miembro de su .zip."""
+    if fila["miembro"] is None:
+        return await asyncio.to_thread(contenido_en_disco, fila["ruta"], fila["archivo"])
+    zf = zips.get(fila["ruta"])
+    if zf is None:
+        zf = zips[fila["ruta"]] = await asyncio.to_thread(zipfile.ZipFile, fila["ruta"])
+    return await asyncio.to_thread(
+        leer_miembro, zf, zf.getinfo(fila["miembro"]), ZIP_MAX_MEMBER_BYTES, ZIP_MAX_RATIO, UPLOAD_MEMORY_BYTES
+    )
+
+
+async def _ejecutar_job(job_id: str):
+    """
+    Procesa los archivos pendientes del trabajo con iterar_lote y guarda cada resultado al terminar.
+
+    Guardar un resultado renueva el latido; si el proceso muere, el siguiente GET /api/jobs/{id}
+    con el latido vencido lo retoma desde los archivos que siguen pendientes.
+    """
+    store = get_job_store()
+    zips = {}
+    lote = None
+    try:
+        if not await en_db(store.marcar, job_id, EN_CURSO):
+            return
+        pendientes = await en_db(store.pendientes, job_id)
+        lote = iterar_lote([(fila["archivo"], partial(_leer_archivo_job, fila, zips)) for fila in pendientes])
+        async for posicion, _, data, error in lote:
+            fila = pendientes[posicion]
+            estado = await en_db(store.guardar_resultado, job_id, fila["indice"], data, error)
+            if fila["miembro"] is None and fila["ruta"]:
+                try:
+                    os.unlink(fila["ruta"])
+                except FileNotFoundError:
+                    pass
+            if estado not in JOBS_ACTIVOS:
+                return  # Cancelado desde otra petición o proceso.
+        await en_db(store.marcar, job_id, TERMINADO)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error guardando en Supabase: {str(e)}")
+        await en_db(store.marcar, job_id, FALLIDO, str(e))
+    finally:
+        if lote is not None:
+            await lote.aclose()
+        for zf in zips.values():
+            zf.close()
+        trabajos_en_curso.pop(job_id, None)
+        job = await en_db(store.obtener, job_id)
+        if job is None or job["estado"] not in JOBS_ACTIVOS:
+            shutil.rmtree(os.path.join(JOBS_DIR, job_id), ignore_errors=True)
+
+
+def _lanzar_job(job_id: str):
+    if job_id not in trabajos_en_curso:
+        trabajos_en_curso[job_id] = asyncio.create_task(_ejecutar_job(job_id))
+
+
+def _guardar_subida_job(file: UploadFile, carpeta: str, numero: int, disponible: int) -> list:
+    """Guarda una subida del trabajo y devuelve sus archivos [(nombre, ruta, miembro)] (bloqueante)."""
+    filename = file.filename.lower()
+    es_zip = filename.endswith('.zip')
+    if not (es_zip or filename.endswith('.xlsx') or filename.endswith('.csv')):
+        return [(file.filename, "", None)]  # iterar_lote lo registra como error sin leerlo.
+
+    destino = os.path.join(carpeta, f"{numero:05d}{os.path.splitext(filename)[1]}")
+    file.file.seek(0)
+    if es_zip or disponible < UPLOAD_MAX_FILE_BYTES:
+        try:
+            guardar_archivo(file.file, destino, file.filename, disponible)
+        except UploadLimitError:
+            raise UploadLimitError(f"Los archivos del trabajo superan el máximo de {JOBS_MAX_BYTES} bytes (JOBS_MAX_BYTES).")
+    else:
+        guardar_archivo(file.file, destino, file.filename, UPLOAD_MAX_FILE_BYTES)
+    if not es_zip:
+        return [(file.filename, destino, None)]
+
+    try:
+        with zipfile.ZipFile(destino) as zf:
+            miembros = miembros_procesables(zf, ZIP_MAX_MEMBERS, ZIP_MAX_TOTAL_BYTES)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"{file.filename}: archivo .zip inválido: {str(e)}")
+    return [(posixpath.basename(info.filename), destino, info.filename) for info in miembros]
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(files: List[UploadFile] = File(...)):
+    """
+    Recibe archivos .xlsx/.csv o .zip, los deja en disco y devuelve el id del trabajo sin esperar la extracción.
+
+    El avance se consulta en GET /api/jobs/{id} y los resultados en GET /api/jobs/{id}/results.
+    """
+    store = get_job_store()
+    job_id = uuid.uuid4().hex
+    carpeta = os.path.join(JOBS_DIR, job_id)
+    os.makedirs(carpeta)
+    archivos = []
+    try:
+        usados = 0
+        for numero, file in enumerate(files):
+            try:
+                archivos.extend(
+                    await asyncio.to_thread(_guardar_subida_job, file, carpeta, numero, JOBS_MAX_BYTES - usados)
+                )
+            finally:
+                await file.close()
+            usados = sum(entrada.stat().st_size for entrada in os.scandir(carpeta))
+        await en_db(store.crear, job_id, archivos)
+    except BaseException as e:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        if isinstance(e, UploadLimitError):
+            raise _error_limite(e)
+        if isinstance(e, ZipLimitError):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise
+
+    observar_lote(len(archivos))
+    _lanzar_job(job_id)
+    return JSONResponse(status_code=202, content=_job_json(await _obtener_job(job_id)))
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await _obtener_job(job_id)
+    latido = job["latido"] if job["latido"] is not None else job["creado"]
+    if job["estado"] in JOBS_ACTIVOS and job_id not in trabajos_en_curso and time.time() - latido > JOBS_LEASE_SECONDS:
+        # Nadie lo está ejecutando (el proceso anterior terminó o se reinició): se retoma aquí.
+        _lanzar_job(job_id)
+    return JSONResponse(content=_job_json(job))
+
+
+@app.get("/api/jobs/{job_id}/results")
+async def get_job_results(job_id: str, cursor: Optional[int] = None, limit: int = 100):
+    """
+    Resultados ya procesados en el orden de los archivos, también mientras el trabajo sigue en curso.
+
+    next_cursor es el índice del último archivo de la página; se envía como cursor= para pedir
+    los siguientes y es None cuando no hay más por ahora.
+    """
+    job = await _obtener_job(job_id)
+    limit = min(max(limit, 1), JOBS_RESULTS_MAX_LIMIT)
+    filas = await en_db(get_job_store().resultados, job_id, cursor, limit + 1)
+    pagina = filas[:limit]
+    return JSONResponse(content={
+        "status": job["estado"],
+        "results": [fila["datos"] for fila in pagina if fila["estado"] == OK],
+        "errors": [
+            {"index": fila["indice"], "file": fila["archivo"], "error": fila["error"]}
+            for fila in pagina if fila["estado"] != OK
+        ],
+        "next_cursor": pagina[-1]["indice"] if len(filas) > limit else None,
+    })
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    await _obtener_job(job_id)
+    if not await en_db(get_job_store().marcar, job_id, CANCELADO):
+        raise HTTPException(status_code=409, detail="El trabajo ya terminó.")
+    tarea = trabajos_en_curso.get(job_id)
+    if tarea is not None:
+        tarea.cancel()
+    else:
+        shutil.rmtree(os.path.join(JOBS_DIR, job_id), ignore_errors=True)
+    return JSONResponse(content=_job_json(await _obtener_job(job_id)))
+
+
+@app.post("/api/jobs/{job_id}/upload")
+async def upload_job_results(job_id: str):
+    """Envía los resultados del trabajo terminado a la base, igual que /api/upload-results."""
+    job = await _obtener_job(job_id)
+    if job["estado"] != TERMINADO:
+        raise HTTPException(status_code=409, detail=f"El trabajo no ha terminado (estado: {job['estado']}).")
+    filas = await en_db(get_job_store().resultados, job_id)
+    results = [fila["datos"] for fila in filas if fila["estado"] == OK]
+    if not results:
+        raise HTTPException(status_code=400, detail="No hay resultados para guardar.")
+
+    respuesta = await _guardar_resultados(results)
+    await en_db(get_job_store().guardar_carga, job_id, {"status_code": respuesta.status_code, **json.loads(respuesta.body)})
+    return respuesta
+
+
+REPORTS_MAX_LIMIT = int(os.getenv("REPORTS_MAX_LIMIT", "500"))
+
+
+def _campos_reporte(fields: Optional[str]) -> Optional[list]:
+    """Columnas pedidas en fields= (separadas por coma); el id siempre va porque es el cursor."""
+    if not fields:
+        return None
+    campos = list(dict.fromkeys(campo.strip() for campo in fields.split(",") if campo.strip()))
+    desconocidos = [campo for campo in campos if campo not in COLUMNAS_REPORTE]
+    if desconocidos:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(desconocidos)}.")
+    return ["id", *(campo for campo in campos if campo != "id")]
+
+
+def _validar_fecha(nombre: str, valor: Optional[str]) -> Optional[str]:
+    """
+    Los filtros de fecha se comparan con fecha_dia (ISO).
+
+    Se aceptan los mismos formatos que en la columna fecha (YYYY-MM-DD, día/mes/año, "9 de
+    enero de 2026"; ver fecha_iso) y se pasan a ISO; un texto que no es una fecha da 400.
+    """
+    if not valor:
+        return None
+    iso = fecha_iso(valor)
+    if iso is None:
+        raise HTTPException(status_code=400, detail=f"{nombre} debe ser una fecha (YYYY-MM-DD o DD/MM/YYYY).")
+    return iso
+
+
+def _consultar_reportes(campos: Optional[list], limite: int, cursor, sede, start_date, end_date, riesgo) -> list:
+    local = get_sqlite_reports()
+    if local is not None:
+        return local.pagina(campos or list(COLUMNAS_REPORTE), limite, cursor, sede, start_date, end_date, riesgo)
+
+    table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
+    client = get_supabase_client()
+    query = client.table(table_name).select(",".join(campos) if campos else "*")
+    if cursor is not None:
+        query = query.lt("id", cursor)
+    if sede:
+        query = query.eq("sede", sede)
+    if start_date:
+        query = query.gte("fecha_dia", start_date)
+    if end_date:
+        query = query.lte("fecha_dia", end_date)
+    if riesgo:
+        query = query.eq("riesgo", riesgo)
+    return query.order("id", desc=True).limit(limite).execute().data
 
 
 @app.get("/api/reports")
-async def get_reports(limit: int = 50):
+async def get_reports(
+    request: Request,
+    limit: int = 50,
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+    sede: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    riesgo: Optional[str] = None,
+):
+    """
+    Reportes por id descendente, paginados con cursor (keyset sobre id).
+
+    El cuerpo sigue siendo la lista de reportes, como antes de la paginación. Si hay otra
+    página, la cabecera X-Next-Cursor trae el id del último reporte (se envía como cursor=) y
+    Link la URL de la siguiente (rel="next"); en la última no van. Cada página cuesta lo mismo
+    sin importar la profundidad.
+    """
+    limit = min(max(limit, 1), REPORTS_MAX_LIMIT)
+    campos = _campos_reporte(fields)
+    start_date = _validar_fecha("start_date", start_date)
+    end_date = _validar_fecha("end_date", end_date)
+    if riesgo is not None and riesgo not in RIESGOS:
+        raise HTTPException(status_code=400, detail=f"riesgo debe ser uno de: {', '.join(RIESGOS)}.")
+
+    try:
+        # Se pide una fila de más para saber si hay otra página sin una consulta adicional.
+        data = await en_db(
+            _consultar_reportes, campos, limit + 1, cursor, sede or None, start_date, end_date, riesgo
+        )
+        reports = data[:limit]
+        headers = {}
+        if len(data) > limit:
+            next_cursor = reports[-1]["id"]
+            headers = {
+                "X-Next-Cursor": str(next_cursor),
+                "Link": f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"',
+            }
+        return JSONResponse(content=reports, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo reportes: {str(e)}")
+
+
+# Filas por consulta de /api/reports/export: no más que el max-rows de PostgREST (1000 en
+# Supabase), porque una página corta se toma como la última.
+REPORTS_EXPORT_PAGE = max(int(os.getenv("REPORTS_EXPORT_PAGE", "1000")), 1)
+
+# Tipo en Parquet de cada columna de reportes_procesados (CSV y XLSX guardan el valor tal cual).
+TIPOS_EXPORTACION = {
+    "id": ENTERO,
+    "sede": CATEGORIA,
+    "fecha_dia": FECHA,
+    "calificacion": NUMERO,
+    "riesgo": CATEGORIA,
+}
+
+
+async def _exportar_reportes(escritor: EscritorConsolidado, salida: SalidaPorPartes, pagina: list, campos: list,
+                             filtros: tuple):
+    """Escribe las páginas (la primera ya consultada) y envía lo escrito después de cada una."""
+    while True:
+        for fila in pagina:
+            escritor.escribir(fila)
+        escritor.vaciar()
+        parte = salida.tomar()
+        if parte:
+            yield parte
+        if len(pagina) < REPORTS_EXPORT_PAGE:
+            break
+        pagina = await en_db(_consultar_reportes, campos, REPORTS_EXPORT_PAGE, pagina[-1]["id"], *filtros)
+    escritor.cerrar()
+    yield salida.tomar()
+
+
+@app.get("/api/reports/export")
+async def export_reports(
+    formato: str = Query("csv", alias="format"),
+    fields: Optional[str] = None,
+    sede: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    riesgo: Optional[str] = None,
+):
+    """
+    Todos los reportes que cumplen los filtros (los mismos de /api/reports) en CSV, XLSX o Parquet.
+
+    Recorre la tabla por id descendente en páginas de REPORTS_EXPORT_PAGE filas (keyset) y
+    envía cada página apenas se escribe, así la memoria no depende de cuántas filas se exportan.
+    """
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(FORMATOS)}.")
+    campos = _campos_reporte(fields) or list(COLUMNAS_REPORTE)
+    start_date = _validar_fecha("start_date", start_date)
+    end_date = _validar_fecha("end_date", end_date)
+    if riesgo is not None and riesgo not in RIESGOS:
+        raise HTTPException(status_code=400, detail=f"riesgo debe ser uno de: {', '.join(RIESGOS)}.")
+
+    salida = SalidaPorPartes()
+    try:
+        escritor = EscritorConsolidado(
+            salida, formato, [(campo, TIPOS_EXPORTACION.get(campo, TEXTO)) for campo in campos], EXPORT_CHUNK_ROWS
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    filtros = (sede or None, start_date, end_date, riesgo)
     try:
-        table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
-        client = get_supabase_client()
-        # Fetch reports ordered by created_at (assuming it exists) or id descending
-        response = client.table(table_name).select("*").order("id", desc=True).limit(limit).execute()
-        return JSONResponse(content=response.data)
+        # La primera página se consulta antes de responder: si la base falla todavía se puede devolver 500.
+        pagina = await en_db(_consultar_reportes, campos, REPORTS_EXPORT_PAGE, None, *filtros)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo reportes: {str(e)}")
 
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        _exportar_reportes(escritor, salida, pagina, campos, filtros),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="reportes{extension}"'},
+    )
+
+
+def _respuesta_stats(agregados: dict, recent_reports: list) -> dict:
+    """Arma la respuesta de /api/stats a partir de los agregados de reportes_stats."""
+    risks_dist = {
+        "alto": int(agregados["alto"]),
+        "moderado": int(agregados["moderado"]),
+        "bajo": int(agregados["bajo"]),
+    }
+    return {
+        "total_visits": int(agregados["total_visits"]),
+        "sedes_count": int(agregados["sedes_count"]),
+        "risks_detected": risks_dist["alto"] + risks_dist["moderado"],
+        "visits_this_month": int(agregados["visits_this_month"]),
+        "risks_distribution": risks_dist,
+        "visits_by_personnel": [
+            {"nombre": p["nombre"], "cantidad": int(p["cantidad"])} for p in agregados["visits_by_personnel"]
+        ][:10], # Top 10 responsables
+        "recent_reports": recent_reports[:10] # Últimos 10 registros
+    }
+
+
+sqlite_reports: Optional[SQLiteReports] = None
+
+
+def get_sqlite_reports() -> Optional[SQLiteReports]:
+    """Base SQLite local (REPORTS_SQLITE_PATH) que reemplaza a Supabase, o None si no está configurada."""
+    global sqlite_reports
+    ruta = os.getenv("REPORTS_SQLITE_PATH")
+    if sqlite_reports is None and ruta:
+        with clientes_db_lock:
+            if sqlite_reports is None:
+                sqlite_reports = SQLiteReports(ruta)
+    return sqlite_reports
+
+
+REPORTS_MIRROR_MAX_AGE = float(os.getenv("REPORTS_MIRROR_MAX_AGE", "60"))
+REPORTS_MIRROR_PAGE = max(int(os.getenv("REPORTS_MIRROR_PAGE", "1000")), 1)
+REPORTS_MIRROR_LOOKBACK = max(int(os.getenv("REPORTS_MIRROR_LOOKBACK", "1000")), 0)
+
+espejo_reportes: Optional[EspejoReportes] = None
+
+
+def get_espejo_reportes() -> Optional[EspejoReportes]:
+    """Espejo local de Supabase (REPORTS_MIRROR_PATH), o None si no está configurado o la base ya es SQLite."""
+    global espejo_reportes
+    ruta = os.getenv("REPORTS_MIRROR_PATH")
+    if espejo_reportes is None and ruta and not os.getenv("REPORTS_SQLITE_PATH"):
+        with clientes_db_lock:
+            if espejo_reportes is None:
+                espejo_reportes = EspejoReportes(
+                    ruta, REPORTS_MIRROR_MAX_AGE, REPORTS_MIRROR_PAGE, REPORTS_MIRROR_LOOKBACK
+                )
+    return espejo_reportes
+
+
+def _leer_reportes_desde(desde_id: int, limite: int) -> list:
+    """Página de la tabla de Supabase con id mayor que desde_id, para sincronizar el espejo."""
+    table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
+    return (
+        get_supabase_client().table(table_name).select(",".join(COLUMNAS_REPORTE))
+        .gt("id", desde_id).order("id").limit(limite).execute().data
+    )
+
+
+def base_analitica() -> Optional[SQLiteReports]:
+    """
+    Base local para las consultas analíticas: la SQLite de REPORTS_SQLITE_PATH o el espejo.
+
+    El espejo se sincroniza si pasaron REPORTS_MIRROR_MAX_AGE segundos; si Supabase no
+    responde y el espejo quedó atrasado devuelve None y la consulta va a Supabase (bloqueante).
+    """
+    local = get_sqlite_reports()
+    if local is not None:
+        return local
+    espejo = get_espejo_reportes()
+    if espejo is not None and espejo.al_dia_o_sincronizar(_leer_reportes_desde):
+        return espejo
+    return None
+
+
+stats_cache: Optional[StatsCache] = None
+
+
+def get_stats_cache() -> StatsCache:
+    global stats_cache
+    if stats_cache is None:
+        stats_cache = StatsCache(
+            _respuesta_stats,
+            ttl=float(os.getenv("STATS_CACHE_TTL", "300")),
+            max_entries=int(os.getenv("STATS_CACHE_SIZE", "64")),
+        )
+    return stats_cache
+
+
+# Códigos de PostgREST (no encontró la función en su caché de esquema) y de Postgres
+# (undefined_function) cuando falta una función de supabase/migrations.
+CODIGOS_FUNCION_INEXISTENTE = {"PGRST202", "42883"}
+
+
+def _funcion_inexistente(error: Exception) -> bool:
+    return getattr(error, "code", None) in CODIGOS_FUNCION_INEXISTENTE
+
+
+def _calcular_stats(start_date: Optional[str], end_date: Optional[str], month_prefix: str):
+    """
+    Consulta la base y devuelve (agregados, recientes, estado).
+
+    El estado con los contadores completos solo se pide para las ventanas que la caché
+    actualiza de forma incremental; en los demás rangos es None.
+    """
+    incremental = es_ventana_incremental(start_date, end_date, month_prefix)
+
+    local = base_analitica()
+    if local is not None:
+        recientes = local.recientes(start_date, end_date)
+        if not incremental:
+            return local.stats(start_date, end_date, month_prefix), recientes, None
+        estado = EstadoStats.desde_detalle(month_prefix, local.stats_detalle(start_date, end_date, month_prefix), recientes)
+        return estado.agregados(), recientes, estado
+
+    table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
+    client = get_supabase_client()
+
+    query = client.table(table_name).select("*")
+    
+    # Filtrar por fecha si se proporcionan
+    if start_date:
+        query = query.gte("fecha_dia", start_date)
+    if end_date:
+        query = query.lte("fecha_dia", end_date)
+
+    # Los contadores se calculan en Postgres (supabase/migrations/); solo viajan los
+    # agregados y los 10 reportes más recientes.
+    try:
+        agregados = client.rpc("reportes_stats_detalle" if incremental else "reportes_stats", {
+            "start_date": start_date,
+            "end_date": end_date,
+            "month_prefix": month_prefix,
+        }).execute().data
+    except Exception as e:
+        # Solo si la función no existe (migración sin aplicar); cualquier otro error sube y da 500.
+        if not _funcion_inexistente(e):
+            raise
+        agregados = None
+
+    if agregados is None:
+        # Las funciones aún no existen en la base: se cuentan todas las filas aquí.
+        estado = EstadoStats.desde_filas(month_prefix, query.order("fecha", desc=True, nullsfirst=False).execute().data)
+        return estado.agregados(), estado.recientes, estado
+
+    recientes = query.order("fecha", desc=True, nullsfirst=False).limit(10).execute().data
+    if not incremental:
+        return agregados, recientes, None
+    estado = EstadoStats.desde_detalle(month_prefix, agregados, recientes)
+    return estado.agregados(), recientes, estado
+
 
 @app.get("/api/stats")
 async def get_stats(start_date: Optional[str] = None, end_date: Optional[str] = None):
+    start_date = _validar_fecha("start_date", start_date)
+    end_date = _validar_fecha("end_date", end_date)
     try:
-        table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
-        client = get_supabase_client()
-        
-        query = client.table(table_name).select("*")
-        
-        # Filtrar por fecha si se proporcionan
-        if start_date:
-            query = query.gte("fecha", start_date)
-        if end_date:
-            query = query.lte("fecha", end_date)
-            
-        response = query.order("fecha", desc=True).execute()
-        data = response.data
-
-        if not data:
-            return JSONResponse(content={
-                "total_visits": 0,
-                "sedes_count": 0,
-                "risks_detected": 0,
-                "visits_this_month": 0,
-                "risks_distribution": {"alto": 0, "moderado": 0, "bajo": 0},
-                "visits_by_personnel": [],
-                "recent_reports": []
-            })
-
-        df = pd.DataFrame(data)
-        
-        # Estadísticas básicas
-        total_visits = len(df)
-        sedes_count = df['sede'].nunique() if 'sede' in df.columns else 0
-        
-        # Distribución de riesgos
-        risks_dist = {"alto": 0, "moderado": 0, "bajo": 0}
-        if 'clasificacion_riesgo' in df.columns:
-            for risk in df['clasificacion_riesgo']:
-                risk_lower = str(risk).lower()
-                if 'alto' in risk_lower: risks_dist["alto"] += 1
-                elif 'bajo' in risk_lower: risks_dist["bajo"] += 1
-                else: risks_dist["moderado"] += 1
-        
-        risks_detected = risks_dist["alto"] + risks_dist["moderado"]
-
         # Visitas este mes
-        from datetime import datetime
-        now = datetime.now()
-        current_month_str = now.strftime('%Y-%m')
-        
-        visits_this_month = 0
-        if 'fecha' in df.columns:
-            visits_this_month = len(df[df['fecha'].str.startswith(current_month_str)])
-
-        # Visitas por responsable
-        personnel_stats = []
-        if 'nombre_responsable_visita' in df.columns:
-            personnel_counts = df['nombre_responsable_visita'].value_counts()
-            personnel_stats = [
-                {"nombre": name, "cantidad": int(count)} 
-                for name, count in personnel_counts.items()
-            ]
-
-        return JSONResponse(content={
-            "total_visits": total_visits,
-            "sedes_count": sedes_count,
-            "risks_detected": risks_detected,
-            "visits_this_month": visits_this_month,
-            "risks_distribution": risks_dist,
-            "visits_by_personnel": personnel_stats[:10], # Top 10 responsables
-            "recent_reports": data[:10] # Últimos 10 registros
-        })
+        current_month_str = datetime.now().strftime('%Y-%m')
+
+        clave = (start_date, end_date, current_month_str)
+        cache = get_stats_cache()
+        respuesta = cache.get(clave)
+        if respuesta is None:
+            generacion = cache.generacion
+            agregados, recientes, estado = await en_db(_calcular_stats, *clave)
+            respuesta = cache.put(clave, _respuesta_stats(agregados, recientes), estado, generacion)
+
+        return JSONResponse(content=respuesta, headers={"Age": str(int(respuesta["cache"]["age_seconds"]))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
+
+
+AGRUPACIONES_TENDENCIAS = ("sede", "riesgo", "responsable")
+
+
+def _validar_mes(nombre: str, valor: Optional[str]) -> Optional[str]:
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{nombre} debe ser un mes YYYY-MM.")
+
+
+def _consultar_tendencias(agrupar: Optional[str], desde: Optional[str], hasta: Optional[str], sede: Optional[str]) -> list:
+    local = base_analitica()
+    if local is not None:
+        return local.tendencias(agrupar, desde, hasta, sede)
+    return get_supabase_client().rpc("reportes_tendencias", {
+        "agrupar": agrupar,
+        "desde": desde,
+        "hasta": hasta,
+        "filtro_sede": sede,
+    }).execute().data or []
+
+
+@app.get("/api/trends")
+async def get_trends(
+    group_by: Optional[str] = None,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    sede: Optional[str] = None,
+):
+    """
+    Visitas, calificación promedio y riesgos por mes, en total o por sede, riesgo o responsable.
+
+    Sale de los rollups por (mes, sede, riesgo, responsable) que mantienen los triggers de la
+    base, así el costo depende de la cantidad de grupos y no de la de reportes.
+    """
+    if group_by is not None and group_by not in AGRUPACIONES_TENDENCIAS:
+        raise HTTPException(status_code=400, detail=f"group_by debe ser uno de: {', '.join(AGRUPACIONES_TENDENCIAS)}.")
+    start_month = _validar_mes("start_month", start_month)
+    end_month = _validar_mes("end_month", end_month)
+
+    try:
+        filas = await en_db(_consultar_tendencias, group_by, start_month, end_month, sede or None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo tendencias: {str(e)}")
+
+    series = []
+    for fila in filas:
+        con_calificacion = int(fila["con_calificacion"] or 0)
+        series.append({
+            "month": fila["mes"],
+            # Los rollups guardan la sede o el responsable faltante como texto vacío.
+            "key": fila["clave"] or None,
+            "visits": int(fila["visitas"]),
+            "average_score": (
+                round(float(fila["suma_calificacion"]) / con_calificacion, 2) if con_calificacion else None
+            ),
+            "risks_distribution": {riesgo: int(fila[riesgo] or 0) for riesgo in RIESGOS},
+        })
+    return JSONResponse(content={"group_by": group_by, "series": series})
@@ -6,6 +6,14 @@ import pandas as pd
 from io import BytesIO
 import uvicorn
 import os
+import sys
+from pathlib import Path
+
+# Diccionario de cargos y ubicación de campos compartidos con la API
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from api._cargos import get_role_matcher  # noqa: E402
+from api._layout import LayoutCache, resolver_csv, resolver_dataframe, resolver_xlsx  # noqa: E402
+from api._xlsx import LibroXlsx  # noqa: E402
 
 app = FastAPI(title="Excel Processor Microservice")
 
@@ -37,66 +45,61 @@ def limpiar_dato(valor):
     return resultado
 
 def separar_profesional_cargo(texto):
-    """Separa el nombre del cargo del profesional."""
-    if not texto or texto == "N/A":
-        return {"nombre": "N/A", "cargo": "N/A"}
-
-    texto_limpio = str(texto).strip()
-    cargos = [
-        "Auxiliar de laboratorio", "Auxiliar de Laboratorio", "Bacteriologa",
-        "Enfermería", "Enfermeria", "Profesional Enfermería", 
-        "Profesional Enfermeria", "Profesional"
-    ]
-
-    for cargo in cargos:
-        if cargo.lower() in texto_limpio.lower():
-            # Usar split con case insensitive y límite para no romper nombres
-            import re
-            partes = re.split(re.escape(cargo), texto_limpio, flags=re.IGNORECASE)
-            nombre = partes[0].strip()
-            return {"nombre": nombre, "cargo": cargo}
-
-    return {"nombre": texto_limpio, "cargo": "N/A"}
+    """
+    Separa el nombre del cargo del profesional.
+    Usa el diccionario de cargos compartido con la API (config/cargos.json).
+    Retorna: {nombre: str, cargo: str}
+    """
+    return get_role_matcher().separar(texto)
+
+# Modo de lectura para .xlsx: "celdas" (solo las celdas necesarias) o "pandas" (hoja completa)
+EXTRACT_READER = os.getenv('EXTRACT_READER', 'celdas').lower()
+
+# Layouts de plantilla ya resueltos en este proceso
+layout_cache = LayoutCache()
+
 
 def extract_data(file_bytes: bytes, filename: str):
-    """Extract data based on coordinates and advanced logic from reportinfo.py."""
+    """
+    Extract data from a visit report.
+    Los campos se ubican por su etiqueta (FECHA, SEDE / CLIENTE...), ver api/_layout.py.
+    """
     try:
         file_stream = BytesIO(file_bytes)
         if filename.endswith('.xlsx'):
-            df = pd.read_excel(file_stream, header=None)
+            if EXTRACT_READER == 'pandas':
+                _, celdas = resolver_dataframe(pd.read_excel(file_stream, header=None))
+            else:
+                with LibroXlsx(file_stream) as libro:
+                    _, celdas = resolver_xlsx(libro, layout_cache)
         else:
-            df = pd.read_csv(file_stream, header=None)
+            _, celdas = resolver_csv(file_bytes)
 
-        # Extraction logic based on coordinates from reportinfo.py (snippet provided by user)
-        # FECHA: iloc[5, 2], SEDE: iloc[6, 2], PROFESIONALES: iloc[7, 2], RESPONSABLE: iloc[8, 2]
-        # CALIFICACIÓN: iloc[20, 2], RIESGO: iloc[21, 2]
-        
-        prof_reciben_raw = limpiar_dato(df.iloc[7, 2]) if df.shape[0] > 7 and df.shape[1] > 2 else "N/A"
+        prof_reciben_raw = limpiar_dato(celdas["profesionales"])
         profesionales_lista = [p.strip() for p in prof_reciben_raw.split('\n') if p.strip() and p.strip() != "N/A"]
         
         profesionales_procesados = [separar_profesional_cargo(p) for p in profesionales_lista]
         nombres_profesionales = " | ".join([p['nombre'] for p in profesionales_procesados]) if profesionales_procesados else "N/A"
         cargos_profesionales = " | ".join([p['cargo'] for p in profesionales_procesados]) if profesionales_procesados else "N/A"
 
-        responsable_raw = limpiar_dato(df.iloc[8, 2]) if df.shape[0] > 8 and df.shape[1] > 2 else "N/A"
+        responsable_raw = limpiar_dato(celdas["responsable"])
         responsable = separar_profesional_cargo(responsable_raw)
 
         extracted = {
             "ARCHIVO": filename,
-            "Sede": limpiar_dato(df.iloc[6, 2]) if df.shape[0] > 6 and df.shape[1] > 2 else "N/A",
-            "Fecha": limpiar_dato(df.iloc[5, 2]) if df.shape[0] > 5 and df.shape[1] > 2 else "N/A",
+            "Sede": limpiar_dato(celdas["sede"]),
+            "Fecha": limpiar_dato(celdas["fecha"]),
             "NOMBRE PROFESIONALES QUE RECIBEN": nombres_profesionales,
             "CARGO PROFESIONALES QUE RECIBEN": cargos_profesionales,
             "NOMBRE RESPONSABLE DE VISITA": responsable['nombre'],
             "CARGO RESPONSABLE DE VISITA": responsable['cargo'],
-            "CALIFICACIÓN OBTENIDA": limpiar_dato(df.iloc[20, 2]) if df.shape[0] > 20 and df.shape[1] > 2 else "N/A",
-            "CLASIFICACIÓN POR RIESGO": limpiar_dato(df.iloc[21, 2]) if df.shape[0] > 21 and df.shape[1] > 2 else "N/A"
+            "CALIFICACIÓN OBTENIDA": limpiar_dato(celdas["calificacion"]),
+            "CLASIFICACIÓN POR RIESGO": limpiar_dato(celdas["riesgo"])
         }
-        
-        # Also include coordinates from the first prompt just in case
-        if df.shape[0] > 29 and df.shape[1] > 3:
-            extracted["Calificación Total"] = limpiar_dato(df.iloc[29, 3])
-            extracted["Calificación Riesgo"] = limpiar_dato(df.iloc[30, 3])
+
+        # Claves de respuestas anteriores (antes salían de celdas fijas D30 y D31): mismos valores por etiqueta
+        extracted["Calificación Total"] = extracted["CALIFICACIÓN OBTENIDA"]
+        extracted["Calificación Riesgo"] = extracted["CLASIFICACIÓN POR RIESGO"]
 
         return extracted
     except Exception as e:
@@ -1,8 +1,61 @@
-import pandas as pd
+"""
+Consolida los informes de visita de una carpeta en Reporte_Consolidado_INFO.xlsx.
+
+Guarda un manifiesto con los archivos ya procesados (ruta, tamaño, mtime y hash) y, en una
+SQLite junto a él, la fila extraída de cada uno: en cada ejecución solo se extraen los
+archivos nuevos o modificados, en un pool de procesos, y el consolidado (XLSX, CSV o
+Parquet) se escribe fila a fila leyendo esa base y lo recién extraído, sin cargar todas las
+filas en memoria.
+
+Uso:
+    python reportinfo.py [carpeta] [--salida archivo.xlsx] [--formato xlsx|csv|parquet] [--workers N]
+                         [--recursivo] [--completo]
+"""
+import argparse
+import hashlib
+import json
 import os
-import glob
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
 from pathlib import Path
 
+import pandas as pd
+
+# Diccionario de cargos y ubicación de campos compartidos con la API
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from api._cargos import get_role_matcher  # noqa: E402
+from api._export import CATEGORIA, FECHA, FORMATOS, NUMERO, TEXTO, EscritorConsolidado  # noqa: E402
+from api._layout import ETIQUETAS_CAMPOS, LayoutCache, resolver_csv, resolver_dataframe, resolver_xlsx  # noqa: E402
+from api._xlsx import LibroXlsx  # noqa: E402
+
+SALIDA_DEFECTO = "Reporte_Consolidado_INFO"
+MANIFIESTO_DEFECTO = ".reportinfo_manifest.json"
+EXTENSIONES = (".xlsx", ".csv")
+
+# Modo de lectura para .xlsx: "celdas" (solo las celdas necesarias) o "pandas" (hoja completa)
+EXTRACT_READER = os.getenv('EXTRACT_READER', 'celdas').lower()
+
+# Columnas del consolidado y su tipo en Parquet
+COLUMNAS_CONSOLIDADO = [
+    ('ARCHIVO', TEXTO),
+    ('FECHA', FECHA),
+    ('SEDE / CLIENTE', TEXTO),
+    ('NOMBRE PROFESIONALES QUE RECIBEN', TEXTO),
+    ('CARGO PROFESIONALES QUE RECIBEN', TEXTO),
+    ('NOMBRE RESPONSABLE DE VISITA', TEXTO),
+    ('CARGO RESPONSABLE DE VISITA', TEXTO),
+    ('CALIFICACIÓN OBTENIDA', NUMERO),
+    ('CLASIFICACIÓN POR RIESGO', CATEGORIA),
+    ('LAYOUT', TEXTO),
+]
+
+# Layouts de plantilla ya resueltos en este proceso (cada worker del pool tiene el suyo)
+layout_cache = LayoutCache()
+
 def limpiar_dato(valor):
     """Limpia y normaliza datos, maneja fechas correctamente"""
     if pd.isna(valor):
@@ -25,76 +78,40 @@ def limpiar_dato(valor):
 def separar_profesional_cargo(texto):
     """
     Separa el nombre del cargo del profesional.
-    Busca palabras clave: 'Enfermería', 'Enfermeria', 'Auxiliar de laboratorio', 'Bacteriólogo', etc.
+    Usa el diccionario de cargos compartido con la API (config/cargos.json).
     Retorna: {nombre: str, cargo: str}
     """
-    if not texto or texto == "N/A":
-        return {"nombre": "N/A", "cargo": "N/A"}
-
-    texto_limpio = str(texto).strip()
-
-    # Lista de cargos a buscar (ordenada por mayor especificidad)
-    cargos = [
-        "Auxiliar de laboratorio",
-        "Auxiliar de Laboratorio",
-        "Bacteriólogo",
-        "Bacteriologo",
-        "Bacteriologo POCT",
-        "Enfermería",
-        "Enfermeria",
-        "Profesional Enfermería",
-        "Profesional Enfermeria",
-        "Profesional"
-    ]
-
-    # Buscar cargo en el texto
-    cargo_encontrado = None
-    for cargo in cargos:
-        if cargo.lower() in texto_limpio.lower():
-            cargo_encontrado = cargo
-            break
-
-    # Si encontró cargo, separar nombre
-    if cargo_encontrado:
-        partes = texto_limpio.split(cargo_encontrado)
-        nombre = partes[0].strip()
-        return {"nombre": nombre, "cargo": cargo_encontrado}
-
-    return {"nombre": texto_limpio, "cargo": "N/A"}
-
-def extraer_datos_visita(ruta_archivo):
+    return get_role_matcher().separar(texto)
+
+def version_extraccion():
+    """Cambia si cambian las etiquetas buscadas o el diccionario de cargos: invalida el manifiesto."""
+    huella = json.dumps({'etiquetas': ETIQUETAS_CAMPOS, 'cargos': get_role_matcher().huella}, sort_keys=True)
+    return hashlib.sha256(huella.encode()).hexdigest()[:12]
+
+def extraer_datos_visita(ruta_archivo, contenido=None, propagar=False):
     """
-    Extrae datos de archivos XLSX
-    Estructura del archivo:
-    - Fila 5, Col 2: FECHA
-    - Fila 6, Col 2: SEDE / CLIENTE
-    - Fila 7, Col 2: PROFESIONALES QUE RECIBEN LA VISITA
-    - Fila 8, Col 2: RESPONSABLE DE REALIZAR LA VISITA
-    - Fila 20, Col 2: CALIFICACIÓN OBTENIDA
-    - Fila 21, Col 2: CLASIFICACIÓN POR RIESGO
+    Extrae los datos de un informe XLSX o CSV.
+    Los campos se ubican por su etiqueta (FECHA, SEDE / CLIENTE, CALIFICACIÓN OBTENIDA...), ver api/_layout.py.
+    Si falla retorna None, o con propagar=True deja pasar la excepción (el manifiesto guarda su mensaje).
     """
     try:
         extension = Path(ruta_archivo).suffix.lower()
+        origen = BytesIO(contenido) if contenido is not None else ruta_archivo
 
         # Detectar tipo de archivo
         if extension == '.xlsx':
-            df = pd.read_excel(ruta_archivo, header=None)
+            if EXTRACT_READER == 'pandas':
+                layout, celdas = resolver_dataframe(pd.read_excel(origen, header=None))
+            else:
+                with LibroXlsx(origen) as libro:
+                    layout, celdas = resolver_xlsx(libro, layout_cache)
         elif extension == '.csv':
-            df = pd.read_csv(ruta_archivo, header=None)
+            layout, celdas = resolver_csv(contenido if contenido is not None else ruta_archivo)
         else:
-            print(f"Formato no soportado: {extension}")
-            return None
-
-        # Extracción de datos por coordenadas correctas (usando indexación desde 0)
-        # Fila 5 (índice 5), Columna 2 (índice 2) = FECHA
-        # Fila 6 (índice 6), Columna 2 (índice 2) = SEDE / CLIENTE
-        # Fila 7 (índice 7), Columna 2 (índice 2) = PROFESIONALES QUE RECIBEN
-        # Fila 8 (índice 8), Columna 2 (índice 2) = RESPONSABLE DE VISITA
-        # Fila 20 (índice 20), Columna 2 (índice 2) = CALIFICACIÓN OBTENIDA
-        # Fila 21 (índice 21), Columna 2 (índice 2) = CLASIFICACIÓN POR RIESGO
+            raise ValueError(f"Formato no soportado: {extension}")
 
         # Datos de profesionales que reciben la visita (puede haber múltiples)
-        prof_reciben_raw = limpiar_dato(df.iloc[7, 2]) if df.shape[0] > 7 and df.shape[1] > 2 else "N/A"
+        prof_reciben_raw = limpiar_dato(celdas['profesionales'])
 
         # Dividir por salto de línea si hay múltiples profesionales
         profesionales_lista = [p.strip() for p in prof_reciben_raw.split('\n') if p.strip() and p.strip() != "N/A"]
@@ -106,7 +123,7 @@ def extraer_datos_visita(ruta_archivo):
             profesionales_procesados.append(prof_data)
 
         # Datos del responsable de la visita
-        responsable_raw = limpiar_dato(df.iloc[8, 2]) if df.shape[0] > 8 and df.shape[1] > 2 else "N/A"
+        responsable_raw = limpiar_dato(celdas['responsable'])
         responsable = separar_profesional_cargo(responsable_raw)
 
         # Crear lista de profesionales en formato string
@@ -115,53 +132,266 @@ def extraer_datos_visita(ruta_archivo):
 
         datos = {
             'ARCHIVO': os.path.basename(ruta_archivo),
-            'FECHA': limpiar_dato(df.iloc[5, 2]) if df.shape[0] > 5 and df.shape[1] > 2 else "N/A",
-            'SEDE / CLIENTE': limpiar_dato(df.iloc[6, 2]) if df.shape[0] > 6 and df.shape[1] > 2 else "N/A",
+            'FECHA': limpiar_dato(celdas['fecha']),
+            'SEDE / CLIENTE': limpiar_dato(celdas['sede']),
             'NOMBRE PROFESIONALES QUE RECIBEN': nombres_profesionales,
             'CARGO PROFESIONALES QUE RECIBEN': cargos_profesionales,
             'NOMBRE RESPONSABLE DE VISITA': responsable['nombre'],
             'CARGO RESPONSABLE DE VISITA': responsable['cargo'],
-            'CALIFICACIÓN OBTENIDA': limpiar_dato(df.iloc[20, 2]) if df.shape[0] > 20 and df.shape[1] > 2 else "N/A",
-            'CLASIFICACIÓN POR RIESGO': limpiar_dato(df.iloc[21, 2]) if df.shape[0] > 21 and df.shape[1] > 2 else "N/A"
+            'CALIFICACIÓN OBTENIDA': limpiar_dato(celdas['calificacion']),
+            'CLASIFICACIÓN POR RIESGO': limpiar_dato(celdas['riesgo']),
+            'LAYOUT': layout.id,
         }
 
         return datos
     except Exception as e:
+        if propagar:
+            raise
         print(f"❌ Error al procesar {os.path.basename(ruta_archivo)}: {e}")
         return None
 
-# --- CONFIGURACIÓN DE CARPETAS ---
-carpeta_input ='./'
-print(f"📁 Buscando archivos en: {carpeta_input}\n")
-
-# Buscar archivos CSV y XLSX (excluyendo reportes generados)
-todos_archivos = glob.glob(os.path.join(carpeta_input, "*.xlsx")) + glob.glob(os.path.join(carpeta_input, "*.csv"))
-archivos = [f for f in todos_archivos if not os.path.basename(f).startswith("Reporte_")]
-
-if not archivos:
-    print("⚠️  No se encontraron archivos CSV o XLSX")
-else:
-    print(f"✅ Se encontraron {len(archivos)} archivo(s)\n")
-
-    base_datos = []
-    for f in archivos:
-        print(f"📄 Procesando: {os.path.basename(f)}")
-        info = extraer_datos_visita(f)
-        if info:
-            base_datos.append(info)
-
-    if base_datos:
-        # Convertir a DataFrame y guardar
-        df_final = pd.DataFrame(base_datos)
-
-        # Guardar en Excel con formato
-        output_file = os.path.join(carpeta_input, "Reporte_Consolidado_INFO.xlsx")
-        df_final.to_excel(output_file, index=False, sheet_name="Reportes")
-
-        print(f"\n✅ Reporte generado exitosamente:")
-        print("----------------------------------------------------------------------")
-        print(f"   📊 Archivo: {output_file}")
-        print(f"   📈 Registros: {len(df_final)}")
-        print(f"\n{df_final.to_string()}")
-    else:
-        print("⚠️  No se pudo procesar ningún archivo")
\ No newline at end of file
+def procesar_archivo(ruta, hash_previo=None):
+    """
+    Tarea del pool: lee el archivo una vez, calcula su hash y lo extrae si el contenido cambió.
+    Retorna (ruta, sha256, datos, error, segundos); datos es None si el contenido es el mismo de
+    antes o si la extracción falló, y en ese caso error tiene el tipo y mensaje de la excepción.
+    """
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as fh:
+        contenido = fh.read()
+    digest = hashlib.sha256(contenido).hexdigest()
+    datos = error = None
+    if digest != hash_previo:
+        try:
+            datos = extraer_datos_visita(ruta, contenido, propagar=True)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    return ruta, digest, datos, error, time.perf_counter() - inicio
+
+def buscar_archivos(carpeta, recursivo, excluidos):
+    """Informes .xlsx/.csv de la carpeta, sin reportes generados ni temporales de Office"""
+    patron = '**/*' if recursivo else '*'
+    archivos = []
+    for ruta in sorted(Path(carpeta).glob(patron)):
+        nombre = ruta.name
+        if (not ruta.is_file() or not nombre.lower().endswith(EXTENSIONES)
+                or nombre.startswith(("Reporte_", "~$", ".")) or ruta.resolve() in excluidos):
+            continue
+        archivos.append(ruta)
+    return archivos
+
+class AlmacenFilas:
+    """
+    Filas extraídas por archivo, en una SQLite junto al manifiesto (<manifiesto>.db).
+    Los cambios se confirman con conservar(), justo antes de guardar el manifiesto: si la
+    ejecución falla a la mitad, la base y el manifiesto quedan como en la ejecución anterior.
+    """
+
+    def __init__(self, ruta):
+        self.conn = sqlite3.connect(ruta)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS filas (clave TEXT PRIMARY KEY, datos TEXT NOT NULL)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+    def claves(self):
+        return {clave for clave, in self.conn.execute("SELECT clave FROM filas")}
+
+    def guardar(self, clave, datos):
+        self.conn.execute(
+            "INSERT INTO filas (clave, datos) VALUES (?, ?) ON CONFLICT (clave) DO UPDATE SET datos = excluded.datos",
+            (clave, json.dumps(datos, ensure_ascii=False)),
+        )
+
+    def leer(self, clave):
+        fila = self.conn.execute("SELECT datos FROM filas WHERE clave = ?", (clave,)).fetchone()
+        return json.loads(fila[0])
+
+    def filas(self, claves):
+        """Filas de las claves indicadas, ordenadas por clave, de a una"""
+        for clave, datos in self.conn.execute("SELECT clave, datos FROM filas ORDER BY clave"):
+            if clave in claves:
+                yield json.loads(datos)
+
+    def conservar(self, claves):
+        """Borra las filas de los archivos que ya no están en el manifiesto y confirma los cambios"""
+        self.conn.executemany("DELETE FROM filas WHERE clave = ?", [(c,) for c in self.claves() - set(claves)])
+        self.conn.commit()
+
+def ruta_almacen(ruta_manifiesto):
+    return str(Path(ruta_manifiesto).with_suffix('.db'))
+
+def cargar_manifiesto(ruta, version):
+    """Manifiesto anterior, o uno vacío si no existe, está dañado o es de otra versión de extracción"""
+    try:
+        with open(ruta, encoding='utf-8') as fh:
+            manifiesto = json.load(fh)
+    except (OSError, ValueError):
+        return {'version': version, 'archivos': {}}
+    if manifiesto.get('version') != version:
+        print("ℹ️  La lógica de extracción cambió: se procesarán todos los archivos de nuevo")
+        return {'version': version, 'archivos': {}}
+    return manifiesto
+
+def permisos_destino(ruta):
+    """Permisos que tendría el archivo escrito directamente: los del existente o 0666 menos la umask"""
+    try:
+        return os.stat(ruta).st_mode & 0o7777
+    except OSError:
+        mascara = os.umask(0)
+        os.umask(mascara)
+        return 0o666 & ~mascara
+
+def reemplazar(temporal, ruta):
+    """mkstemp crea el temporal con 0600: se le dan los permisos del destino antes de reemplazarlo"""
+    os.chmod(temporal, permisos_destino(ruta))
+    os.replace(temporal, ruta)
+
+def guardar_manifiesto(ruta, manifiesto):
+    """Escritura atómica: un manifiesto a medio escribir haría reprocesar todo"""
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(manifiesto, fh, ensure_ascii=False, indent=1)
+        reemplazar(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def consolidar(carpeta, salida, ruta_manifiesto, workers=None, recursivo=False, completo=False,
+               formato='xlsx', tamano_bloque=1000):
+    """
+    Extrae los archivos nuevos o modificados y reescribe el consolidado; retorna la cantidad de registros.
+    Las filas se escriben a medida que se leen de la base del manifiesto o se extraen (ver api/_export.py),
+    sin armar el consolidado en memoria.
+    Los archivos que fallan quedan en manifiesto['errores'] con su mensaje y se reintentan en la próxima ejecución.
+    """
+    with AlmacenFilas(ruta_almacen(ruta_manifiesto)) as almacen:
+        return _consolidar(almacen, carpeta, salida, ruta_manifiesto, workers, recursivo, completo, formato,
+                           tamano_bloque)
+
+def _consolidar(almacen, carpeta, salida, ruta_manifiesto, workers, recursivo, completo, formato, tamano_bloque):
+    version = version_extraccion()
+    manifiesto = {'version': version, 'archivos': {}} if completo else cargar_manifiesto(ruta_manifiesto, version)
+    anteriores = manifiesto['archivos']
+
+    print(f"📁 Buscando archivos en: {carpeta}\n")
+    archivos = buscar_archivos(carpeta, recursivo, {Path(salida).resolve(), Path(ruta_manifiesto).resolve()})
+    if not archivos:
+        print("⚠️  No se encontraron archivos CSV o XLSX")
+
+    # Sin su fila en la base (p. ej. un manifiesto de una versión anterior del script) el archivo se vuelve a extraer
+    guardadas = almacen.claves()
+    actuales = {}
+    pendientes = []
+    for ruta in archivos:
+        clave = ruta.relative_to(carpeta).as_posix()
+        estado = ruta.stat()
+        previo = anteriores.get(clave) if clave in guardadas else None
+        if previo and previo['size'] == estado.st_size and previo['mtime_ns'] == estado.st_mtime_ns:
+            actuales[clave] = {'size': previo['size'], 'mtime_ns': previo['mtime_ns'], 'sha256': previo['sha256']}
+        else:
+            pendientes.append((clave, ruta, estado, previo))
+
+    eliminados = sorted(set(anteriores) - {ruta.relative_to(carpeta).as_posix() for ruta in archivos})
+    print(f"✅ {len(archivos)} archivo(s): {len(actuales)} sin cambios, {len(pendientes)} nuevos o modificados, "
+          f"{len(eliminados)} eliminados\n")
+
+    if not (pendientes or eliminados) and os.path.exists(salida):
+        print(f"✅ Sin cambios: {salida} ya está al día ({len(actuales)} registros)")
+        manifiesto['archivos'] = actuales
+        manifiesto['errores'] = {}
+        almacen.conservar(actuales)
+        guardar_manifiesto(ruta_manifiesto, manifiesto)
+        return len(actuales)
+
+    # Se escribe en un temporal junto a la salida y se reemplaza al final: si algo falla, queda el consolidado anterior
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(salida)), suffix=Path(salida).suffix)
+    os.close(fd)
+    extraidos = 0
+    errores = {}
+    try:
+        with EscritorConsolidado(temporal, formato, COLUMNAS_CONSOLIDADO, tamano_bloque) as escritor:
+            for datos in almacen.filas(actuales):
+                escritor.escribir(datos)
+
+            if pendientes:
+                inicio_total = time.perf_counter()
+                max_workers = max(1, min(workers or os.cpu_count() or 1, len(pendientes)))
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    futuros = {
+                        pool.submit(procesar_archivo, str(ruta), (previo or {}).get('sha256')): (clave, estado)
+                        for clave, ruta, estado, previo in pendientes
+                    }
+                    for n, futuro in enumerate(as_completed(futuros), start=1):
+                        clave, estado = futuros[futuro]
+                        try:
+                            _, digest, datos, error, segundos = futuro.result()
+                        except Exception as e:
+                            # Un error del worker (p. ej. BrokenProcessPool) solo afecta a este archivo
+                            error = f"{type(e).__name__}: {e}"
+                        if error:
+                            errores[clave] = error
+                            print(f"[{n}/{len(pendientes)}] ❌ {clave}: {error}")
+                            continue
+                        actuales[clave] = {'size': estado.st_size, 'mtime_ns': estado.st_mtime_ns, 'sha256': digest}
+                        if datos is None:
+                            # Solo cambió la fecha de modificación: se conservan los datos ya extraídos
+                            datos = almacen.leer(clave)
+                            print(f"[{n}/{len(pendientes)}] = {clave} sin cambios de contenido ({segundos * 1000:.1f} ms)")
+                        else:
+                            almacen.guardar(clave, datos)
+                            extraidos += 1
+                            print(f"[{n}/{len(pendientes)}] 📄 {clave} ({segundos * 1000:.1f} ms)")
+                        escritor.escribir(datos)
+                print(f"\n⏱️  {len(pendientes)} archivo(s) en {time.perf_counter() - inicio_total:.2f} s con {max_workers} proceso(s)")
+
+        if escritor.filas:
+            reemplazar(temporal, salida)
+            print(f"\n✅ Reporte generado exitosamente:")
+            print("----------------------------------------------------------------------")
+            print(f"   📊 Archivo: {salida}")
+            print(f"   📈 Registros: {escritor.filas} ({extraidos} nuevos o actualizados)")
+        else:
+            print("⚠️  No se pudo procesar ningún archivo")
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    if errores:
+        print(f"⚠️  {len(errores)} archivo(s) con error (ver 'errores' en {ruta_manifiesto})")
+    manifiesto['errores'] = errores
+    manifiesto['archivos'] = actuales
+    almacen.conservar(actuales)
+    guardar_manifiesto(ruta_manifiesto, manifiesto)
+    return escritor.filas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolida los informes de visita de una carpeta.")
+    parser.add_argument('carpeta', nargs='?', default='./', help="carpeta con los informes .xlsx/.csv (por defecto ./)")
+    parser.add_argument('--salida', help=f"archivo consolidado (por defecto <carpeta>/{SALIDA_DEFECTO}.<formato>)")
+    parser.add_argument('--formato', choices=sorted(FORMATOS),
+                        help="xlsx, csv o parquet (por defecto: según la extensión de --salida, o xlsx)")
+    parser.add_argument('--bloque', type=int, default=1000, help="filas por bloque al escribir parquet")
+    parser.add_argument('--manifiesto', help=f"manifiesto de archivos procesados (por defecto <carpeta>/{MANIFIESTO_DEFECTO})")
+    parser.add_argument('--workers', type=int, help="procesos para extraer (por defecto: núcleos disponibles)")
+    parser.add_argument('--recursivo', action='store_true', help="incluye subcarpetas")
+    parser.add_argument('--completo', action='store_true', help="ignora el manifiesto y procesa todo de nuevo")
+    args = parser.parse_args(argv)
+
+    carpeta = Path(args.carpeta)
+    if not carpeta.is_dir():
+        parser.error(f"no existe la carpeta {carpeta}")
+    formato = args.formato or (Path(args.salida).suffix.lstrip('.').lower() if args.salida else 'xlsx')
+    if formato not in FORMATOS:
+        parser.error(f"formato no soportado: {formato}")
+    salida = args.salida or str(carpeta / (SALIDA_DEFECTO + FORMATOS[formato][1]))
+    ruta_manifiesto = args.manifiesto or str(carpeta / MANIFIESTO_DEFECTO)
+    consolidar(carpeta, salida, ruta_manifiesto, args.workers, args.recursivo, args.completo, formato, args.bloque)
+
+if __name__ == '__main__':
+    main()
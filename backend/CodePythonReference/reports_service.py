@@ -4,9 +4,16 @@ import pandas as pd
 from io import BytesIO
 import uvicorn
 import os
+import sys
 from typing import List
 from pathlib import Path
 
+# Diccionario de cargos y ubicación de campos compartidos con la API
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from api._cargos import get_role_matcher  # noqa: E402
+from api._layout import LayoutCache, resolver_csv, resolver_dataframe, resolver_xlsx  # noqa: E402
+from api._xlsx import LibroXlsx  # noqa: E402
+
 app = FastAPI(title="Reports Generation Microservice")
 
 def limpiar_dato(valor):
@@ -31,58 +38,39 @@ def limpiar_dato(valor):
 def separar_profesional_cargo(texto):
     """
     Separa el nombre del cargo del profesional.
+    Usa el diccionario de cargos compartido con la API (config/cargos.json).
+    Retorna: {nombre: str, cargo: str}
     """
-    if not texto or texto == "N/A":
-        return {"nombre": "N/A", "cargo": "N/A"}
-
-    texto_limpio = str(texto).strip()
-
-    # Lista de cargos a buscar (ordenada por mayor especificidad)
-    cargos = [
-        "Auxiliar de laboratorio",
-        "Auxiliar de Laboratorio",
-        "Bacteriólogo",
-        "Bacteriologo",
-        "Bacteriologo POCT",
-        "Enfermería",
-        "Enfermeria",
-        "Profesional Enfermería",
-        "Profesional Enfermeria",
-        "Profesional"
-    ]
-
-    # Buscar cargo en el texto
-    cargo_encontrado = None
-    for cargo in cargos:
-        if cargo.lower() in texto_limpio.lower():
-            cargo_encontrado = cargo
-            break
-
-    # Si encontró cargo, separar nombre
-    if cargo_encontrado:
-        partes = texto_limpio.split(cargo_encontrado)
-        nombre = partes[0].strip()
-        return {"nombre": nombre, "cargo": cargo_encontrado}
-
-    return {"nombre": texto_limpio, "cargo": "N/A"}
+    return get_role_matcher().separar(texto)
+
+# Modo de lectura para .xlsx: "celdas" (solo las celdas necesarias) o "pandas" (hoja completa)
+EXTRACT_READER = os.getenv('EXTRACT_READER', 'celdas').lower()
+
+# Layouts de plantilla ya resueltos en este proceso
+layout_cache = LayoutCache()
 
 def extraer_datos_contenido(file_bytes: bytes, filename: str):
     """
-    Extrae datos de un archivo (bytes) basándose en la lógica de reportinfo.py
+    Extrae datos de un archivo (bytes) basándose en la lógica de reportinfo.py.
+    Los campos se ubican por su etiqueta, ver api/_layout.py.
     """
     try:
         extension = Path(filename).suffix.lower()
         file_stream = BytesIO(file_bytes)
 
         if extension == '.xlsx':
-            df = pd.read_excel(file_stream, header=None)
+            if EXTRACT_READER == 'pandas':
+                _, celdas = resolver_dataframe(pd.read_excel(file_stream, header=None))
+            else:
+                with LibroXlsx(file_stream) as libro:
+                    _, celdas = resolver_xlsx(libro, layout_cache)
         elif extension == '.csv':
-            df = pd.read_csv(file_stream, header=None)
+            _, celdas = resolver_csv(file_bytes)
         else:
             return None
 
         # Datos de profesionales que reciben la visita
-        prof_reciben_raw = limpiar_dato(df.iloc[7, 2]) if df.shape[0] > 7 and df.shape[1] > 2 else "N/A"
+        prof_reciben_raw = limpiar_dato(celdas['profesionales'])
         profesionales_lista = [p.strip() for p in prof_reciben_raw.split('\n') if p.strip() and p.strip() != "N/A"]
 
         profesionales_procesados = []
@@ -91,7 +79,7 @@ def extraer_datos_contenido(file_bytes: bytes, filename: str):
             profesionales_procesados.append(prof_data)
 
         # Datos del responsable de la visita
-        responsable_raw = limpiar_dato(df.iloc[8, 2]) if df.shape[0] > 8 and df.shape[1] > 2 else "N/A"
+        responsable_raw = limpiar_dato(celdas['responsable'])
         responsable = separar_profesional_cargo(responsable_raw)
 
         # Crear lista de profesionales en formato string
@@ -100,14 +88,14 @@ def extraer_datos_contenido(file_bytes: bytes, filename: str):
 
         datos = {
             'ARCHIVO': filename,
-            'FECHA': limpiar_dato(df.iloc[5, 2]) if df.shape[0] > 5 and df.shape[1] > 2 else "N/A",
-            'SEDE / CLIENTE': limpiar_dato(df.iloc[6, 2]) if df.shape[0] > 6 and df.shape[1] > 2 else "N/A",
+            'FECHA': limpiar_dato(celdas['fecha']),
+            'SEDE / CLIENTE': limpiar_dato(celdas['sede']),
             'NOMBRE PROFESIONALES QUE RECIBEN': nombres_profesionales,
             'CARGO PROFESIONALES QUE RECIBEN': cargos_profesionales,
             'NOMBRE RESPONSABLE DE VISITA': responsable['nombre'],
             'CARGO RESPONSABLE DE VISITA': responsable['cargo'],
-            'CALIFICACIÓN OBTENIDA': limpiar_dato(df.iloc[20, 2]) if df.shape[0] > 20 and df.shape[1] > 2 else "N/A",
-            'CLASIFICACIÓN POR RIESGO': limpiar_dato(df.iloc[21, 2]) if df.shape[0] > 21 and df.shape[1] > 2 else "N/A"
+            'CALIFICACIÓN OBTENIDA': limpiar_dato(celdas['calificacion']),
+            'CLASIFICACIÓN POR RIESGO': limpiar_dato(celdas['riesgo'])
         }
 
         return datos
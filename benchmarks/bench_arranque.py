@@ -0,0 +1,155 @@
+"""
+Arranque en frío de api/index.py: tiempo de import y latencia de la primera petición por endpoint.
+
+Cada medición corre en un proceso nuevo (como una instancia fría de Vercel) que importa
+api.index, hace una sola petición ASGI al endpoint y reporta qué dependencias pesadas
+terminaron cargadas. La base es un SQLite temporal, así que no hace falta red.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_arranque.py [--repeticiones 5] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MUESTRA_XLSX = os.path.join(BASE_DIR, "backend", "CodePythonReference", "INF KENNEDY 09012026.xlsx")
+PESADAS = ("pandas", "numpy", "openpyxl", "supabase", "httpx", "dotenv")
+
+MUESTRA_CSV = (
+    ",FECHA :,2026-01-09 00:00:00\n"
+    ",SEDE / CLIENTE:,CONSULTORIO SAM KENNEDY\n"
+    ",NOMBRE Y CARGO DE LOS PROFESIONALES QUE RECIBEN LA VISITA:,Jully Calderon Fuentes Profesional Enfermería\n"
+    ",NOMBRE Y CARGO RESPONSABLE DE REALIZAR LA VISITA:,Monica Tatiana Montenegro Zabaleta Bacteriologo POCT\n"
+    ",CALIFICACIÓN OBTENIDA,432\n"
+    ",CLASIFICACIÓN POR RIESGO,MEDIANO RIESGO\n"
+).encode()
+
+
+def multipart(nombre: str, contenido: bytes):
+    limite = "----arranque"
+    cuerpo = (
+        f'--{limite}\r\nContent-Disposition: form-data; name="file"; filename="{nombre}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + contenido + f"\r\n--{limite}--\r\n".encode()
+    return cuerpo, f"multipart/form-data; boundary={limite}"
+
+
+def peticiones() -> dict:
+    with open(MUESTRA_XLSX, "rb") as fh:
+        xlsx = fh.read()
+    fila = {"ARCHIVO": "arranque.xlsx", "Sede": "Kennedy", "Fecha": "2026-01-09", "CLASIFICACIÓN POR RIESGO": "ALTO"}
+    return {
+        "health": ("GET", "/api/health", b"", None),
+        "reports": ("GET", "/api/reports", b"", None),
+        "stats": ("GET", "/api/stats", b"", None),
+        "upload-results": ("POST", "/api/upload-results", json.dumps({"results": [fila]}).encode(), "application/json"),
+        "process-excel-xlsx": ("POST", "/api/process-excel", *multipart("arranque.xlsx", xlsx)),
+        "process-excel-csv": ("POST", "/api/process-excel", *multipart("arranque.csv", MUESTRA_CSV)),
+    }
+
+
+async def llamar(app, metodo: str, ruta: str, cuerpo: bytes, tipo) -> int:
+    """Una petición ASGI directa (sin cliente HTTP, que importaría httpx)."""
+    cabeceras = [(b"content-length", str(len(cuerpo)).encode())]
+    if tipo:
+        cabeceras.append((b"content-type", tipo.encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": metodo, "scheme": "http",
+        "path": ruta, "raw_path": ruta.encode(), "query_string": b"", "root_path": "", "headers": cabeceras,
+        "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    enviado = False
+    estado = None
+
+    async def receive():
+        nonlocal enviado
+        if enviado:
+            await asyncio.sleep(3600)
+        enviado = True
+        return {"type": "http.request", "body": cuerpo, "more_body": False}
+
+    async def send(mensaje):
+        nonlocal estado
+        if mensaje["type"] == "http.response.start":
+            estado = mensaje["status"]
+
+    await app(scope, receive, send)
+    return estado
+
+
+def hijo(endpoint: str):
+    metodo, ruta, cuerpo, tipo = peticiones()[endpoint]
+    inicio = time.perf_counter()
+    from api.index import app
+    importacion = time.perf_counter() - inicio
+    cargadas = [modulo for modulo in PESADAS if modulo in sys.modules]
+
+    inicio = time.perf_counter()
+    estado = asyncio.run(llamar(app, metodo, ruta, cuerpo, tipo))
+    primera = time.perf_counter() - inicio
+    print(json.dumps({
+        "import_ms": importacion * 1000,
+        "primera_peticion_ms": primera * 1000,
+        "estado": estado,
+        "cargadas_al_importar": cargadas,
+        "cargadas_tras_peticion": [modulo for modulo in PESADAS if modulo in sys.modules],
+    }))
+
+
+def medir(endpoint: str, repeticiones: int) -> dict:
+    corridas = []
+    for _ in range(repeticiones):
+        with tempfile.TemporaryDirectory() as carpeta:
+            entorno = {
+                **os.environ,
+                "REPORTS_SQLITE_PATH": os.path.join(carpeta, "reportes.db"),
+                "BATCH_WORKERS": "1",
+                "PYTHONPATH": BASE_DIR,
+            }
+            entorno.pop("EXTRACT_CACHE_DIR", None)
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--hijo", endpoint],
+                cwd=BASE_DIR, env=entorno, capture_output=True, text=True, check=True,
+            ).stdout
+            corridas.append(json.loads(salida.strip().splitlines()[-1]))
+    return {
+        "import_ms": round(statistics.median(c["import_ms"] for c in corridas), 1),
+        "primera_peticion_ms": round(statistics.median(c["primera_peticion_ms"] for c in corridas), 1),
+        "estado": corridas[-1]["estado"],
+        "cargadas_al_importar": corridas[-1]["cargadas_al_importar"],
+        "cargadas_tras_peticion": corridas[-1]["cargadas_tras_peticion"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        hijo(args.hijo)
+        return
+
+    resultados = {endpoint: medir(endpoint, args.repeticiones) for endpoint in peticiones()}
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    print(f"{'endpoint':<20} {'import (ms)':>12} {'1a petición (ms)':>17} {'estado':>7}  cargadas tras la petición")
+    for endpoint, r in resultados.items():
+        print(
+            f"{endpoint:<20} {r['import_ms']:>12.1f} {r['primera_peticion_ms']:>17.1f} {r['estado']:>7}  "
+            f"{', '.join(r['cargadas_tras_peticion']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
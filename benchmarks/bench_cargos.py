@@ -0,0 +1,81 @@
+"""
+Compara el separador de cargos compilado contra la búsqueda lineal anterior.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_cargos.py [--filas 200000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._cargos import get_role_matcher  # noqa: E402
+
+NOMBRES = ["Claudia Milena", "Shirley Natalia", "Leidy Johana", "Jully", "Mónica Tatiana", "Íñigo", "Luis Ángel"]
+APELLIDOS = ["Sánchez", "Cantor Durán", "Dávila Mancipe", "Calderón Fuentes", "Montenegro Zabaleta", "Peña"]
+CARGOS = [
+    "Profesional Enfermería", "PROFESIONALES DE ENFERMERIA", "Enfermería", "Bacteriologo POCT",
+    "BACTERIOLOGA DE CALIDAD", "Auxiliar de laboratorio", "Profesional", "",
+]
+
+
+def separar_lineal(texto):
+    """Implementación anterior de api/index.py, conservada como referencia."""
+    if not texto or texto == "N/A":
+        return {"nombre": "N/A", "cargo": "N/A"}
+
+    texto_limpio = str(texto).strip()
+    cargos = [
+        "Auxiliar de laboratorio", "Auxiliar de Laboratorio", "Bacteriologa",
+        "Enfermería", "Enfermeria", "Profesional Enfermería",
+        "Profesional Enfermeria", "Profesional"
+    ]
+
+    for cargo in cargos:
+        if cargo.lower() in texto_limpio.lower():
+            partes = re.split(re.escape(cargo), texto_limpio, flags=re.IGNORECASE)
+            nombre = partes[0].strip()
+            return {"nombre": nombre, "cargo": cargo}
+
+    return {"nombre": texto_limpio, "cargo": "N/A"}
+
+
+def generar(filas: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    return [
+        f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(CARGOS)}".strip()
+        for _ in range(filas)
+    ]
+
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200_000)
+    args = parser.parse_args()
+
+    textos = generar(args.filas)
+    matcher = get_role_matcher()
+
+    t_lineal = cronometrar(lambda: [separar_lineal(t) for t in textos])
+    t_compilado = cronometrar(lambda: [matcher.separar(t) for t in textos])
+    t_columna = cronometrar(matcher.separar_columna, textos)
+
+    print(f"filas: {args.filas}")
+    print(f"lineal (anterior)        {t_lineal:8.3f} s")
+    print(f"compilado por fila       {t_compilado:8.3f} s  ({t_lineal / t_compilado:.1f}x)")
+    print(f"compilado por columna    {t_columna:8.3f} s  ({t_lineal / t_columna:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Extracción de .csv con filas de lista de chequeo de más después del encabezado.
+
+Genera un informe .csv por tamaño (ver benchmarks/generar_informes.py) y mide extract_data
+desde los bytes y desde la ruta (como los temporales de las subidas grandes), junto con
+pd.read_csv(header=None) del archivo completo como referencia. El lector de api/_csv.py
+deja de leer en la fila de la última etiqueta, así que su tiempo no debería crecer con
+las filas extra: termina con código 1 si el tamaño más grande tarda más de --umbral veces
+lo que tarda la referencia, el más chico de al menos TAMANO_MUESTRA bytes (api/_csv.py lee
+esa muestra entera para detectar codificación y separador, así que un archivo menor mide
+una lectura más corta y no si el costo es constante después de la última etiqueta).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_csv.py [--filas 0,2000,10000,100000,1000000] [--repeticiones 20] [--umbral 3] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generar_informes as gen  # noqa: E402
+from api._csv import TAMANO_MUESTRA  # noqa: E402
+from api.index import extract_data  # noqa: E402
+
+
+def minimo_ms(funcion, repeticiones: int) -> float:
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", default="0,2000,10000,100000,1000000", help="filas extra por archivo, separadas por coma")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--umbral", type=float, default=3.0)
+    parser.add_argument("--sin-pandas", action="store_true", help="no mide pd.read_csv")
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for filas_extra in [int(valor) for valor in args.filas.split(",") if valor.strip()]:
+            ruta = os.path.join(carpeta, f"informe_{filas_extra}.csv")
+            gen.escribir_csv(gen.generar_informe(random.Random(1), filas_extra, 0), ruta)
+            with open(ruta, "rb") as fh:
+                contenido = fh.read()
+
+            referencia = None
+            if not args.sin_pandas:
+                import pandas as pd
+
+                referencia = minimo_ms(lambda: pd.read_csv(ruta, header=None), max(args.repeticiones // 10, 1))
+            resultados[filas_extra] = {
+                "bytes": len(contenido),
+                "desde_bytes_ms": round(minimo_ms(lambda: extract_data(contenido, "informe.csv"), args.repeticiones), 3),
+                "desde_ruta_ms": round(minimo_ms(lambda: extract_data(ruta, "informe.csv"), args.repeticiones), 3),
+                "pandas_read_csv_ms": round(referencia, 3) if referencia is not None else None,
+            }
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        print(f"{'filas extra':>12} {'bytes':>12} {'bytes (ms)':>11} {'ruta (ms)':>10} {'pd.read_csv (ms)':>17}")
+        for filas_extra, r in resultados.items():
+            pandas_ms = f"{r['pandas_read_csv_ms']:.2f}" if r["pandas_read_csv_ms"] is not None else "-"
+            print(
+                f"{filas_extra:>12} {r['bytes']:>12} {r['desde_bytes_ms']:>11.2f} {r['desde_ruta_ms']:>10.2f} "
+                f"{pandas_ms:>17}"
+            )
+
+    referencias = [filas for filas, r in resultados.items() if r["bytes"] >= TAMANO_MUESTRA]
+    if len(referencias) < 2:
+        print(f"Sin comparación: hacen falta dos tamaños de al menos {TAMANO_MUESTRA} bytes.", file=sys.stderr)
+        return
+    referencia = resultados[referencias[0]]["desde_ruta_ms"]
+    mayor = resultados[referencias[-1]]["desde_ruta_ms"]
+    print(f"Referencia: {referencias[0]} filas extra; el más grande tarda {mayor / referencia:.1f}x.", file=sys.stderr)
+    if mayor > args.umbral * referencia:
+        print(f"El archivo más grande tarda {mayor / referencia:.1f}x la referencia (umbral {args.umbral}x).",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
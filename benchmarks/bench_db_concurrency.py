@@ -0,0 +1,136 @@
+"""
+Latencia de /api/health mientras hay consultas lentas a Supabase en curso.
+
+Levanta un PostgREST falso local que tarda --demora segundos en responder, lanza
+--lentas peticiones a /api/reports y /api/stats y mide /api/health en paralelo.
+Termina con código 1 si la latencia de health crece con las consultas lentas.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_db_concurrency.py [--demora 1.0] [--lentas 16] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+class FakePostgREST(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    demora = 1.0
+    conexiones = set()
+
+    def _responder(self, cuerpo):
+        FakePostgREST.conexiones.add(self.client_address)
+        longitud = int(self.headers.get("Content-Length") or 0)
+        if longitud:
+            self.rfile.read(longitud)
+        time.sleep(self.demora)
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        self._responder([{"id": 1, "sede": "Kennedy", "fecha": "2026-01-09"}])
+
+    def do_POST(self):
+        if "/rpc/" in self.path:
+            self._responder({
+                "total_visits": 1, "sedes_count": 1, "alto": 0, "moderado": 1, "bajo": 0,
+                "visits_this_month": 0, "visits_by_personnel": [],
+                "sedes": {"Kennedy": 1}, "personal": [],
+            })
+        else:
+            self._responder([])
+
+    def log_message(self, *args):
+        pass
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+async def medir(app, lentas: int, duracion: float) -> dict:
+    import httpx
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://api", timeout=None) as cliente:
+        async def health_durante(segundos):
+            latencias = []
+            fin = time.perf_counter() + segundos
+            while time.perf_counter() < fin:
+                inicio = time.perf_counter()
+                respuesta = await cliente.get("/api/health")
+                respuesta.raise_for_status()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                await asyncio.sleep(0.01)
+            return latencias
+
+        base = await health_durante(duracion / 2)
+
+        inicio_lentas = time.perf_counter()
+        rutas = ["/api/reports", "/api/stats?start_date=2020-01-01&end_date=2020-12-31"]
+        tareas = [asyncio.create_task(cliente.get(rutas[i % len(rutas)])) for i in range(lentas)]
+        con_lentas = await health_durante(duracion)
+        respuestas = await asyncio.gather(*tareas)
+        total_lentas = time.perf_counter() - inicio_lentas
+
+    return {
+        "health_base_p50_ms": round(statistics.median(base), 2),
+        "health_base_p99_ms": round(percentil(base, 0.99), 2),
+        "health_con_lentas_p50_ms": round(statistics.median(con_lentas), 2),
+        "health_con_lentas_p99_ms": round(percentil(con_lentas, 0.99), 2),
+        "health_con_lentas_max_ms": round(max(con_lentas), 2),
+        "lentas": lentas,
+        "lentas_ok": sum(r.status_code == 200 for r in respuestas),
+        "lentas_total_s": round(total_lentas, 2),
+        "conexiones_tcp_a_postgrest": len(FakePostgREST.conexiones),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--demora", type=float, default=1.0, help="segundos que tarda cada consulta falsa")
+    parser.add_argument("--lentas", type=int, default=16, help="consultas lentas simultáneas")
+    parser.add_argument("--json", action="store_true", help="imprime una línea JSON")
+    args = parser.parse_args()
+
+    FakePostgREST.demora = args.demora
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), FakePostgREST)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{servidor.server_address[1]}"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.e30.local"
+    os.environ.pop("REPORTS_SQLITE_PATH", None)
+    from api.index import DB_WORKERS, app
+
+    resultado = asyncio.run(medir(app, args.lentas, args.demora * 2))
+    resultado["db_workers"] = DB_WORKERS
+    servidor.shutdown()
+
+    if args.json:
+        print(json.dumps(resultado))
+    else:
+        for clave, valor in resultado.items():
+            print(f"{clave:>28}: {valor}")
+
+    # Las consultas lentas no deben frenar a health: su latencia debe quedar muy por debajo de la demora.
+    if resultado["health_con_lentas_max_ms"] > args.demora * 1000 / 4:
+        print("health se bloqueó mientras había consultas lentas en curso", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+/api/reports/export sobre una base SQLite con distinta cantidad de reportes.
+
+Por cada tamaño y formato mide el tiempo hasta la primera parte de la respuesta, el tiempo
+total y el pico de memoria de Python (tracemalloc) mientras se consume la respuesta. Como
+la exportación recorre la tabla por páginas y envía cada una al escribirla, el pico no
+debería crecer con las filas: termina con código 1 si en el tamaño más grande supera
+--umbral veces el del más chico.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_export.py [--filas 1000,10000,100000] [--formatos csv,xlsx,parquet] [--umbral 2] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._sqlite import SQLiteReports  # noqa: E402
+
+RIESGOS = ("Alto", "Moderado", "Bajo")
+
+
+def poblar(ruta: str, filas: int):
+    from api.index import map_result_to_db_row
+
+    base = SQLiteReports(ruta)
+    for inicio in range(0, filas, 10000):
+        base.insertar([
+            map_result_to_db_row({
+                "ARCHIVO": f"informe_{i}.xlsx",
+                "Sede": f"Sede {i % 40}",
+                "Fecha": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "NOMBRE PROFESIONALES QUE RECIBEN": f"Profesional {i % 300}",
+                "CARGO PROFESIONALES QUE RECIBEN": "Enfermera jefe",
+                "NOMBRE RESPONSABLE DE VISITA": f"Responsable {i % 25}",
+                "CARGO RESPONSABLE DE VISITA": "Auditor",
+                "CALIFICACIÓN OBTENIDA": f"{i % 100},5",
+                "CLASIFICACIÓN POR RIESGO": RIESGOS[i % 3],
+            })
+            for i in range(inicio, min(inicio + 10000, filas))
+        ])
+
+
+async def medir(formato: str) -> dict:
+    from api.index import export_reports
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    respuesta = await export_reports(formato=formato, fields=None, sede=None, start_date=None, end_date=None,
+                                     riesgo=None)
+    primera = None
+    enviados = 0
+    async for parte in respuesta.body_iterator:
+        if primera is None:
+            primera = time.perf_counter() - inicio
+        enviados += len(parte)
+    total = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "bytes": enviados,
+        "primera_parte_ms": round(primera * 1000, 1),
+        "total_ms": round(total * 1000, 1),
+        "pico_mb": round(pico / 1024 / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", default="1000,10000,100000", help="reportes en la base, separados por coma")
+    parser.add_argument("--formatos", default="csv,xlsx,parquet")
+    parser.add_argument("--umbral", type=float, default=2.0)
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    import api.index as api
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for filas in [int(valor) for valor in args.filas.split(",") if valor.strip()]:
+            ruta = os.path.join(carpeta, f"reportes_{filas}.db")
+            poblar(ruta, filas)
+            # Cada tamaño con su base: se descarta la instancia de la anterior.
+            os.environ["REPORTS_SQLITE_PATH"] = ruta
+            api.sqlite_reports = None
+            if not resultados:
+                # Una vuelta sin medir: los imports de cada formato (pyarrow) no cuentan en el pico.
+                for formato in args.formatos.split(","):
+                    if formato.strip():
+                        asyncio.run(medir(formato))
+            resultados[filas] = {
+                formato: asyncio.run(medir(formato)) for formato in args.formatos.split(",") if formato.strip()
+            }
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        print(f"{'filas':>10} {'formato':>8} {'bytes':>12} {'1ª parte (ms)':>14} {'total (ms)':>11} {'pico (MB)':>10}")
+        for filas, por_formato in resultados.items():
+            for formato, r in por_formato.items():
+                print(
+                    f"{filas:>10} {formato:>8} {r['bytes']:>12} {r['primera_parte_ms']:>14.1f} "
+                    f"{r['total_ms']:>11.1f} {r['pico_mb']:>10.2f}"
+                )
+
+    tamanos = list(resultados.values())
+    fallas = [
+        formato for formato in tamanos[-1]
+        if len(tamanos) > 1 and tamanos[-1][formato]["pico_mb"] > args.umbral * tamanos[0][formato]["pico_mb"]
+    ]
+    if fallas:
+        print(f"El pico de memoria crece con las filas en: {', '.join(fallas)} (umbral {args.umbral}x).",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compara el lector de celdas contra pd.read_excel en extract_data.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_extract_xlsx.py [--repeticiones 20]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import api.index as api  # noqa: E402
+
+MUESTRAS = os.path.join(BASE_DIR, "backend", "CodePythonReference", "INF *.xlsx")
+
+
+def medir(file_bytes: bytes, filename: str, lector: str, repeticiones: int):
+    api.EXTRACT_READER = lector
+    resultado = api.extract_data(file_bytes, filename)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        api.extract_data(file_bytes, filename)
+    return (time.perf_counter() - inicio) / repeticiones, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'archivo':<32} {'pandas (ms)':>12} {'celdas (ms)':>12} {'speedup':>8}  iguales")
+    for ruta in sorted(glob.glob(MUESTRAS)):
+        nombre = os.path.basename(ruta)
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        t_pandas, r_pandas = medir(contenido, nombre, "pandas", args.repeticiones)
+        t_celdas, r_celdas = medir(contenido, nombre, "celdas", args.repeticiones)
+        print(
+            f"{nombre:<32} {t_pandas * 1000:>12.2f} {t_celdas * 1000:>12.2f} "
+            f"{t_pandas / t_celdas:>7.1f}x  {r_pandas == r_celdas}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Genera informes de visita sintéticos con el layout de las plantillas de ejemplo.
+
+Las celdas replican INF FONTIBON / INF KENNEDY (etiquetas en la columna B, valores en la C)
+con sedes, fechas, profesionales, cargos y calificaciones aleatorias. --filas-extra agrega
+filas de lista de chequeo al final para simular archivos grandes, y en la mitad de los
+informes el bloque de calificación queda más abajo (como en las plantillas con observaciones
+más largas) para que haya más de un layout.
+También genera filas de reportes_procesados para medir /api/stats.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/generar_informes.py carpeta [--cantidad 100] [--formato xlsx|csv] [--filas-extra 0]
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+
+SEDES = [
+    "CONSULTORIO SAM KENNEDY", "Servicio Ambulatorio sede SAM FONTIBON", "SAM SUBA", "SAM CALLE 67",
+    "SAM AVENIDA 68", "SAM SOACHA", "SAM CHAPINERO", "SAM USAQUÉN", "SAM BOSA", "SAM TINTAL",
+]
+NOMBRES = ["Claudia Milena", "Shirley Natalia", "Leidy Johana", "Jully", "Mónica Tatiana", "Luis Ángel", "Íngrid"]
+APELLIDOS = ["Sánchez Sánchez", "Cantor Duran", "Davila Mancipe", "Calderon Fuentes", "Montenegro Zabaleta", "Peña"]
+CARGOS = [
+    "Profesional Enfermería", "PROFESIONALES DE ENFERMERIA", "Auxiliar de laboratorio", "Bacteriologo POCT",
+    "BACTERIOLOGA DE CALIDAD", "Enfermería",
+]
+RESPONSABLES = ["Monica Tatiana Montenegro Zabaleta", "Luis Ángel Peña", "Íngrid Cantor"]
+ENCABEZADO = "INFORME VISITA DE ACOMPAÑAMIENTO POINT OF CARE NO INSTRUMENTAL (PRUEBAS RÁPIDAS)"
+TABLA_RIESGO = [
+    ("ALTO RIESGO", "≤ 350", "Requiere intervención prioritaria de las oportunidades de mejora detectadas."),
+    ("MEDIANO RIESGO", "351-449", "Identifique las oportunidades de mejora y gestione planes de acción."),
+    ("BAJO RIESGO", "450-500", "El desempeño muestra alta adherencia a los procedimientos."),
+]
+
+
+def clasificar(calificacion: int) -> str:
+    if calificacion <= 350:
+        return "ALTO RIESGO"
+    if calificacion <= 449:
+        return "MEDIANO RIESGO"
+    return "BAJO RIESGO"
+
+
+def persona(rng: random.Random) -> str:
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+
+
+def generar_informe(rng: random.Random, filas_extra: int = 0, desplazamiento: int = None) -> dict:
+    """Celdas {(fila, columna): valor} (base 0) de un informe con el layout de las plantillas."""
+    if desplazamiento is None:
+        desplazamiento = rng.choice([0, 4])
+    fecha = datetime.datetime(2026, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+    calificacion = rng.randint(300, 500)
+    recibe = [persona(rng) for _ in range(rng.randint(1, 3))]
+    profesionales = "\n" + "\n".join(recibe) + f"\n{rng.choice(CARGOS)}"
+
+    celdas = {
+        (1, 1): ENCABEZADO,
+        (2, 1): "LABORATORIO CLÍNICO COMPENSAR",
+        (4, 1): "INFORMACIÓN GENERAL",
+        (5, 1): "FECHA :", (5, 2): fecha,
+        (6, 1): "SEDE / CLIENTE:", (6, 2): rng.choice(SEDES) + "  ",
+        (7, 1): "NOMBRE Y CARGO DE LOS PROFESIONALES QUE RECIBEN LA VISITA:", (7, 2): profesionales,
+        (8, 1): "NOMBRE Y CARGO \nRESPONSABLE DE REALIZAR LA VISITA:",
+        (8, 2): f"\n{rng.choice(RESPONSABLES)}\n{rng.choice(CARGOS[3:])} ",
+        (10, 1): "INFORMACIÓN VISITA DE ACOMPAÑAMIENTO",
+        (11, 1): "OBJETIVO", (11, 2): "Verificar el cumplimiento de las actividades a desarrollar.",
+        (12, 1): "ALCANCE", (12, 2): "Aplica para las actividades asociadas al montaje de pruebas rápidas.",
+        (13, 1): "OBSERVACIONES", (13, 2): "Se realiza la aplicación de la lista de chequeo.\n" * 3,
+    }
+    base = 15 + desplazamiento
+    celdas.update({
+        (base, 1): "CONCLUSIONES", (base, 2): "Se evidencia adherencia al modelo POCT no instrumental.",
+        (base + 1, 1): "CALIFICACIÓN OBTENIDA", (base + 1, 2): calificacion,
+        (base + 2, 1): "CLASIFICACIÓN POR RIESGO", (base + 2, 2): clasificar(calificacion),
+        (base + 3, 1): "TABLA DE CLASIFICACIÓN E INTERPRETACIÓN DE RESULTADOS",
+        (base + 3, 2): "CLASIFICACIÓN", (base + 3, 3): "CALIFICACIÓN", (base + 3, 4): "INTERPRETACIÓN",
+    })
+    for i, (riesgo, rango, texto) in enumerate(TABLA_RIESGO, start=base + 4):
+        celdas.update({(i, 2): riesgo, (i, 3): rango, (i, 4): texto})
+    fila = base + 8
+    celdas[(fila, 1)] = "ANEXOS VISITA DE ACOMPAÑAMIENTO"
+    celdas[(fila + 1, 1)] = "FIRMA DEL PROFESIONAL(ES) QUE RECIBE LA VISITA"
+    celdas[(fila + 1, 3)] = "FIRMA DEL PROFESIONAL QUE REALIZA LA VISITA"
+    celdas[(fila + 2, 1)] = "FOR PSS 1093"
+    for i in range(filas_extra):
+        celdas[(fila + 3 + i, 1)] = f"Ítem de chequeo {i + 1}"
+        celdas[(fila + 3 + i, 2)] = rng.choice(["CUMPLE", "NO CUMPLE", "NO APLICA"])
+        celdas[(fila + 3 + i, 3)] = rng.randint(0, 5)
+    return celdas
+
+
+def escribir_xlsx(celdas: dict, destino):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Informe")
+    max_col = max(col for _, col in celdas)
+    filas = {}
+    for (fila, col), valor in celdas.items():
+        filas.setdefault(fila, {})[col] = valor
+    for fila in range(max(filas) + 1):
+        valores = filas.get(fila, {})
+        hoja.append([valores.get(col) for col in range(max_col + 1)])
+    libro.save(destino)
+
+
+def escribir_csv(celdas: dict, destino):
+    max_col = max(col for _, col in celdas)
+    max_fila = max(fila for fila, _ in celdas)
+    with open(destino, "w", encoding="utf-8", newline="") as fh:
+        escritor = csv.writer(fh)
+        for fila in range(max_fila + 1):
+            escritor.writerow([
+                "" if celdas.get((fila, col)) is None else celdas[(fila, col)]
+                for col in range(max_col + 1)
+            ])
+
+
+def generar_lote(carpeta: str, cantidad: int, formato: str = "xlsx", filas_extra: int = 0, semilla: int = 1) -> list:
+    """Escribe `cantidad` informes en la carpeta y devuelve sus rutas."""
+    os.makedirs(carpeta, exist_ok=True)
+    rng = random.Random(semilla)
+    rutas = []
+    for i in range(cantidad):
+        ruta = os.path.join(carpeta, f"INF SINTETICO {i:05d}.{formato}")
+        celdas = generar_informe(rng, filas_extra)
+        (escribir_xlsx if formato == "xlsx" else escribir_csv)(celdas, ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def generar_filas_reportes(cantidad: int, semilla: int = 1) -> list:
+    """Filas de reportes_procesados (como las deja map_result_to_db_row) para medir las estadísticas."""
+    rng = random.Random(semilla)
+    inicio = datetime.date(2024, 1, 1)
+    filas = []
+    for i in range(cantidad):
+        calificacion = rng.randint(300, 500)
+        filas.append({
+            "archivo": f"INF SINTETICO {i:07d}.xlsx",
+            "sede": rng.choice(SEDES),
+            "fecha": (inicio + datetime.timedelta(days=rng.randrange(1000))).isoformat(),
+            "nombre_profesionales_que_reciben": persona(rng),
+            "cargo_profesionales_que_reciben": rng.choice(CARGOS),
+            "nombre_responsable_visita": rng.choice(RESPONSABLES + [persona(rng) for _ in range(2)]),
+            "cargo_responsable_visita": rng.choice(CARGOS[3:]),
+            "calificacion_obtenida": str(calificacion),
+            "clasificacion_riesgo": clasificar(calificacion),
+        })
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera informes de visita sintéticos.")
+    parser.add_argument("carpeta")
+    parser.add_argument("--cantidad", type=int, default=100)
+    parser.add_argument("--formato", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--filas-extra", type=int, default=0, help="filas de lista de chequeo después del informe")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    rutas = generar_lote(args.carpeta, args.cantidad, args.formato, args.filas_extra, args.semilla)
+    print(f"{len(rutas)} informe(s) en {args.carpeta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Suite de benchmarks con informes sintéticos (ver benchmarks/generar_informes.py).
+
+Mide extract_data (xlsx con el lector de celdas y con pandas, csv, y un xlsx grande),
+limpiar_dato y separar_profesional_cargo sobre muchos valores, /api/process-batch de punta
+a punta con el cliente ASGI, y /api/stats y /api/trends sobre una base SQLite local con 10k-1M filas
+(además de EstadoStats, el cálculo en Python que se usa sin las funciones de la base).
+
+El resultado es JSON (commit, versión de Python y, por caso, mediana y mínimo en ms).
+Con --comparar se contrasta el mínimo de cada caso (menos sensible al ruido de la máquina)
+contra un resultado anterior y termina con código 1 si alguno es más lento que el umbral.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/suite.py [--salida resultado.json] [--filas-stats 10000,100000,1000000]
+    python benchmarks/suite.py --comparar base.json [--umbral 1.25]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generar_informes as gen  # noqa: E402
+
+
+def medir(funcion, repeticiones: int, preparar=None) -> dict:
+    """Ejecuta funcion() repeticiones veces (más una de calentamiento) y devuelve los tiempos en ms."""
+    if preparar:
+        preparar()
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "min_ms": round(min(tiempos), 3),
+        "repeticiones": repeticiones,
+    }
+
+
+def en_memoria(cantidad: int, formato: str, filas_extra: int, semilla: int) -> list:
+    """[(nombre, bytes)] de informes generados en un directorio temporal."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivos = []
+        for ruta in gen.generar_lote(carpeta, cantidad, formato, filas_extra, semilla):
+            with open(ruta, "rb") as fh:
+                archivos.append((os.path.basename(ruta), fh.read()))
+    return archivos
+
+
+def casos_extraccion(api, args, resultados: dict):
+    xlsx = en_memoria(args.informes, "xlsx", 0, args.semilla)
+    csv = en_memoria(args.informes, "csv", 0, args.semilla)
+    grande = en_memoria(1, "xlsx", args.filas_extra, args.semilla)
+
+    def extraer(archivos, lector):
+        def correr():
+            api.EXTRACT_READER = lector
+            for nombre, contenido in archivos:
+                api.extract_data(contenido, nombre)
+        return correr
+
+    for nombre, archivos, lector in [
+        ("extract_data/xlsx_celdas", xlsx, "celdas"),
+        ("extract_data/xlsx_pandas", xlsx, "pandas"),
+        ("extract_data/csv", csv, "celdas"),
+        (f"extract_data/xlsx_grande_{args.filas_extra}_filas_celdas", grande, "celdas"),
+        (f"extract_data/xlsx_grande_{args.filas_extra}_filas_pandas", grande, "pandas"),
+    ]:
+        resultados[nombre] = {**medir(extraer(archivos, lector), args.repeticiones), "archivos": len(archivos)}
+    api.EXTRACT_READER = "celdas"
+
+
+def casos_limpieza(api, args, resultados: dict):
+    rng = random.Random(args.semilla)
+    valores = []
+    for _ in range(args.valores):
+        celdas = gen.generar_informe(rng)
+        valores.extend(valor for (_, col), valor in celdas.items() if col == 2)
+        if len(valores) >= args.valores:
+            break
+    valores = valores[:args.valores]
+    textos = [f"{gen.persona(rng)} {rng.choice(gen.CARGOS)}" for _ in range(args.valores)]
+
+    resultados["limpiar_dato"] = {
+        **medir(lambda: [api.limpiar_dato(valor) for valor in valores], args.repeticiones),
+        "valores": len(valores),
+    }
+    resultados["separar_profesional_cargo"] = {
+        **medir(lambda: [api.separar_profesional_cargo(texto) for texto in textos], args.repeticiones),
+        "valores": len(textos),
+    }
+
+
+def casos_process_batch(api, args, resultados: dict):
+    from fastapi.testclient import TestClient
+
+    archivos = en_memoria(args.informes, "xlsx", 0, args.semilla)
+    cliente = TestClient(api.app)
+
+    def enviar():
+        respuesta = cliente.post("/api/process-batch", files=[("files", archivo) for archivo in archivos])
+        respuesta.raise_for_status()
+        if respuesta.json()["processed_count"] != len(archivos):
+            raise RuntimeError(f"process-batch devolvió errores: {respuesta.json()['errors'][:3]}")
+
+    def sin_cache():
+        api.extraction_cache = None
+
+    resultados["process_batch"] = {**medir(enviar, args.repeticiones, sin_cache), "archivos": len(archivos)}
+    resultados["process_batch_cache"] = {**medir(enviar, args.repeticiones), "archivos": len(archivos)}
+
+
+def casos_stats(api, args, resultados: dict):
+    from fastapi.testclient import TestClient
+
+    from api._sqlite import SQLiteReports
+    from api._stats import EstadoStats
+
+    mes = datetime.date.today().strftime("%Y-%m")
+    cliente = TestClient(api.app)
+    for cantidad in args.filas_stats:
+        filas = gen.generar_filas_reportes(cantidad, args.semilla)
+        resultados[f"stats/estado_desde_filas_{cantidad}"] = {
+            **medir(lambda: EstadoStats.desde_filas(mes, filas).agregados(), args.repeticiones),
+            "filas": cantidad,
+        }
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            base = SQLiteReports(os.path.join(carpeta, "reportes.db"))
+            for i in range(0, cantidad, 10000):
+                base.insertar(filas[i:i + 10000])
+            api.sqlite_reports = base
+
+            def consultar(ruta):
+                def correr():
+                    respuesta = cliente.get(ruta)
+                    respuesta.raise_for_status()
+                return correr
+
+            for nombre, ruta in [
+                ("historico", "/api/stats"),
+                ("rango", "/api/stats?start_date=2025-01-01&end_date=2025-06-30"),
+                ("tendencias_sede", "/api/trends?group_by=sede"),
+            ]:
+                resultados[f"stats/api_sqlite_{nombre}_{cantidad}"] = {
+                    **medir(consultar(ruta), args.repeticiones, api.get_stats_cache().clear),
+                    "filas": cantidad,
+                }
+            api.sqlite_reports = None
+            base._conn.close()
+        del filas
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> bool:
+    """Imprime la relación actual/base del mínimo de cada caso; devuelve False si alguno supera el umbral."""
+    ok = True
+    print(f"{'caso':<52} {'base (ms)':>11} {'actual (ms)':>12} {'relación':>9}")
+    for caso, medida in actual["resultados"].items():
+        anterior = base["resultados"].get(caso)
+        if anterior is None:
+            print(f"{caso:<52} {'-':>11} {medida['min_ms']:>12.2f} {'nuevo':>9}")
+            continue
+        relacion = medida["min_ms"] / max(anterior["min_ms"], 1e-9)
+        marca = " <-- más lento" if relacion > umbral else ""
+        ok = ok and relacion <= umbral
+        print(f"{caso:<52} {anterior['min_ms']:>11.2f} {medida['min_ms']:>12.2f} {relacion:>8.2f}x{marca}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--informes", type=int, default=50, help="informes por caso de extracción y de lote")
+    parser.add_argument("--filas-extra", type=int, default=5000, help="filas de lista de chequeo del xlsx grande")
+    parser.add_argument("--valores", type=int, default=100000, help="valores para limpiar_dato y separar_profesional_cargo")
+    parser.add_argument("--filas-stats", default="10000,100000", help="tamaños de la tabla para /api/stats, separados por coma")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--solo", default="", help="grupos a correr: extraccion,limpieza,lote,stats")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--comparar", help="resultado JSON anterior contra el cual comparar")
+    parser.add_argument("--umbral", type=float, default=1.25, help="relación actual/base que se considera regresión")
+    args = parser.parse_args()
+    args.filas_stats = [int(valor) for valor in args.filas_stats.split(",") if valor.strip()]
+
+    # Todo local: sin Supabase, sin caché en disco y con un solo proceso de extracción,
+    # para que los tiempos dependan del código y no de la máquina.
+    os.environ.pop("REPORTS_SQLITE_PATH", None)
+    os.environ.pop("EXTRACT_CACHE_DIR", None)
+    os.environ.setdefault("BATCH_WORKERS", "1")
+    import api.index as api
+
+    grupos = {
+        "extraccion": casos_extraccion,
+        "limpieza": casos_limpieza,
+        "lote": casos_process_batch,
+        "stats": casos_stats,
+    }
+    seleccion = [g.strip() for g in args.solo.split(",") if g.strip()] or list(grupos)
+    resultados = {}
+    for grupo in seleccion:
+        print(f"- {grupo}", file=sys.stderr)
+        grupos[grupo](api, args, resultados)
+
+    salida = {
+        "commit": commit_actual(),
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {clave: valor for clave, valor in vars(args).items() if clave not in ("salida", "comparar")},
+        "resultados": resultados,
+    }
+    texto = json.dumps(salida, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fh:
+            fh.write(texto + "\n")
+    elif not args.comparar:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as fh:
+            base = json.load(fh)
+        if not comparar(salida, base, args.umbral):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Completa las columnas tipadas (fecha_dia, calificacion, riesgo) de los reportes ya guardados.
+
+Recorre la tabla por id en páginas y guarda los valores que calcula api/_tipos.py, el mismo
+código que usa upload_results al insertar. La migración 20261018040000 ya completa las filas
+existentes en SQL; este script sirve para recalcular con --todas después de ampliar los
+formatos de fecha admitidos. Sin --todas solo toca las filas sin fecha_dia.
+Con REPORTS_SQLITE_PATH trabaja sobre la SQLite local; si no, sobre Supabase (requiere la
+migración 20261018040000_reportes_columnas_tipadas.sql).
+
+Uso (desde la raíz del repositorio):
+    python scripts/backfill_tipos.py [--pagina 1000] [--todas] [--desde-id 0]
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._tipos import columnas_tipadas  # noqa: E402
+
+
+def backfill_supabase(pagina: int, todas: bool, desde_id: int) -> int:
+    from api.index import get_supabase_client
+
+    table_name = os.getenv("SUPABASE_REPORTS_TABLE", "reportes_procesados")
+    client = get_supabase_client()
+    ultimo = desde_id
+    actualizadas = 0
+    while True:
+        query = client.table(table_name).select("id,fecha,calificacion_obtenida,clasificacion_riesgo").gt("id", ultimo)
+        if not todas:
+            query = query.is_("fecha_dia", "null")
+        filas = query.order("id").limit(pagina).execute().data
+        if not filas:
+            return actualizadas
+        # upsert por id solo con las columnas tipadas: actualiza esas columnas de filas que ya existen.
+        client.table(table_name).upsert(
+            [{"id": fila["id"], **columnas_tipadas(fila)} for fila in filas], on_conflict="id"
+        ).execute()
+        actualizadas += len(filas)
+        ultimo = filas[-1]["id"]
+        print(f"  hasta id {ultimo}: {actualizadas} filas", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pagina", type=int, default=1000, help="filas por consulta y por upsert")
+    parser.add_argument("--todas", action="store_true", help="recalcula también las filas que ya tienen valores")
+    parser.add_argument("--desde-id", type=int, default=0, help="retoma desde este id")
+    args = parser.parse_args()
+
+    ruta = os.getenv("REPORTS_SQLITE_PATH")
+    if ruta:
+        from api._sqlite import SQLiteReports
+
+        # Al abrirla ya completa las filas sin columnas tipadas; aquí cuenta solo con --todas.
+        actualizadas = SQLiteReports(ruta).completar_tipos(args.pagina, args.todas, args.desde_id)
+    else:
+        actualizadas = backfill_supabase(args.pagina, args.todas, args.desde_id)
+    print(f"{actualizadas} filas actualizadas")
+
+
+if __name__ == "__main__":
+    main()
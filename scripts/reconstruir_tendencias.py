@@ -0,0 +1,45 @@
+"""
+Recalcula desde cero los rollups de /api/trends (tabla reportes_tendencias).
+
+Los triggers de la base los mantienen al insertar; este comando los vuelve a calcular
+desde los reportes y cuenta los grupos que no coincidían, para verificar que el
+mantenimiento incremental está al día. Termina con código 1 si hubo diferencias.
+Con REPORTS_SQLITE_PATH trabaja sobre la SQLite local, con --espejo sobre el espejo de
+REPORTS_MIRROR_PATH y si no, sobre Supabase (función reportes_tendencias_reconstruir).
+
+Uso (desde la raíz del repositorio):
+    python scripts/reconstruir_tendencias.py [--espejo]
+"""
+import argparse
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--espejo", action="store_true", help="reconstruye los rollups del espejo local (REPORTS_MIRROR_PATH)")
+    args = parser.parse_args()
+
+    ruta = os.getenv("REPORTS_MIRROR_PATH") if args.espejo else os.getenv("REPORTS_SQLITE_PATH")
+    if args.espejo and not ruta:
+        parser.error("--espejo requiere REPORTS_MIRROR_PATH")
+    if ruta:
+        from api._sqlite import SQLiteReports
+
+        resultado = SQLiteReports(ruta).reconstruir_tendencias()
+    else:
+        from api.index import get_supabase_client
+
+        resultado = get_supabase_client().rpc("reportes_tendencias_reconstruir", {}).execute().data
+
+    print(json.dumps(resultado))
+    if resultado["mismatched_groups"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
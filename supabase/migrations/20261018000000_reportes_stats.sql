@@ -0,0 +1,67 @@
+-- Agregados de /api/stats calculados en la base de datos.
+-- Devuelve un único JSON; la API solo añade los 10 reportes más recientes.
+-- Si se usa otra tabla (SUPABASE_REPORTS_TABLE), ajustar el FROM.
+
+create or replace function public.reportes_stats(
+    start_date text default null,
+    end_date text default null,
+    month_prefix text default null
+)
+returns json
+language sql
+stable
+as $$
+    with filtrados as (
+        select
+            sede,
+            fecha,
+            nombre_responsable_visita,
+            case
+                when lower(coalesce(clasificacion_riesgo, '')) like '%alto%' then 'alto'
+                when lower(coalesce(clasificacion_riesgo, '')) like '%bajo%' then 'bajo'
+                else 'moderado'
+            end as riesgo
+        from public.reportes_procesados
+        where (start_date is null or fecha >= start_date)
+          and (end_date is null or fecha <= end_date)
+    ),
+    totales as (
+        select
+            count(*) as total_visits,
+            count(distinct sede) as sedes_count,
+            count(*) filter (where riesgo = 'alto') as alto,
+            count(*) filter (where riesgo = 'moderado') as moderado,
+            count(*) filter (where riesgo = 'bajo') as bajo,
+            count(*) filter (
+                where month_prefix is not null and left(fecha, length(month_prefix)) = month_prefix
+            ) as visits_this_month
+        from filtrados
+    ),
+    personal as (
+        select nombre_responsable_visita as nombre, count(*) as cantidad, max(fecha) as ultima
+        from filtrados
+        where nombre_responsable_visita is not null
+        group by nombre_responsable_visita
+        order by cantidad desc, ultima desc nulls last, nombre
+        limit 10
+    )
+    select json_build_object(
+        'total_visits', t.total_visits,
+        'sedes_count', t.sedes_count,
+        'alto', t.alto,
+        'moderado', t.moderado,
+        'bajo', t.bajo,
+        'visits_this_month', t.visits_this_month,
+        'visits_by_personnel', coalesce(
+            (
+                select json_agg(
+                    json_build_object('nombre', p.nombre, 'cantidad', p.cantidad)
+                    order by p.cantidad desc, p.ultima desc nulls last, p.nombre
+                )
+                from personal p
+            ),
+            '[]'::json
+        )
+    )
+    from totales t;
+$$;
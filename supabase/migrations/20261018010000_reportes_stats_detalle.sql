@@ -0,0 +1,68 @@
+-- Contadores completos de /api/stats para la caché incremental de la API.
+-- A diferencia de reportes_stats devuelve el conteo por sede y por responsable (con su
+-- última fecha), de modo que la API puede sumarle las filas que inserta upload-results.
+-- Si se usa otra tabla (SUPABASE_REPORTS_TABLE), ajustar el FROM.
+
+create or replace function public.reportes_stats_detalle(
+    start_date text default null,
+    end_date text default null,
+    month_prefix text default null
+)
+returns json
+language sql
+stable
+as $$
+    with filtrados as (
+        select
+            sede,
+            fecha,
+            nombre_responsable_visita,
+            case
+                when lower(coalesce(clasificacion_riesgo, '')) like '%alto%' then 'alto'
+                when lower(coalesce(clasificacion_riesgo, '')) like '%bajo%' then 'bajo'
+                else 'moderado'
+            end as riesgo
+        from public.reportes_procesados
+        where (start_date is null or fecha >= start_date)
+          and (end_date is null or fecha <= end_date)
+    ),
+    totales as (
+        select
+            count(*) as total_visits,
+            count(*) filter (where riesgo = 'alto') as alto,
+            count(*) filter (where riesgo = 'moderado') as moderado,
+            count(*) filter (where riesgo = 'bajo') as bajo,
+            count(*) filter (
+                where month_prefix is not null and left(fecha, length(month_prefix)) = month_prefix
+            ) as visits_this_month
+        from filtrados
+    ),
+    sedes as (
+        select sede, count(*) as cantidad
+        from filtrados
+        where sede is not null
+        group by sede
+    ),
+    personal as (
+        select nombre_responsable_visita as nombre, count(*) as cantidad, max(fecha) as ultima
+        from filtrados
+        where nombre_responsable_visita is not null
+        group by nombre_responsable_visita
+    )
+    select json_build_object(
+        'total_visits', t.total_visits,
+        'alto', t.alto,
+        'moderado', t.moderado,
+        'bajo', t.bajo,
+        'visits_this_month', t.visits_this_month,
+        'sedes', coalesce((select json_object_agg(s.sede, s.cantidad) from sedes s), '{}'::json),
+        'personal', coalesce(
+            (
+                select json_agg(json_build_object('nombre', p.nombre, 'cantidad', p.cantidad, 'ultima', p.ultima))
+                from personal p
+            ),
+            '[]'::json
+        )
+    )
+    from totales t;
+$$;
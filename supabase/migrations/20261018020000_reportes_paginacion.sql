@@ -0,0 +1,9 @@
+-- Índices para la paginación por cursor de /api/reports (order by id desc con filtros).
+-- La clave primaria ya cubre el recorrido sin filtros; estos evitan recorrer la tabla al
+-- filtrar por sede o por rango de fechas.
+
+create index if not exists reportes_procesados_sede_id_idx
+    on public.reportes_procesados (sede, id desc);
+
+create index if not exists reportes_procesados_fecha_idx
+    on public.reportes_procesados (fecha);
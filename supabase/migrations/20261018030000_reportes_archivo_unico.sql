@@ -0,0 +1,11 @@
+-- Restricción única sobre archivo para que /api/upload-results deduplique con
+-- "on conflict (archivo) do nothing" en lugar de consultar antes de insertar.
+-- Se conserva el registro más antiguo de cada archivo repetido.
+
+delete from public.reportes_procesados r
+using public.reportes_procesados d
+where r.archivo = d.archivo
+  and r.id > d.id;
+
+alter table public.reportes_procesados
+    add constraint reportes_procesados_archivo_key unique (archivo);
@@ -0,0 +1,210 @@
+-- Columnas tipadas junto al texto original: fecha_dia (date), calificacion (numeric) y
+-- riesgo (alto, moderado o bajo). La API las calcula al insertar (api/_tipos.py); los
+-- filtros por rango y los conteos de /api/stats y /api/reports las usan con sus índices.
+--
+-- Las filas existentes se completan aquí: reportes_fecha_iso y reportes_calificacion repiten
+-- en SQL fecha_iso y calificacion_numero de api/_tipos.py (mismos formatos y misma regla; si
+-- se cambia uno, cambiar el otro), y el riesgo usa la regla de siempre. Un riesgo NULL (filas
+-- insertadas por un cliente que no manda las columnas tipadas) cuenta como moderado en
+-- reportes_stats y reportes_stats_detalle, igual que en los rollups de reportes_tendencias.
+-- Si se usa otra tabla (SUPABASE_REPORTS_TABLE), ajustar los nombres.
+
+do $$
+begin
+    create type public.riesgo_reporte as enum ('alto', 'moderado', 'bajo');
+exception
+    when duplicate_object then null;
+end
+$$;
+
+alter table public.reportes_procesados
+    add column if not exists fecha_dia date,
+    add column if not exists calificacion numeric,
+    add column if not exists riesgo public.riesgo_reporte;
+
+create or replace function public.reportes_fecha_iso(valor text)
+returns date
+language plpgsql
+immutable
+as $$
+declare
+    texto text := lower(regexp_replace(coalesce(valor, ''), '^\s+|\s+$', '', 'g'));
+    partes text[];
+    mes int;
+begin
+    if texto = '' or texto = 'n/a' then
+        return null;
+    end if;
+
+    partes := regexp_match(texto, '^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[ T].*)?$');
+    if partes is not null then
+        return make_date(partes[1]::int, partes[2]::int, partes[3]::int);
+    end if;
+    -- Los informes usan día/mes/año.
+    partes := regexp_match(texto, '^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})(?:\s.*)?$');
+    if partes is not null then
+        return make_date(partes[3]::int, partes[2]::int, partes[1]::int);
+    end if;
+    partes := regexp_match(texto, '^(\d{1,2})\s+de\s+([a-záéíóú]+)\s+(?:de\s+|del\s+)?(\d{4})$');
+    if partes is not null then
+        mes := case partes[2]
+            when 'enero' then 1 when 'febrero' then 2 when 'marzo' then 3 when 'abril' then 4
+            when 'mayo' then 5 when 'junio' then 6 when 'julio' then 7 when 'agosto' then 8
+            when 'septiembre' then 9 when 'setiembre' then 9 when 'octubre' then 10
+            when 'noviembre' then 11 when 'diciembre' then 12
+        end;
+        if mes is not null then
+            return make_date(partes[3]::int, mes, partes[1]::int);
+        end if;
+        return null;
+    end if;
+    -- Números de serie de Excel (días desde 1899-12-30) que pueden ser una fecha de informe.
+    if texto ~ '^(\d+\.?\d*|\.\d+)$' then
+        -- En un if aparte: el and de SQL no garantiza que la conversión vaya después del patrón.
+        if texto::numeric >= 20000 and texto::numeric < 80000 then
+            return date '1899-12-30' + trunc(texto::numeric)::int;
+        end if;
+    end if;
+    return null;
+exception
+    -- Día o mes fuera de rango (31/02/2026): no es una fecha.
+    when datetime_field_overflow then
+        return null;
+end;
+$$;
+
+create or replace function public.reportes_calificacion(valor text)
+returns numeric
+language sql
+immutable
+as $$
+    select replace((regexp_match(valor, '-?\d+(?:[.,]\d+)?'))[1], ',', '.')::numeric;
+$$;
+
+update public.reportes_procesados
+set fecha_dia = public.reportes_fecha_iso(fecha),
+    calificacion = public.reportes_calificacion(calificacion_obtenida),
+    riesgo = case
+        when lower(coalesce(clasificacion_riesgo, '')) like '%alto%' then 'alto'
+        when lower(coalesce(clasificacion_riesgo, '')) like '%bajo%' then 'bajo'
+        else 'moderado'
+    end::public.riesgo_reporte
+where riesgo is null;
+
+create index if not exists reportes_procesados_fecha_dia_idx
+    on public.reportes_procesados (fecha_dia);
+
+create index if not exists reportes_procesados_riesgo_fecha_dia_idx
+    on public.reportes_procesados (riesgo, fecha_dia);
+
+create or replace function public.reportes_stats(
+    start_date text default null,
+    end_date text default null,
+    month_prefix text default null
+)
+returns json
+language sql
+stable
+as $$
+    with filtrados as (
+        select sede, fecha_dia, nombre_responsable_visita, coalesce(riesgo, 'moderado') as riesgo
+        from public.reportes_procesados
+        where (start_date is null or fecha_dia >= start_date::date)
+          and (end_date is null or fecha_dia <= end_date::date)
+    ),
+    totales as (
+        select
+            count(*) as total_visits,
+            count(distinct sede) as sedes_count,
+            count(*) filter (where riesgo = 'alto') as alto,
+            count(*) filter (where riesgo = 'moderado') as moderado,
+            count(*) filter (where riesgo = 'bajo') as bajo,
+            count(*) filter (
+                where month_prefix is not null and to_char(fecha_dia, 'YYYY-MM') = month_prefix
+            ) as visits_this_month
+        from filtrados
+    ),
+    personal as (
+        select nombre_responsable_visita as nombre, count(*) as cantidad, max(fecha_dia) as ultima
+        from filtrados
+        where nombre_responsable_visita is not null
+        group by nombre_responsable_visita
+        order by cantidad desc, ultima desc nulls last, nombre
+        limit 10
+    )
+    select json_build_object(
+        'total_visits', t.total_visits,
+        'sedes_count', t.sedes_count,
+        'alto', t.alto,
+        'moderado', t.moderado,
+        'bajo', t.bajo,
+        'visits_this_month', t.visits_this_month,
+        'visits_by_personnel', coalesce(
+            (
+                select json_agg(
+                    json_build_object('nombre', p.nombre, 'cantidad', p.cantidad)
+                    order by p.cantidad desc, p.ultima desc nulls last, p.nombre
+                )
+                from personal p
+            ),
+            '[]'::json
+        )
+    )
+    from totales t;
+$$;
+
+create or replace function public.reportes_stats_detalle(
+    start_date text default null,
+    end_date text default null,
+    month_prefix text default null
+)
+returns json
+language sql
+stable
+as $$
+    with filtrados as (
+        select sede, fecha_dia, nombre_responsable_visita, coalesce(riesgo, 'moderado') as riesgo
+        from public.reportes_procesados
+        where (start_date is null or fecha_dia >= start_date::date)
+          and (end_date is null or fecha_dia <= end_date::date)
+    ),
+    totales as (
+        select
+            count(*) as total_visits,
+            count(*) filter (where riesgo = 'alto') as alto,
+            count(*) filter (where riesgo = 'moderado') as moderado,
+            count(*) filter (where riesgo = 'bajo') as bajo,
+            count(*) filter (
+                where month_prefix is not null and to_char(fecha_dia, 'YYYY-MM') = month_prefix
+            ) as visits_this_month
+        from filtrados
+    ),
+    sedes as (
+        select sede, count(*) as cantidad
+        from filtrados
+        where sede is not null
+        group by sede
+    ),
+    personal as (
+        select nombre_responsable_visita as nombre, count(*) as cantidad, max(fecha_dia) as ultima
+        from filtrados
+        where nombre_responsable_visita is not null
+        group by nombre_responsable_visita
+    )
+    select json_build_object(
+        'total_visits', t.total_visits,
+        'alto', t.alto,
+        'moderado', t.moderado,
+        'bajo', t.bajo,
+        'visits_this_month', t.visits_this_month,
+        'sedes', coalesce((select json_object_agg(s.sede, s.cantidad) from sedes s), '{}'::json),
+        'personal', coalesce(
+            (
+                select json_agg(json_build_object('nombre', p.nombre, 'cantidad', p.cantidad, 'ultima', p.ultima))
+                from personal p
+            ),
+            '[]'::json
+        )
+    )
+    from totales t;
+$$;
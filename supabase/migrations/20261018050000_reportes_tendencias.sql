@@ -0,0 +1,140 @@
+-- Rollups de /api/trends: visitas, suma y cantidad de calificaciones por
+-- (mes, sede, riesgo, responsable). Un trigger los mantiene al insertar, modificar o borrar
+-- reportes, así la consulta recorre los grupos y no las filas crudas. Las filas sin
+-- fecha_dia no tienen mes y no entran. reportes_tendencias_reconstruir() los recalcula
+-- desde cero (scripts/reconstruir_tendencias.py).
+-- Requiere 20261018040000_reportes_columnas_tipadas.sql.
+-- Si se usa otra tabla (SUPABASE_REPORTS_TABLE), ajustar los nombres.
+
+create table if not exists public.reportes_tendencias (
+    mes text not null,
+    sede text not null,
+    riesgo public.riesgo_reporte not null,
+    responsable text not null,
+    visitas integer not null default 0,
+    suma_calificacion numeric not null default 0,
+    con_calificacion integer not null default 0,
+    primary key (mes, sede, riesgo, responsable)
+);
+
+create or replace function public.reportes_tendencias_sumar(r public.reportes_procesados, signo integer)
+returns void
+language sql
+as $$
+    insert into public.reportes_tendencias as t
+        (mes, sede, riesgo, responsable, visitas, suma_calificacion, con_calificacion)
+    select
+        to_char(r.fecha_dia, 'YYYY-MM'),
+        coalesce(r.sede, ''),
+        coalesce(r.riesgo, 'moderado'),
+        coalesce(r.nombre_responsable_visita, ''),
+        signo,
+        signo * coalesce(r.calificacion, 0),
+        signo * (r.calificacion is not null)::integer
+    where r.fecha_dia is not null
+    on conflict (mes, sede, riesgo, responsable) do update set
+        visitas = t.visitas + excluded.visitas,
+        suma_calificacion = t.suma_calificacion + excluded.suma_calificacion,
+        con_calificacion = t.con_calificacion + excluded.con_calificacion;
+$$;
+
+create or replace function public.reportes_tendencias_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.reportes_tendencias_sumar(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.reportes_tendencias_sumar(new, 1);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists reportes_tendencias_trg on public.reportes_procesados;
+create trigger reportes_tendencias_trg
+    after insert or delete or update of fecha_dia, sede, riesgo, nombre_responsable_visita, calificacion
+    on public.reportes_procesados
+    for each row execute function public.reportes_tendencias_trigger();
+
+-- Series por mes; agrupar es 'sede', 'riesgo', 'responsable' o null (total de cada mes).
+create or replace function public.reportes_tendencias(
+    agrupar text default null,
+    desde text default null,
+    hasta text default null,
+    filtro_sede text default null
+)
+returns json
+language sql
+stable
+as $$
+    select coalesce(
+        json_agg(s order by s.mes, s.clave),
+        '[]'::json
+    )
+    from (
+        select
+            mes,
+            case agrupar
+                when 'sede' then sede
+                when 'riesgo' then riesgo::text
+                when 'responsable' then responsable
+            end as clave,
+            sum(visitas) as visitas,
+            sum(suma_calificacion) as suma_calificacion,
+            sum(con_calificacion) as con_calificacion,
+            sum(visitas) filter (where riesgo = 'alto') as alto,
+            sum(visitas) filter (where riesgo = 'moderado') as moderado,
+            sum(visitas) filter (where riesgo = 'bajo') as bajo
+        from public.reportes_tendencias
+        where (desde is null or mes >= desde)
+          and (hasta is null or mes <= hasta)
+          and (filtro_sede is null or sede = filtro_sede)
+        group by 1, 2
+        having sum(visitas) > 0
+    ) s;
+$$;
+
+-- Recalcula los rollups y devuelve cuántos grupos no coincidían con los mantenidos por el trigger.
+create or replace function public.reportes_tendencias_reconstruir()
+returns json
+language plpgsql
+as $$
+declare
+    grupos integer;
+    diferencias integer;
+begin
+    lock table public.reportes_tendencias in exclusive mode;
+
+    create temporary table tendencias_calculadas on commit drop as
+    select
+        to_char(fecha_dia, 'YYYY-MM') as mes,
+        coalesce(sede, '') as sede,
+        coalesce(riesgo, 'moderado') as riesgo,
+        coalesce(nombre_responsable_visita, '') as responsable,
+        count(*)::integer as visitas,
+        coalesce(sum(calificacion), 0) as suma_calificacion,
+        count(calificacion)::integer as con_calificacion
+    from public.reportes_procesados
+    where fecha_dia is not null
+    group by 1, 2, 3, 4;
+
+    select count(*) into grupos from tendencias_calculadas;
+    select count(*) into diferencias
+    from tendencias_calculadas c
+    full join (select * from public.reportes_tendencias where visitas <> 0) t
+        using (mes, sede, riesgo, responsable)
+    where c.visitas is distinct from t.visitas
+       or c.suma_calificacion is distinct from t.suma_calificacion
+       or c.con_calificacion is distinct from t.con_calificacion;
+
+    delete from public.reportes_tendencias;
+    insert into public.reportes_tendencias select * from tendencias_calculadas;
+
+    return json_build_object('groups', grupos, 'mismatched_groups', diferencias);
+end;
+$$;
+
+select public.reportes_tendencias_reconstruir();
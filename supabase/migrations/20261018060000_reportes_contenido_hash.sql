@@ -0,0 +1,25 @@
+-- contenido_hash: sha256 (hex) de las columnas de texto del reporte sin el nombre del
+-- archivo, para que /api/upload-results distinga un archivo repetido de una exportación
+-- corregida con el mismo nombre, y el mismo contenido subido con otro nombre.
+-- La API lo calcula al insertar con api/_dedup.py (hash_contenido); aquí se completa para
+-- las filas existentes con la misma fórmula.
+-- Si se usa otra tabla (SUPABASE_REPORTS_TABLE), ajustar los nombres.
+
+alter table public.reportes_procesados
+    add column if not exists contenido_hash text;
+
+update public.reportes_procesados
+set contenido_hash = encode(sha256(convert_to(concat_ws(chr(31),
+    coalesce(btrim(sede), ''),
+    coalesce(btrim(fecha), ''),
+    coalesce(btrim(nombre_profesionales_que_reciben), ''),
+    coalesce(btrim(cargo_profesionales_que_reciben), ''),
+    coalesce(btrim(nombre_responsable_visita), ''),
+    coalesce(btrim(cargo_responsable_visita), ''),
+    coalesce(btrim(calificacion_obtenida), ''),
+    coalesce(btrim(clasificacion_riesgo), '')
+), 'UTF8')), 'hex')
+where contenido_hash is null;
+
+create index if not exists reportes_procesados_contenido_hash_idx
+    on public.reportes_procesados (contenido_hash);
@@ -0,0 +1,42 @@
+"""
+Nivel en disco de la caché de extracción: LRU acotado en bytes que sobrevive reinicios.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._cache import ExtractionCache  # noqa: E402
+
+VERSION = "0123456789ab"
+
+
+def _datos(n: int) -> dict:
+    return {"ARCHIVO": f"INF {n}.xlsx", "Sede": "x" * 100}
+
+
+def test_disco_acotado_en_bytes(tmp_path):
+    tamano = len(b'{"ARCHIVO": "INF 0.xlsx", "Sede": "' + b"x" * 100 + b'"}')
+    cache = ExtractionCache(VERSION, max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=3 * tamano)
+    for n in range(3):
+        cache.put(f"{n}.xlsx", _datos(n))
+    assert cache.get("0.xlsx", "a.xlsx") is not None  # desde disco: pasa a ser la más reciente
+    cache.put("3.xlsx", _datos(3))
+
+    assert sorted(os.listdir(tmp_path / VERSION)) == ["0.xlsx.json", "2.xlsx.json", "3.xlsx.json"]
+    assert cache.stats()["disk_bytes"] == 3 * tamano
+    assert cache.stats()["disk_evictions"] == 1
+
+    # Otro proceso (o un reinicio) con un tope menor conserva las usadas más recientemente.
+    os.utime(tmp_path / VERSION / "2.xlsx.json", ns=(1, 1))
+    reiniciada = ExtractionCache(VERSION, disk_dir=str(tmp_path), max_disk_bytes=2 * tamano)
+    assert sorted(os.listdir(tmp_path / VERSION)) == ["0.xlsx.json", "3.xlsx.json"]
+    assert reiniciada.get("3.xlsx", "b.xlsx") == {**_datos(3), "ARCHIVO": "b.xlsx"}
+
+
+def test_borra_solo_directorios_de_otras_versiones(tmp_path):
+    ExtractionCache("ba9876543210", disk_dir=str(tmp_path)).put("0.xlsx", _datos(0))
+    (tmp_path / "otra cosa").mkdir()
+    ExtractionCache(VERSION, disk_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == ["otra cosa"]
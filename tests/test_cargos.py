@@ -0,0 +1,46 @@
+"""
+Diccionario de cargos: el cargo sale tal como está escrito y cargos.json se recarga al cambiar.
+"""
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import api._cargos as cargos  # noqa: E402
+
+
+def test_cargo_tal_como_esta_escrito():
+    matcher = cargos.RoleMatcher.from_file(cargos.RUTA_CONFIG_DEFECTO)
+    assert matcher.separar("Mónica Zabaleta Bacterióloga de calidad") == {
+        "nombre": "Mónica Zabaleta", "cargo": "Bacterióloga de calidad",
+    }
+    assert matcher.separar("Ana Pérez  PROFESIONAL  ENFERMERIA") == {
+        "nombre": "Ana Pérez", "cargo": "PROFESIONAL ENFERMERIA",
+    }
+    assert matcher.separar("Jully Calderón") == {"nombre": "Jully Calderón", "cargo": "N/A"}
+    assert matcher.buscar("Ana Bacterióloga")[2] == "Bacteriólogo"
+
+
+def test_recarga_al_cambiar_el_archivo(tmp_path, monkeypatch):
+    ruta = tmp_path / "cargos.json"
+    ruta.write_text(json.dumps({"cargos": [{"cargo": "Enfermería", "alias": ["enfermera"]}]}), encoding="utf-8")
+    monkeypatch.setenv("CARGOS_CONFIG", str(ruta))
+    monkeypatch.setattr(cargos, "INTERVALO_REVISION", 0)
+    monkeypatch.setattr(cargos, "_matcher", None)
+    monkeypatch.setattr(cargos, "_matcher_firma", None)
+
+    assert cargos.get_role_matcher().separar("Ana Pérez Instrumentadora")["cargo"] == "N/A"
+    huella = cargos.get_role_matcher().huella
+
+    ruta.write_text(json.dumps({"cargos": [{"cargo": "Instrumentador", "alias": ["instrumentadora"]}]}),
+                    encoding="utf-8")
+    os.utime(ruta, ns=(os.stat(ruta).st_atime_ns, os.stat(ruta).st_mtime_ns + 1_000_000))
+    assert cargos.get_role_matcher().separar("Ana Pérez Instrumentadora")["cargo"] == "Instrumentadora"
+    assert cargos.get_role_matcher().huella != huella
+
+    # Un archivo a medio guardar no reemplaza al diccionario que ya funciona.
+    ruta.write_text("{", encoding="utf-8")
+    os.utime(ruta, ns=(os.stat(ruta).st_atime_ns, os.stat(ruta).st_mtime_ns + 2_000_000))
+    assert cargos.get_role_matcher().separar("Ana Pérez Instrumentadora")["cargo"] == "Instrumentadora"
@@ -0,0 +1,41 @@
+"""
+/api/health responde mientras las consultas a Supabase están detenidas (PostgREST falso que tarda en responder).
+"""
+import asyncio
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "benchmarks"))
+
+from bench_db_concurrency import FakePostgREST, medir  # noqa: E402
+
+import api.index as api  # noqa: E402
+
+DEMORA = 1.0
+
+
+def test_health_no_espera_a_la_base(monkeypatch):
+    monkeypatch.setattr(FakePostgREST, "demora", DEMORA)
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), FakePostgREST)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    monkeypatch.setenv("SUPABASE_URL", f"http://127.0.0.1:{servidor.server_address[1]}")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.local")
+    for variable in ("REPORTS_SQLITE_PATH", "REPORTS_MIRROR_PATH"):
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setattr(api, "supabase_client", None)
+    monkeypatch.setattr(api, "stats_cache", None)
+
+    try:
+        resultado = asyncio.run(medir(api.app, lentas=2 * api.DB_WORKERS, duracion=DEMORA * 2))
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    assert resultado["lentas_ok"] == resultado["lentas"]
+    # Con las consultas detenidas health sigue respondiendo muy por debajo de la demora de la base.
+    assert resultado["health_con_lentas_max_ms"] < DEMORA * 1000 / 4
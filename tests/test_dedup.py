@@ -0,0 +1,47 @@
+"""
+Índice de deduplicación: filas confirmadas fuera de orden y reportes sin contenido.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._dedup import COLUMNAS_CONTENIDO, DUPLICADO, NUEVO, IndiceDedup, con_hash  # noqa: E402
+
+
+def _fila(archivo: str, valor: str) -> dict:
+    return con_hash({"archivo": archivo, **dict.fromkeys(COLUMNAS_CONTENIDO, valor)})
+
+
+class BaseFalsa:
+    def __init__(self):
+        self.filas = []
+        self.pendientes = set()
+
+    def leer_desde(self, desde_id: int, limite: int) -> list:
+        visibles = [f for f in self.filas if f["id"] > desde_id and f["id"] not in self.pendientes]
+        return visibles[:limite]
+
+
+def test_fila_confirmada_fuera_de_orden():
+    base = BaseFalsa()
+    base.filas = [{"id": n, **_fila(f"INF {n}.xlsx", f"contenido {n}")} for n in range(1, 6)]
+    base.pendientes.add(2)
+
+    indice = IndiceDedup(tamano_pagina=2, retroceso=10)
+    indice.actualizar(base.leer_desde)
+    assert indice.marca_agua == 5
+    assert indice.clasificar([_fila("otro.xlsx", "contenido 2")]) == [NUEVO]
+
+    base.pendientes.clear()
+    indice.actualizar(base.leer_desde)
+    assert indice.clasificar([_fila("otro.xlsx", "contenido 2")]) == [DUPLICADO]
+
+
+def test_reportes_sin_contenido_solo_se_comparan_por_nombre():
+    indice = IndiceDedup()
+    indice.agregar([_fila("vacio.xlsx", "N/A"), _fila("en blanco.xlsx", "")])
+
+    filas = [_fila("otro vacio.xlsx", "N/A"), _fila("otro en blanco.xlsx", ""), _fila("vacio.xlsx", "N/A")]
+    assert indice.clasificar(filas) == [NUEVO, NUEVO, DUPLICADO]
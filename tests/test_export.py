@@ -0,0 +1,33 @@
+"""
+Consolidado exportado: fechas con las reglas de fecha_iso y celdas CSV que no se abren como fórmula.
+"""
+import io
+import os
+import sys
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._export import TEXTO, EscritorConsolidado, a_fecha  # noqa: E402
+
+
+def test_a_fecha_acepta_los_formatos_de_los_informes():
+    for valor in ("2026-01-09", "2026-01-09 00:00:00", "09/01/2026", "9 de enero de 2026", date(2026, 1, 9)):
+        assert a_fecha(valor) == date(2026, 1, 9)
+    for valor in (None, "", "N/A", "sin fecha", "31/02/2026"):
+        assert a_fecha(valor) is None
+
+
+def test_csv_neutraliza_formulas():
+    salida = io.BytesIO()
+    with EscritorConsolidado(salida, "csv", [("SEDE", TEXTO), ("CALIFICACIÓN", TEXTO)]) as escritor:
+        escritor.escribir({"SEDE": '=HYPERLINK("http://x","SAM")', "CALIFICACIÓN": "-432"})
+        escritor.escribir({"SEDE": "@SUM(A1)", "CALIFICACIÓN": 432})
+        escritor.escribir({"SEDE": "SAM KENNEDY", "CALIFICACIÓN": "432"})
+    assert salida.getvalue().decode("utf-8").splitlines() == [
+        "SEDE,CALIFICACIÓN",
+        '"\'=HYPERLINK(""http://x"",""SAM"")",\'-432',
+        "'@SUM(A1),432",
+        "SAM KENNEDY,432",
+    ]
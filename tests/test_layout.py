@@ -0,0 +1,48 @@
+"""
+Ubicación de los campos por etiqueta: la celda tiene que ser la etiqueta, no empezar con ella.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._layout import Layout, resolver_csv  # noqa: E402
+
+
+def test_etiqueta_exacta_o_alias():
+    celdas = {
+        (3, 1): "Fecha de seguimiento",
+        (3, 2): "2026-02-01",
+        (5, 1): "FECHA :",
+        (5, 2): "2026-01-09",
+        (6, 1): "Sede/Cliente",
+        (6, 2): "SAM KENNEDY",
+        (7, 1): "Calificación obtenida en la visita anterior",
+        (7, 2): "380",
+        (20, 1): "CALIFICACIÓN OBTENIDA",
+        (20, 2): "432",
+        (21, 1): "Clasificación de riesgo",
+        (21, 2): "MEDIANO RIESGO",
+    }
+    layout = Layout.desde_celdas(celdas)
+    assert layout.valores_de(celdas) == {
+        "fecha": "2026-01-09",
+        "sede": "SAM KENNEDY",
+        "profesionales": None,
+        "responsable": None,
+        "calificacion": "432",
+        "riesgo": "MEDIANO RIESGO",
+    }
+    assert layout.faltantes == ["profesionales", "responsable"]
+
+
+def test_csv_no_termina_en_una_etiqueta_parecida():
+    contenido = "\n".join([
+        ",Fecha de seguimiento,2026-02-01",
+        ",FECHA :,2026-01-09",
+        ",SEDE / CLIENTE,SAM KENNEDY",
+    ]).encode()
+    _, valores = resolver_csv(contenido)
+    assert valores["fecha"] == "2026-01-09"
+    assert valores["sede"] == "SAM KENNEDY"
@@ -0,0 +1,88 @@
+"""
+Sincronización del espejo SQLite: filas confirmadas fuera de orden y mismos agregados que la base.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api._mirror import EspejoReportes  # noqa: E402
+from api._sqlite import COLUMNAS_REPORTE, TABLA, SQLiteReports  # noqa: E402
+
+
+def _fila(n: int, sede: str, fecha: str, riesgo: str) -> dict:
+    return {
+        "archivo": f"INF {n}.xlsx",
+        "sede": sede,
+        "fecha": fecha,
+        "nombre_profesionales_que_reciben": "Ana Pérez",
+        "cargo_profesionales_que_reciben": "Enfermera",
+        "nombre_responsable_visita": f"Responsable {n % 3}",
+        "cargo_responsable_visita": "Auditor",
+        "calificacion_obtenida": f"{80 + n}%",
+        "clasificacion_riesgo": riesgo,
+    }
+
+
+class BaseFalsa:
+    """Base de origen: las filas de `pendientes` tienen id asignado pero su transacción aún no confirmó."""
+
+    def __init__(self, ruta: str):
+        self.base = SQLiteReports(ruta)
+        self.pendientes = set()
+
+    def leer_desde(self, desde_id: int, limite: int) -> list:
+        with self.base._lock:
+            filas = self.base._conn.execute(
+                f"SELECT {', '.join(COLUMNAS_REPORTE)} FROM {TABLA} WHERE id > ? ORDER BY id",
+                (desde_id,),
+            ).fetchall()
+        return [dict(fila) for fila in filas if fila["id"] not in self.pendientes][:limite]
+
+
+def test_fila_confirmada_fuera_de_orden(tmp_path):
+    origen = BaseFalsa(str(tmp_path / "origen.db"))
+    filas = origen.base.insertar([_fila(n, "Kennedy", f"0{n}/01/2026", "BAJO") for n in range(1, 6)])
+    tardia = filas[2]["id"]
+    origen.pendientes.add(tardia)
+
+    espejo = EspejoReportes(str(tmp_path / "espejo.db"), tamano_pagina=2, retroceso=10)
+    assert espejo.sincronizar(origen.leer_desde) == 4
+    assert espejo.marca_agua() == filas[-1]["id"]
+
+    origen.pendientes.clear()
+    assert espejo.sincronizar(origen.leer_desde) == 1
+    assert espejo.estado()["rows"] == 5
+    assert espejo.sincronizar(origen.leer_desde) == 0
+
+
+def test_sin_retroceso_la_fila_tardia_se_pierde(tmp_path):
+    origen = BaseFalsa(str(tmp_path / "origen.db"))
+    filas = origen.base.insertar([_fila(n, "Kennedy", f"0{n}/01/2026", "BAJO") for n in range(1, 4)])
+    origen.pendientes.add(filas[0]["id"])
+
+    espejo = EspejoReportes(str(tmp_path / "espejo.db"), retroceso=0)
+    espejo.sincronizar(origen.leer_desde)
+    origen.pendientes.clear()
+    assert espejo.sincronizar(origen.leer_desde) == 0
+
+
+def test_mismos_agregados_que_la_base(tmp_path):
+    origen = BaseFalsa(str(tmp_path / "origen.db"))
+    riesgos = ["ALTO", "MODERADO", "BAJO", "N/A"]
+    sedes = ["Kennedy", "Fontibón", "Suba"]
+    origen.base.insertar([
+        _fila(n, sedes[n % 3], f"{1 + n % 28:02d}/{1 + n % 3:02d}/2026", riesgos[n % 4]) for n in range(40)
+    ])
+    # Una fila por página queda pendiente en la primera sincronización.
+    origen.pendientes.update({5, 17, 29})
+
+    espejo = EspejoReportes(str(tmp_path / "espejo.db"), tamano_pagina=7, retroceso=50)
+    espejo.sincronizar(origen.leer_desde)
+    origen.pendientes.clear()
+    espejo.sincronizar(origen.leer_desde)
+
+    for filtros in ({}, {"start_date": "2026-02-01", "end_date": "2026-02-28", "month_prefix": "2026-02"}):
+        assert espejo.stats(**filtros) == origen.base.stats(**filtros)
+        assert espejo.stats_detalle(**filtros) == origen.base.stats_detalle(**filtros)
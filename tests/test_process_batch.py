@@ -0,0 +1,35 @@
+"""
+/api/process-batch con un pool de procesos: un archivo inválido no afecta a los demás.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ["BATCH_WORKERS"] = "2"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api.index as api  # noqa: E402
+
+MUESTRAS = os.path.join(BASE_DIR, "backend", "CodePythonReference")
+
+
+def test_archivo_invalido_no_rompe_el_pool():
+    api.reset_batch_executor()
+    archivos = [("files", ("bad.xlsx", b"esto no es un xlsx", "application/octet-stream"))]
+    for nombre in ("INF FONTIBON 22012026.xlsx", "INF KENNEDY 09012026.xlsx"):
+        with open(os.path.join(MUESTRAS, nombre), "rb") as fh:
+            archivos.append(("files", (nombre, fh.read(), "application/octet-stream")))
+
+    try:
+        respuesta = TestClient(api.app).post("/api/process-batch", files=archivos)
+    finally:
+        api.reset_batch_executor()
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["processed_count"] == 2
+    assert [r["ARCHIVO"] for r in cuerpo["results"]] == ["INF FONTIBON 22012026.xlsx", "INF KENNEDY 09012026.xlsx"]
+    assert [e["file"] for e in cuerpo["errors"]] == ["bad.xlsx"]
+    assert "terminated abruptly" not in cuerpo["errors"][0]["error"]
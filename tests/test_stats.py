@@ -0,0 +1,126 @@
+"""
+/api/stats: los agregados en SQL (reportes_stats, la SQLite local) y los contadores en Python
+(EstadoStats, la caché incremental) dan el mismo resultado.
+"""
+import calendar
+import os
+import sys
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api.index as api  # noqa: E402
+from api._sqlite import TABLA, SQLiteReports  # noqa: E402
+from api._stats import EstadoStats, en_rango  # noqa: E402
+
+HOY = date.today()
+MES = HOY.strftime("%Y-%m")
+VENTANAS = [
+    (None, None),
+    (f"{MES}-01", f"{MES}-{calendar.monthrange(HOY.year, HOY.month)[1]:02d}"),
+    ("2025-01-01", "2025-06-30"),
+]
+
+
+def _resultado(n: int, dia: int, mes: str = MES) -> dict:
+    """Resultado de extract_data; con n < 28 las fechas no se repiten y el orden de recientes no empata."""
+    anio, numero_mes = mes.split("-")
+    riesgos = ["Riesgo ALTO", "riesgo moderado", "BAJO", "N/A"]
+    return {
+        "ARCHIVO": f"INF {mes} {n}.xlsx",
+        "Sede": ["Kennedy", "Fontibón", "Suba", "N/A"][n % 4],
+        "Fecha": f"{dia:02d}/{numero_mes}/{anio}" if n != 3 or mes != MES else "N/A",
+        "NOMBRE PROFESIONALES QUE RECIBEN": "Ana Pérez",
+        "CARGO PROFESIONALES QUE RECIBEN": "Enfermera",
+        "NOMBRE RESPONSABLE DE VISITA": f"Responsable {n % 5}",
+        "CARGO RESPONSABLE DE VISITA": "Auditor",
+        "CALIFICACIÓN OBTENIDA": f"{60 + n}%",
+        "CLASIFICACIÓN POR RIESGO": riesgos[n % 4],
+    }
+
+
+def _lote(inicio: int, cantidad: int, mes: str = MES) -> list:
+    return [_resultado(n, 1 + n % 28, mes) for n in range(inicio, inicio + cantidad)]
+
+
+def _todas(local: SQLiteReports) -> list:
+    with local._lock:
+        return [dict(fila) for fila in local._conn.execute(f"SELECT * FROM {TABLA}")]
+
+
+def test_sql_y_python_coinciden(tmp_path):
+    local = SQLiteReports(str(tmp_path / "reportes.db"))
+    local.insertar([api.map_result_to_db_row(r) for r in _lote(0, 27) + _lote(0, 12, "2025-03")])
+
+    for start_date, end_date in VENTANAS:
+        filas = [fila for fila in _todas(local) if en_rango(fila["fecha_dia"], start_date, end_date)]
+        en_sql = local.stats(start_date, end_date, MES)
+        assert EstadoStats.desde_filas(MES, filas).agregados() == en_sql
+        detalle = local.stats_detalle(start_date, end_date, MES)
+        assert EstadoStats.desde_detalle(MES, detalle, []).agregados() == en_sql
+
+
+def test_estado_incremental_sigue_a_la_base(tmp_path):
+    local = SQLiteReports(str(tmp_path / "reportes.db"))
+    local.insertar([api.map_result_to_db_row(r) for r in _lote(0, 16)])
+    estados = {
+        ventana: EstadoStats.desde_detalle(MES, local.stats_detalle(*ventana, MES), local.recientes(*ventana))
+        for ventana in VENTANAS[:2]
+    }
+
+    insertadas = local.insertar([api.map_result_to_db_row(r) for r in _lote(16, 11)])
+    for (start_date, end_date), estado in estados.items():
+        estado.agregar([fila for fila in insertadas if en_rango(fila["fecha_dia"], start_date, end_date)])
+        assert estado.agregados() == local.stats(start_date, end_date, MES)
+
+
+def test_recientes_sin_fecha_al_final(tmp_path):
+    local = SQLiteReports(str(tmp_path / "reportes.db"))
+    filas = [api.map_result_to_db_row(r) for r in _lote(0, 12)]
+    filas[0]["fecha"] = None
+    local.insertar(filas)
+
+    recientes = local.recientes()
+    assert recientes[-1]["fecha"] is not None
+    estado = EstadoStats.desde_filas(MES, _todas(local))
+    assert [f["archivo"] for f in estado.recientes] == [f["archivo"] for f in recientes]
+
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORTS_SQLITE_PATH", str(tmp_path / "reportes.db"))
+    monkeypatch.setattr(api, "sqlite_reports", None)
+    monkeypatch.setattr(api, "stats_cache", None)
+    monkeypatch.setattr(api, "indice_dedup", None)
+    return TestClient(api.app)
+
+
+def _stats(cliente, start_date=None, end_date=None) -> dict:
+    parametros = {k: v for k, v in (("start_date", start_date), ("end_date", end_date)) if v}
+    respuesta = cliente.get("/api/stats", params=parametros)
+    assert respuesta.status_code == 200
+    return respuesta.json()
+
+
+def test_cache_incremental_igual_a_recalcular(cliente):
+    respuesta = cliente.post("/api/upload-results", json={"results": _lote(0, 16) + _lote(0, 6, "2025-03")})
+    assert respuesta.status_code == 200
+    for ventana in VENTANAS:
+        assert _stats(cliente, *ventana)["cache"]["hit"] is False
+
+    respuesta = cliente.post("/api/upload-results", json={"results": _lote(16, 11) + _lote(6, 6, "2025-03")})
+    assert respuesta.status_code == 200
+    cacheadas = {ventana: _stats(cliente, *ventana) for ventana in VENTANAS}
+    assert cacheadas[VENTANAS[0]]["cache"]["incremental_updates"] == 1
+
+    api.get_stats_cache().clear()
+    for ventana in VENTANAS:
+        recalculada = _stats(cliente, *ventana)
+        assert recalculada["cache"]["hit"] is False
+        recalculada.pop("cache")
+        cacheadas[ventana].pop("cache")
+        assert cacheadas[ventana] == recalculada
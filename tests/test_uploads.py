@@ -0,0 +1,75 @@
+"""
+Límite del cuerpo de las subidas: se rechazan antes de que Starlette lea el formulario.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from fastapi import FastAPI, File, UploadFile  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api._uploads import LimiteCuerpo, PresupuestoEnVuelo  # noqa: E402
+
+LIMITE = 10_000
+MARGEN = 1_000
+
+
+def _cliente(presupuesto: PresupuestoEnVuelo, leidos: list) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/subir")
+    async def subir(file: UploadFile = File(...)):
+        leidos.append(len(await file.read()))
+        return {"ok": True}
+
+    app.add_middleware(
+        LimiteCuerpo, limites={"/subir": (LIMITE, "LIMITE")}, presupuesto=presupuesto, margen=MARGEN
+    )
+    return TestClient(app)
+
+
+def test_content_length_sobre_el_limite():
+    leidos = []
+    cliente = _cliente(PresupuestoEnVuelo(10 * LIMITE), leidos)
+
+    assert cliente.post("/subir", files={"file": ("a.xlsx", b"x" * LIMITE)}).status_code == 200
+    respuesta = cliente.post("/subir", files={"file": ("a.xlsx", b"x" * (LIMITE + 2 * MARGEN))})
+    assert respuesta.status_code == 413
+    assert "LIMITE" in respuesta.json()["detail"]
+    assert leidos == [LIMITE]
+
+
+def test_sin_presupuesto_libre():
+    presupuesto = PresupuestoEnVuelo(LIMITE)
+    reserva = presupuesto.reservar(LIMITE // 2)
+    leidos = []
+    cliente = _cliente(presupuesto, leidos)
+
+    respuesta = cliente.post("/subir", files={"file": ("a.xlsx", b"x" * LIMITE)})
+    assert respuesta.status_code == 503
+    assert respuesta.headers["retry-after"] == "5"
+    assert presupuesto.stats()["rejected"] == 1
+    assert presupuesto.stats()["in_flight_bytes"] == LIMITE // 2
+
+    reserva.cerrar()
+    assert cliente.post("/subir", files={"file": ("a.xlsx", b"x" * LIMITE)}).status_code == 200
+
+
+def test_cuerpo_chunked_se_corta_al_pasar_el_limite():
+    leidos = []
+    cliente = _cliente(PresupuestoEnVuelo(10 * LIMITE), leidos)
+    inicio = b'--limite\r\nContent-Disposition: form-data; name="file"; filename="a.xlsx"\r\n\r\n'
+
+    def partes():
+        yield inicio
+        for _ in range(20):
+            yield b"x" * 1_000
+        yield b"\r\n--limite--\r\n"
+
+    respuesta = cliente.post(
+        "/subir", content=partes(), headers={"content-type": "multipart/form-data; boundary=limite"}
+    )
+    assert respuesta.status_code == 413
+    assert leidos == []